@@ -1,8 +1,9 @@
 import logging
-from typing import Dict, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from app.utils.llm_client import LLMClient
 from app.schemas.project import Project
 from app.core.config import settings
+from app.utils.token_budget import PromptSection, estimate_tokens, fit_sections
 
 logger = logging.getLogger(__name__)
 
@@ -12,8 +13,17 @@ class ArchitectAgent:
         self.llm_client = llm_client
 
     async def generate_initial_plan_and_docs(
-        self, project_requirements: str, project_title: str
+        self,
+        project_requirements: str,
+        project_title: str,
+        on_progress: Optional[Callable[[str], Awaitable[None]]] = None,
     ) -> dict:
+        """
+        Generate the architecture doc, tech stack and TODO list for a project.
+        When on_progress is given the LLM response is streamed and the callback
+        receives the accumulated text after every chunk. The streamed call is
+        still cached and coalesced, but not hedged (see LLMClient.stream_llm).
+        """
         logger.info(f"Architect Agent: Generating plan for '{project_title}'")
         prompt = f"""You are an expert software architect. Based on the following project requirements for a project titled '{project_title}',
 generate:
@@ -27,12 +37,17 @@ Project Requirements:
 Output format should be structured clearly with headings for each section.
 Start the TODO list with '### Implementation TODO List'"""
 
-        llm_response_dict = await self.llm_client.call_llm(
-            prompt=prompt, model_name=settings.ARCHITECT_MODEL
-        )
+        if on_progress is None:
+            llm_response_dict = await self.llm_client.call_llm(
+                prompt=prompt, model_name=settings.ARCHITECT_MODEL, task_type="planning"
+            )
+        else:
+            llm_response_dict = await self._stream_with_progress(
+                prompt, settings.ARCHITECT_MODEL, on_progress, task_type="planning"
+            )
         response_text = llm_response_dict.get("text_response", "")
 
-        if response_text.startswith("Error:"):
+        if response_text.startswith("Error"):
             logger.error(f"Architect Agent: Error from LLM: {response_text}")
             return {"error": response_text}
 
@@ -84,6 +99,26 @@ Start the TODO list with '### Implementation TODO List'"""
             )
             return {"error": "Failed to parse LLM response for plan."}
 
+    async def _stream_with_progress(
+        self,
+        prompt: str,
+        model_name: str,
+        on_progress: Callable[[str], Awaitable[None]],
+        task_type: Optional[str] = None,
+    ) -> dict:
+        """Stream an LLM call, reporting progress, and return the call_llm-shaped result."""
+        accumulated = ""
+        llm_response_dict = {}
+        async for chunk in self.llm_client.stream_llm(
+            model_name=model_name, prompt=prompt, task_type=task_type
+        ):
+            if chunk["type"] == "delta":
+                accumulated += chunk["text"]
+                await on_progress(accumulated)
+            else:
+                llm_response_dict = {k: v for k, v in chunk.items() if k != "type"}
+        return llm_response_dict
+
     async def verify_implementation_step(
         self, project: Project, code_snippet: str, relevant_docs: str, todo_item: str
     ) -> dict:
@@ -91,7 +126,52 @@ Start the TODO list with '### Implementation TODO List'"""
         logger.info(
             f"Architect Agent: Verifying step for project {project.id}: '{todo_item}'"
         )
-        prompt = f"""You are an expert code reviewer and software architect.
+        prompt = self._build_verification_prompt(
+            project, code_snippet, relevant_docs, todo_item
+        )
+        llm_response_dict = await self.llm_client.call_llm(
+            prompt=prompt,
+            model_name=settings.VERIFICATION_MODEL,
+            task_type="verification",
+        )
+        return self._parse_verification(llm_response_dict)
+
+    async def verify_implementation_steps(
+        self, project: Project, steps: List[Dict[str, str]]
+    ) -> dict:
+        """
+        Verify several independent steps in one batch. Each step is a dict with
+        code_snippet, relevant_docs and todo_item. Returns the per-step results
+        in input order plus the batch's aggregate token usage.
+        """
+        logger.info(
+            f"Architect Agent: Verifying {len(steps)} steps for project {project.id}"
+        )
+        batch = await self.llm_client.call_llm_many(
+            [
+                {
+                    "prompt": self._build_verification_prompt(
+                        project,
+                        step["code_snippet"],
+                        step["relevant_docs"],
+                        step["todo_item"],
+                    ),
+                    "model_name": settings.VERIFICATION_MODEL,
+                    "task_type": "verification",
+                }
+                for step in steps
+            ]
+        )
+        return {
+            "results": [self._parse_verification(r) for r in batch["results"]],
+            "input_tokens": batch["input_tokens"],
+            "output_tokens": batch["output_tokens"],
+        }
+
+    def _build_verification_prompt(
+        self, project: Project, code_snippet: str, relevant_docs: str, todo_item: str
+    ) -> str:
+        return f"""You are an expert code reviewer and software architect.
 Project Title: {project.title}
 Project Description: {project.description}
 Relevant Documentation/Architecture:
@@ -105,12 +185,10 @@ Does this code correctly implement the task according to the project context and
 Provide feedback: 'APPROVED' or 'REJECTED: [detailed reasons and suggestions]'.
 If REJECTED, suggest updates to the code or the TODO list."""
 
-        llm_response_dict = await self.llm_client.call_llm(
-            prompt=prompt, model_name=settings.VERIFICATION_MODEL
-        )
+    def _parse_verification(self, llm_response_dict: dict) -> dict:
         response_text = llm_response_dict.get("text_response", "")
 
-        if response_text.startswith("Error:"):
+        if response_text.startswith("Error"):
             return {
                 "status": "ERROR",
                 "feedback": response_text,
@@ -148,7 +226,9 @@ Identify any:
 Provide specific recommendations for improvement."""
 
         llm_response_dict = await self.llm_client.call_llm(
-            prompt=prompt, model_name=settings.VERIFICATION_MODEL
+            prompt=prompt,
+            model_name=settings.VERIFICATION_MODEL,
+            task_type="verification",
         )
         return {
             "analysis": llm_response_dict.get("text_response", ""),
@@ -163,7 +243,8 @@ Provide specific recommendations for improvement."""
         dependencies = tech_stack.get("dependencies", [])
         env_vars = tech_stack.get("environment_variables", {})
 
-        prompt = f"""You are an expert technical writer. Generate a comprehensive README.md for the project titled '{project.title}'.
+        def build_prompt(description: str, documentation: str) -> str:
+            return f"""You are an expert technical writer. Generate a comprehensive README.md for the project titled '{project.title}'.
 Include these REQUIRED sections with appropriate content:
 
 ## Table of Contents
@@ -229,10 +310,10 @@ Include these REQUIRED sections with appropriate content:
 - Team members
 
 Project Description:
-{project.description}
+{description}
 
 Technical Documentation:
-{project.documentation}
+{documentation}
 
 Use proper Markdown formatting with:
 - Clear section headers
@@ -242,12 +323,26 @@ Use proper Markdown formatting with:
 - Badges for build status/version (if available)
 - Actual values from project context (no placeholders)"""
 
+        # Fit the free-form project text into the model's prompt budget; the
+        # instructions above are fixed and reserved up front.
+        sections = fit_sections(
+            [
+                PromptSection("description", project.description, priority=1),
+                PromptSection("documentation", project.documentation, priority=0),
+            ],
+            model_name=settings.ARCHITECT_MODEL,
+            reserved_tokens=estimate_tokens(
+                build_prompt("", ""), settings.ARCHITECT_MODEL
+            ),
+        )
+        prompt = build_prompt(sections["description"], sections["documentation"])
+
         llm_response_dict = await self.llm_client.call_llm(
-            prompt=prompt, model_name=settings.ARCHITECT_MODEL
+            prompt=prompt, model_name=settings.ARCHITECT_MODEL, task_type="planning"
         )
         response_text = llm_response_dict.get("text_response", "")
 
-        if response_text.startswith("Error:"):
+        if response_text.startswith("Error"):
             logger.error(f"Architect Agent: Error generating README: {response_text}")
             return f"# ERROR\n{response_text}"
 
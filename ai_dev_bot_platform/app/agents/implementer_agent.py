@@ -6,6 +6,7 @@ from app.utils.llm_client import LLMClient
 from typing import Dict, Any
 from app.core.config import settings
 from app.services.readme_generation_service import ReadmeGenerationService
+from app.utils.token_budget import PromptSection, estimate_tokens, fit_sections
 
 logger = logging.getLogger(__name__)
 
@@ -63,13 +64,27 @@ class ImplementerAgent:
                 project_id=project_id, query=todo_item
             )
 
-            # Build full context for implementation
+            # Build full context for implementation, trimmed to the model's budget:
+            # retrieved code goes first, then the project description.
+            sections = fit_sections(
+                [
+                    PromptSection("project_context", project_context, priority=1),
+                    PromptSection("tech_stack", str(tech_stack), priority=2),
+                    PromptSection("relevant_code", str(relevant_code), priority=0),
+                    PromptSection("task", todo_item, required=True),
+                ],
+                model_name=settings.IMPLEMENTER_MODEL,
+            )
             implementation_context = f"""
-            Project Context: {project_context}
-            Tech Stack: {tech_stack}
-            Relevant Code: {relevant_code}
-            Task: {todo_item}
+            Project Context: {sections["project_context"]}
+            Tech Stack: {sections["tech_stack"]}
+            Relevant Code: {sections["relevant_code"]}
+            Task: {sections["task"]}
             """
+            logger.info(
+                f"Implementation context for project {project_id}: "
+                f"~{estimate_tokens(implementation_context, settings.IMPLEMENTER_MODEL)} tokens (estimated)"
+            )
 
             # Run the implementation
             result = await self.run_tdd_cycle(
@@ -0,0 +1,24 @@
+import logging
+from fastapi import APIRouter
+from app.services.api_key_health import key_health_registry
+from app.services.api_key_manager import refresh_keys
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/api-keys/health")
+async def api_key_health():
+    """
+    Per-key health state: circuit breaker state, health score, success rate,
+    latency and recent errors. Keys are identified by fingerprint only.
+    """
+    return {"keys": key_health_registry.snapshot()}
+
+
+@router.post("/api-keys/refresh")
+async def refresh_api_keys():
+    """Reload the shared API key pools from the database, e.g. after a key rotation."""
+    counts = await refresh_keys()
+    logger.info(f"API keys refreshed via admin endpoint: {counts}")
+    return {"keys_per_provider": counts}
@@ -18,6 +18,8 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
 
     TELEGRAM_BOT_TOKEN: str
+    # Minimum seconds between edits of a streamed progress message (Telegram edit limits)
+    TELEGRAM_EDIT_MIN_INTERVAL_SECONDS: float = 1.5
 
     GOOGLE_API_KEY: Optional[str] = None
     GOOGLE_APPLICATION_CREDENTIALS: Optional[str] = None
@@ -33,8 +35,149 @@ class Settings(BaseSettings):
     VERIFICATION_MODEL: str = "deepseek/deepseek-r1-0528:free"
     DEFAULT_GEMINI_MODEL: str = "gemini-2.5-flash"
 
+    # LLM HTTP Client Configuration (shared, pooled client used by LLMClient)
+    OPENROUTER_API_URL: str = "https://openrouter.ai/api/v1/chat/completions"
+    # Overrides the Gemini API host, e.g. http://127.0.0.1:8765 for scripts/fake_llm_server.py
+    GEMINI_API_ENDPOINT: Optional[str] = None
+    # Per-key Gemini clients and per-(key, model) handles kept by LLMClient (LRU)
+    GEMINI_CLIENT_CACHE_MAX_KEYS: int = 16
+    GEMINI_MODEL_CACHE_MAX_ENTRIES: int = 64
+    LLM_HTTP_TIMEOUT_SECONDS: float = 120.0
+    LLM_HTTP2_ENABLED: bool = True
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+
+    # LLM Response Cache (opt-in; memory LRU backed by an SQLite file)
+    LLM_CACHE_ENABLED: bool = False
+    LLM_CACHE_TTL_SECONDS: float = 86400.0
+    LLM_CACHE_MEMORY_MAX_ENTRIES: int = 512
+    # An empty LLM_CACHE_SQLITE_PATH disables the disk tier
+    LLM_CACHE_SQLITE_PATH: Optional[str] = "llm_cache.sqlite3"
+    LLM_CACHE_DISK_MAX_ENTRIES: int = 10000
+    # Share one upstream call between concurrent identical LLM requests
+    LLM_SINGLE_FLIGHT_ENABLED: bool = True
+
+    # LLM Rate Limits: requests/tokens per minute per provider and per key (0 = unlimited)
+    # Example: LLM_RATE_LIMITS='{"openrouter": {"key_rpm": 20, "provider_rpm": 60}}'
+    LLM_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "openrouter": {
+            "provider_rpm": 0,
+            "provider_tpm": 0,
+            "key_rpm": 20,
+            "key_tpm": 0,
+        },
+        "google": {
+            "provider_rpm": 0,
+            "provider_tpm": 0,
+            "key_rpm": 15,
+            "key_tpm": 1000000,
+        },
+    }
+    LLM_MAX_CONCURRENT_CALLS: int = 8
+    LLM_BATCH_MAX_CONCURRENCY: int = 4  # Default fan-out of LLMClient.call_llm_many
+
+    # Hedged LLM requests per task type, all off by default: a hedge doubles
+    # the provider load of every call it fires. A second attempt (on the
+    # fallback model, or the same model on another key) starts once the first
+    # runs past the model's observed latency percentile; default_delay_seconds
+    # applies until LLM_HEDGE_MIN_SAMPLES latencies have been observed. With
+    # no fallback model and a single key the primary is simply awaited.
+    LLM_HEDGE_POLICIES: Dict[str, Dict[str, Any]] = {
+        "planning": {
+            "enabled": False,
+            "percentile": 0.95,
+            "fallback_model": None,
+            "default_delay_seconds": 90.0,
+        },
+        "implementation": {
+            "enabled": False,
+            "percentile": 0.95,
+            "fallback_model": None,
+            "default_delay_seconds": 90.0,
+        },
+        "verification": {
+            "enabled": False,
+            "percentile": 0.9,
+            "fallback_model": None,
+            "default_delay_seconds": 60.0,
+        },
+    }
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    # At most this share of hedge-policy calls fire a hedge, with up to
+    # LLM_HEDGE_BUDGET_BURST unused hedges saved for bursts of slow calls
+    LLM_HEDGE_MAX_SHARE: float = 0.05
+    LLM_HEDGE_BUDGET_BURST: float = 5.0
+    LLM_LATENCY_WINDOW_SIZE: int = 200
+
+    # Prompt budgets: context window (tokens) per model family, minus an output reserve
+    LLM_CONTEXT_TOKEN_BUDGETS: Dict[str, int] = {
+        "gemini": 1000000,
+        "deepseek": 64000,
+        "claude": 200000,
+        "gpt": 128000,
+        "llama": 128000,
+        "default": 32000,
+    }
+    LLM_OUTPUT_TOKEN_RESERVE: int = 8000
+
+    # Embedding backend for codebase indexing (app/utils/embedding_backends.py):
+    # "http", "local" (in-process hashing vectorizer) or "auto" (http when
+    # EMBEDDING_SERVICE_URL is set). Switching backends re-embeds every chunk.
+    EMBEDDING_BACKEND: str = "auto"
+    EMBEDDING_LOCAL_WORKERS: Optional[int] = None  # Process pool size; None = CPU count
+    # Embedding service for codebase indexing: POST {"text": "..."} -> {"embedding": [...]}
+    # e.g. http://127.0.0.1:8766/embed for scripts/fake_embedding_server.py
+    EMBEDDING_SERVICE_URL: Optional[str] = None
+    # For services that accept batches: POST {"texts": [...]} -> {"embeddings": [...]},
+    # one request per EMBEDDING_BATCH_SIZE chunks instead of one per chunk
+    EMBEDDING_HTTP_BATCH_REQUESTS: bool = False
+    EMBEDDING_BATCH_SIZE: int = 64  # Chunks per embedding request
+    EMBEDDING_MAX_CONCURRENT_BATCHES: int = 4  # Also the connection pool size
+    EMBEDDING_HTTP_TIMEOUT_SECONDS: float = 60.0
+    # Chunk rows written per transaction by the indexing pipeline (bulk INSERT/UPDATE/DELETE)
+    EMBEDDING_WRITE_BATCH_ROWS: int = 2000
+    # Indexing pipeline (app/services/indexing_pipeline.py): items per queue
+    # between stages, files read per query, and workers per stage. Embed
+    # workers default to the backend's max_concurrency.
+    EMBEDDING_PIPELINE_QUEUE_SIZE: int = 16
+    EMBEDDING_PIPELINE_READ_BATCH_FILES: int = 64
+    EMBEDDING_PIPELINE_CHUNK_WORKERS: int = 2
+    EMBEDDING_PIPELINE_EMBED_WORKERS: Optional[int] = None
+    # Structure-aware chunking (app/utils/code_chunker.py); changing these re-indexes every file
+    EMBEDDING_CHUNK_TARGET_CHARS: int = 1500
+    EMBEDDING_CHUNK_OVERLAP_CHARS: int = 200
+    # Vector search on project_embeddings (HNSW index, L2 distance). Higher
+    # ef_search/probes trade latency for recall; None keeps the server default.
+    # query_codebase(ef_search=..., probes=...) overrides them per query.
+    EMBEDDING_HNSW_EF_SEARCH: Optional[int] = None
+    EMBEDDING_IVFFLAT_PROBES: Optional[int] = None  # For IVFFlat indexes
+    # query_codebase mode: "vector", "lexical" (full-text) or "hybrid" (both,
+    # merged with reciprocal rank fusion). Full-text search needs PostgreSQL.
+    EMBEDDING_SEARCH_MODE: str = "vector"
+    EMBEDDING_HYBRID_WEIGHTS: Dict[str, float] = {"vector": 1.0, "lexical": 1.0}
+    EMBEDDING_HYBRID_RRF_K: float = 60.0
+    EMBEDDING_HYBRID_CANDIDATES: int = 20  # Results taken from each search
+    # Hybrid searches fuse whatever finished within the budget (at least one search)
+    EMBEDDING_HYBRID_LATENCY_BUDGET_MS: float = 800.0
+    # In-process copy of hot projects' vectors for exact search without pgvector
+    # (app/utils/vector_cache.py). Index writes invalidate a project; the TTL
+    # bounds staleness from writes made by other processes.
+    EMBEDDING_VECTOR_CACHE_ENABLED: bool = False
+    EMBEDDING_VECTOR_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    EMBEDDING_VECTOR_CACHE_TTL_SECONDS: float = 300.0
+    # Query embeddings by embedding model and normalised query text, shared
+    # by every service in the process (app/utils/embedding_cache.py)
+    EMBEDDING_QUERY_CACHE_ENABLED: bool = True
+    EMBEDDING_QUERY_CACHE_MAX_ENTRIES: int = 1024
+    EMBEDDING_QUERY_CACHE_TTL_SECONDS: float = 3600.0
+
     PLATFORM_CREDIT_VALUE_USD: float = 0.01
     MARKUP_FACTOR: float = 1.5
+    # Charge for LLM responses that never reached the provider (a cache hit, or
+    # a share of an identical in-flight call) like a fresh call of the same
+    # tokens. When False those responses are free for the caller.
+    LLM_CHARGE_REUSED_RESPONSES: bool = True
 
     # Stripe Configuration
     STRIPE_SECRET_KEY: Optional[str] = None
@@ -47,6 +190,18 @@ class Settings(BaseSettings):
     SUPABASE_URL: Optional[str] = None
     SUPABASE_KEY: Optional[str] = None
 
+    # Background reload of the shared API key pools (0 disables; POST /admin/api-keys/refresh forces one)
+    API_KEY_REFRESH_INTERVAL_SECONDS: float = 300.0
+    # How often buffered per-key usage counts are written to api_keys (also flushed at shutdown)
+    API_KEY_USAGE_FLUSH_INTERVAL_SECONDS: float = 30.0
+
+    # API Key Health: circuit breaker and health-weighted key selection
+    API_KEY_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures before opening
+    API_KEY_BREAKER_COOLDOWN_SECONDS: float = 60.0  # Open time before a half-open probe
+    # A half-open probe that never reports back frees its slot after this long
+    API_KEY_BREAKER_PROBE_TIMEOUT_SECONDS: float = 300.0
+    API_KEY_LATENCY_REFERENCE_SECONDS: float = 30.0  # Latency that halves a key's score
+
     # API Key Pools for round-robin (loaded from env or defaults)
     # Example: GOOGLE_API_KEY_POOL='key1,key2'
     # Example: OPENROUTER_API_KEY_POOL='keyA,keyB'
@@ -0,0 +1,125 @@
+"""
+Prometheus metrics shared across the application.
+
+All metrics are registered on the default registry, which is exported by the
+/health/metrics endpoint.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total",
+    "LLM response cache lookups by tier and result",
+    ["tier", "result"],
+)
+
+LLM_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "llm_rate_limit_wait_seconds",
+    "Time LLM calls spent queued for rate-limit and concurrency capacity",
+    ["provider"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+LLM_IN_FLIGHT_CALLS = Gauge(
+    "llm_in_flight_calls",
+    "LLM provider calls currently in flight",
+    ["provider"],
+)
+
+LLM_HEDGED_REQUESTS = Counter(
+    "llm_hedged_requests_total",
+    "LLM calls made under a hedge policy, by task type and outcome",
+    ["task_type", "outcome"],
+)
+
+API_KEY_REQUESTS = Counter(
+    "api_key_requests_total",
+    "Provider calls per API key (fingerprint) by outcome",
+    ["provider", "key", "outcome"],
+)
+
+API_KEY_HEALTH_SCORE = Gauge(
+    "api_key_health_score",
+    "Health score used to weight API key selection (0-1)",
+    ["provider", "key"],
+)
+
+API_KEY_CIRCUIT_STATE = Gauge(
+    "api_key_circuit_state",
+    "API key circuit breaker state (0=closed, 1=half-open, 2=open)",
+    ["provider", "key"],
+)
+
+LLM_COALESCED_REQUESTS = Counter(
+    "llm_coalesced_requests_total",
+    "LLM calls that joined an identical in-flight request instead of calling the provider",
+)
+
+LLM_TOKEN_ESTIMATE_RATIO = Histogram(
+    "llm_token_estimate_ratio",
+    "Actual / estimated input tokens per LLM call, for calibrating the offline estimator",
+    ["family"],
+    buckets=(0.5, 0.75, 0.9, 1.0, 1.1, 1.25, 1.5, 2.0, 3.0),
+)
+
+LLM_REQUEST_DURATION_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "Wall-clock time of successful LLM provider calls, excluding rate-limit queueing",
+    ["provider", "model", "task_type"],
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+
+LLM_TIME_TO_FIRST_BYTE_SECONDS = Histogram(
+    "llm_time_to_first_byte_seconds",
+    "Time from sending an LLM request to receiving its response headers",
+    ["provider", "model", "task_type"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+
+LLM_OUTPUT_TOKENS_PER_SECOND = Histogram(
+    "llm_output_tokens_per_second",
+    "Output tokens per second of wall-clock time for successful LLM calls",
+    ["provider", "model", "task_type"],
+    buckets=(1, 5, 10, 25, 50, 75, 100, 150, 200, 300, 500),
+)
+
+EMBEDDING_VECTOR_CACHE_REQUESTS = Counter(
+    "embedding_vector_cache_requests_total",
+    "Per-project vector cache lookups in query_codebase by result",
+    ["result"],
+)
+
+EMBEDDING_VECTOR_CACHE_BYTES = Gauge(
+    "embedding_vector_cache_bytes",
+    "Estimated memory held by the per-project vector cache",
+)
+
+EMBEDDING_QUERY_CACHE_REQUESTS = Counter(
+    "embedding_query_cache_requests_total",
+    "Query embedding cache lookups by result",
+    ["result"],
+)
+
+EMBEDDING_QUERY_CALLS_AVOIDED = Counter(
+    "embedding_query_calls_avoided_total",
+    "Query embeddings served without an embedding call, by reason (cache, coalesced)",
+    ["reason"],
+)
+
+INDEXING_PIPELINE_FILES = Counter(
+    "indexing_pipeline_files_total",
+    "Files completed by each codebase indexing pipeline stage",
+    ["stage"],
+)
+
+INDEXING_PIPELINE_BUSY_SECONDS = Counter(
+    "indexing_pipeline_busy_seconds_total",
+    "Time codebase indexing pipeline stages spent working, summed over workers (files / busy seconds = stage throughput)",
+    ["stage"],
+)
+
+INDEXING_PIPELINE_QUEUE_DEPTH = Gauge(
+    "indexing_pipeline_queue_depth",
+    "Items waiting in the queues between codebase indexing pipeline stages",
+    ["queue"],
+)
@@ -0,0 +1,29 @@
+"""Add LLM call timings to api_key_usage
+
+Revision ID: 5c1e9a7d3b42
+Revises: d73037f0cf26
+Create Date: 2026-10-17 09:12:31.402118
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5c1e9a7d3b42"
+down_revision = "d73037f0cf26"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("api_key_usage", sa.Column("ttfb_ms", sa.Integer(), nullable=True))
+    op.add_column(
+        "api_key_usage",
+        sa.Column("output_tokens_per_second", sa.Float(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("api_key_usage", "output_tokens_per_second")
+    op.drop_column("api_key_usage", "ttfb_ms")
@@ -0,0 +1,97 @@
+"""Add chunk columns and HNSW index to project_embeddings
+
+project_embeddings used to be created only by Base.metadata.create_all
+(seed_db.py), so the table is created here when missing and otherwise gets
+the columns it lacks.
+
+Revision ID: 8e3b1f6a9c20
+Revises: 5c1e9a7d3b42
+Create Date: 2026-10-17 14:03:52.118640
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision = "8e3b1f6a9c20"
+down_revision = "5c1e9a7d3b42"
+branch_labels = None
+depends_on = None
+
+
+def _chunk_columns():
+    return [
+        sa.Column("chunk_index", sa.Integer(), nullable=True),
+        sa.Column("total_chunks", sa.Integer(), nullable=True),
+        sa.Column("start_line", sa.Integer(), nullable=True),
+        sa.Column("end_line", sa.Integer(), nullable=True),
+        sa.Column("symbols", sa.JSON(), nullable=True),
+        sa.Column("content_hash", sa.String(length=64), nullable=True),
+        sa.Column("file_hash", sa.String(length=64), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("project_embeddings"):
+        op.create_table(
+            "project_embeddings",
+            sa.Column("id", sa.UUID(), nullable=False),
+            sa.Column("project_id", sa.UUID(), nullable=False),
+            sa.Column("file_path", sa.String(length=1000), nullable=False),
+            sa.Column("content_chunk", sa.TEXT(), nullable=False),
+            *_chunk_columns(),
+            sa.Column("embedding", Vector(384), nullable=True),
+            sa.ForeignKeyConstraint(["project_id"], ["projects.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(
+            op.f("ix_project_embeddings_project_id"),
+            "project_embeddings",
+            ["project_id"],
+            unique=False,
+        )
+        existing_indexes = set()
+    else:
+        existing_columns = {
+            column["name"] for column in inspector.get_columns("project_embeddings")
+        }
+        for column in _chunk_columns():
+            if column.name not in existing_columns:
+                op.add_column("project_embeddings", column)
+        existing_indexes = {
+            index["name"] for index in inspector.get_indexes("project_embeddings")
+        }
+
+    if "ix_project_embeddings_project_id_file_path" not in existing_indexes:
+        op.create_index(
+            "ix_project_embeddings_project_id_file_path",
+            "project_embeddings",
+            ["project_id", "file_path"],
+            unique=False,
+        )
+    # vector_l2_ops serves the <-> (l2_distance) operator query_codebase orders by
+    if "ix_project_embeddings_embedding_hnsw" not in existing_indexes:
+        op.create_index(
+            "ix_project_embeddings_embedding_hnsw",
+            "project_embeddings",
+            ["embedding"],
+            unique=False,
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_l2_ops"},
+        )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_project_embeddings_embedding_hnsw", table_name="project_embeddings"
+    )
+    op.drop_index(
+        "ix_project_embeddings_project_id_file_path", table_name="project_embeddings"
+    )
+    for column in reversed(_chunk_columns()):
+        op.drop_column("project_embeddings", column.name)
@@ -0,0 +1,37 @@
+"""Add full-text search index to project_embeddings
+
+Revision ID: b47d2e91c6f3
+Revises: 8e3b1f6a9c20
+Create Date: 2026-10-17 16:41:07.553284
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b47d2e91c6f3"
+down_revision = "8e3b1f6a9c20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Must match app.models.embedding.search_document() for the planner to use it
+    op.create_index(
+        "ix_project_embeddings_search_document",
+        "project_embeddings",
+        [
+            sa.text(
+                "to_tsvector('simple'::regconfig, file_path || ' ' || content_chunk)"
+            )
+        ],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_project_embeddings_search_document", table_name="project_embeddings"
+    )
@@ -5,6 +5,7 @@ from sqlalchemy import (
     DateTime,
     DECIMAL,
     Boolean,
+    Float,
     TEXT,
     ForeignKey,
 )
@@ -45,6 +46,8 @@ class APIKeyUsage(Base):
     images_processed = Column(Integer, default=0)
     actual_cost_usd = Column(DECIMAL(10, 6), nullable=True)
     response_time_ms = Column(Integer, nullable=True)
+    ttfb_ms = Column(Integer, nullable=True)
+    output_tokens_per_second = Column(Float, nullable=True)
     created_at = Column(DateTime, default=func.now())
 
 
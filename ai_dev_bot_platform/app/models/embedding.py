@@ -1,11 +1,50 @@
 # ROO-AUDIT-TAG :: refactoring-epic-002-persistent-indexing.md :: Create ProjectEmbedding model for pgvector
 import uuid
-from sqlalchemy import Column, TEXT, String, ForeignKey
+from sqlalchemy import (
+    Column,
+    TEXT,
+    String,
+    Integer,
+    ForeignKey,
+    Index,
+    JSON,
+    func,
+    text,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from pgvector.sqlalchemy import Vector
 from app.db.session import Base
 
 
+class EmbeddingVector(Vector):
+    """
+    pgvector's Vector with a faster bind processor. Values are formatted with
+    one %-template per dimension count instead of str() per element, which
+    dominated bulk index writes; 9 significant digits are lossless for the
+    float32 values pgvector stores.
+    """
+
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        templates = {}
+
+        def process(value):
+            if value is None or isinstance(value, str):
+                return value
+            if hasattr(value, "to_list"):  # pgvector.Vector
+                value = value.to_list()
+            values = tuple(value.tolist() if hasattr(value, "tolist") else value)
+            template = templates.get(len(values))
+            if template is None:
+                template = templates[len(values)] = (
+                    "[" + ",".join(["%.9g"] * len(values)) + "]"
+                )
+            return template % values
+
+        return process
+
+
 class ProjectEmbedding(Base):
     __tablename__ = "project_embeddings"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -14,7 +53,51 @@ class ProjectEmbedding(Base):
     )
     file_path = Column(String(1000), nullable=False)
     content_chunk = Column(TEXT, nullable=False)
-    embedding = Column(Vector(384))  # Dimension for all-MiniLM-L6-v2 is 384
+    chunk_index = Column(Integer, nullable=True)
+    total_chunks = Column(Integer, nullable=True)
+    # 1-based line range of the chunk, including overlap with the previous chunk
+    start_line = Column(Integer, nullable=True)
+    end_line = Column(Integer, nullable=True)
+    # Functions, classes or Markdown headings that start in the chunk
+    symbols = Column(JSON, nullable=True)
+    # sha256 of content_chunk; unchanged chunks keep their embedding on re-index
+    content_hash = Column(String(64), nullable=True)
+    # sha256 of the whole file as last fully indexed; unchanged files are skipped
+    file_hash = Column(String(64), nullable=True)
+    embedding = Column(EmbeddingVector(384))  # Dimension for all-MiniLM-L6-v2 is 384
+
+    __table_args__ = (
+        Index("ix_project_embeddings_project_id_file_path", "project_id", "file_path"),
+        # Approximate nearest-neighbour index for l2_distance (<->) queries;
+        # recall is tuned per query with hnsw.ef_search
+        Index(
+            "ix_project_embeddings_embedding_hnsw",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": 16, "ef_construction": 64},
+            postgresql_ops={"embedding": "vector_l2_ops"},
+        ),
+    )
+
+
+def search_document():
+    """
+    Full-text search document of a chunk (file path and content). The
+    'simple' configuration keeps identifiers and paths unstemmed. Queries must
+    use this exact expression for the GIN index below to apply.
+    """
+    return func.to_tsvector(
+        text("'simple'::regconfig"),
+        ProjectEmbedding.file_path.concat(text("' '")).concat(
+            ProjectEmbedding.content_chunk
+        ),
+    )
+
 
+Index(
+    "ix_project_embeddings_search_document",
+    search_document(),
+    postgresql_using="gin",
+).ddl_if(dialect="postgresql")
 
 # ROO-AUDIT-TAG :: refactoring-epic-002-persistent-indexing.md :: END
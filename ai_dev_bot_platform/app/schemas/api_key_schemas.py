@@ -52,6 +52,8 @@ class APIKeyUsageBase(BaseModel):
     images_processed: int = 0
     actual_cost_usd: Optional[Decimal] = None
     response_time_ms: Optional[int] = None
+    ttfb_ms: Optional[int] = None
+    output_tokens_per_second: Optional[float] = None
 
 
 class APIKeyUsageCreate(APIKeyUsageBase):
@@ -0,0 +1,232 @@
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import (
+    API_KEY_CIRCUIT_STATE,
+    API_KEY_HEALTH_SCORE,
+    API_KEY_REQUESTS,
+)
+from app.utils.rate_limiter import key_fingerprint
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Exponential moving average weight given to the newest observation
+EWMA_ALPHA = 0.2
+# Window used for the "recent errors" penalty
+RECENT_ERROR_WINDOW_SECONDS = 60.0
+# Identifies each half-open probe, so only the call that took it can free it
+_probe_tokens = itertools.count(1)
+
+
+def is_key_failure(status_code: Optional[int]) -> bool:
+    """Errors that say something about the key: throttling, auth, provider faults or no response."""
+    return status_code is None or status_code in (401, 403, 429) or status_code >= 500
+
+
+class KeyHealth:
+    """Success rate, latency and circuit-breaker state of a single API key."""
+
+    def __init__(self, provider: str, fingerprint: str):
+        self.provider = provider
+        self.fingerprint = fingerprint
+        self.state = CLOSED
+        self.success_rate = 1.0
+        self.latency_seconds: Optional[float] = None
+        self.consecutive_failures = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self.recent_errors: Deque[Tuple[float, Optional[int]]] = deque(maxlen=50)
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self.probe_started_at: Optional[float] = None
+        self.probe_token: Optional[int] = None
+
+    def _recent_error_count(self, now: float) -> int:
+        return sum(
+            1 for at, _ in self.recent_errors if now - at <= RECENT_ERROR_WINDOW_SECONDS
+        )
+
+    def score(self, now: Optional[float] = None) -> float:
+        """Selection weight in (0, 1]: success rate, discounted for latency and recent errors."""
+        now = now if now is not None else time.monotonic()
+        latency_factor = 1.0
+        if self.latency_seconds is not None:
+            latency_factor = 1.0 / (
+                1.0 + self.latency_seconds / settings.API_KEY_LATENCY_REFERENCE_SECONDS
+            )
+        error_factor = 1.0 / (1.0 + self._recent_error_count(now))
+        return max(0.01, self.success_rate * latency_factor * error_factor)
+
+    def allows_request(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if now - self.opened_at < settings.API_KEY_BREAKER_COOLDOWN_SECONDS:
+                return False
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+            logger.info(
+                f"Circuit for {self.provider} key {self.fingerprint} half-open."
+            )
+        # Half-open: let exactly one probe through, unless it stopped reporting back
+        if (
+            self.probe_in_flight
+            and now - self.probe_started_at
+            >= settings.API_KEY_BREAKER_PROBE_TIMEOUT_SECONDS
+        ):
+            logger.warning(
+                f"Half-open probe for {self.provider} key {self.fingerprint} "
+                f"never reported back; allowing another."
+            )
+            self.probe_in_flight = False
+        return not self.probe_in_flight
+
+    def on_selected(self) -> Optional[int]:
+        """Take the half-open probe slot if the circuit is half-open; returns its token."""
+        if self.state != HALF_OPEN:
+            return None
+        self.probe_in_flight = True
+        self.probe_started_at = time.monotonic()
+        self.probe_token = next(_probe_tokens)
+        return self.probe_token
+
+    def release_probe(self, token: Optional[int]):
+        """Free the half-open probe slot taken with `token`, if it is still held."""
+        if (
+            token is not None
+            and self.state == HALF_OPEN
+            and self.probe_in_flight
+            and self.probe_token == token
+        ):
+            self.probe_in_flight = False
+
+    def record(
+        self, success: bool, status_code: Optional[int], latency: Optional[float]
+    ):
+        now = time.monotonic()
+        self.total_requests += 1
+        self.success_rate = (1 - EWMA_ALPHA) * self.success_rate + EWMA_ALPHA * (
+            1.0 if success else 0.0
+        )
+        if latency is not None:
+            self.latency_seconds = (
+                latency
+                if self.latency_seconds is None
+                else (1 - EWMA_ALPHA) * self.latency_seconds + EWMA_ALPHA * latency
+            )
+
+        if success:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                logger.info(
+                    f"Circuit for {self.provider} key {self.fingerprint} closed."
+                )
+            self.state = CLOSED
+            self.probe_in_flight = False
+            return
+
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        self.recent_errors.append((now, status_code))
+        if (
+            self.state == HALF_OPEN
+            or self.consecutive_failures >= settings.API_KEY_BREAKER_FAILURE_THRESHOLD
+        ):
+            if self.state != OPEN:
+                logger.warning(
+                    f"Circuit for {self.provider} key {self.fingerprint} opened "
+                    f"after {self.consecutive_failures} failures (last status {status_code})."
+                )
+            self.state = OPEN
+            self.opened_at = now
+            self.probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            "provider": self.provider,
+            "key": self.fingerprint,
+            "state": self.state,
+            "score": round(self.score(now), 4),
+            "success_rate": round(self.success_rate, 4),
+            "latency_seconds": self.latency_seconds,
+            "consecutive_failures": self.consecutive_failures,
+            "recent_errors": self._recent_error_count(now),
+            "recent_error_statuses": [status for _, status in self.recent_errors][-10:],
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+        }
+
+
+class KeyHealthRegistry:
+    """Process-wide health state for every API key, keyed by provider and key fingerprint."""
+
+    def __init__(self):
+        self._health: Dict[Tuple[str, str], KeyHealth] = {}
+
+    def get(self, provider: str, api_key: str) -> KeyHealth:
+        fingerprint = key_fingerprint(api_key)
+        health = self._health.get((provider, fingerprint))
+        if health is None:
+            health = self._health[(provider, fingerprint)] = KeyHealth(
+                provider, fingerprint
+            )
+        return health
+
+    def choose(
+        self, provider: str, keys: List[str]
+    ) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Weighted-random choice by health score among keys whose circuit allows
+        a request. Returns (key, probe token); the token is set only when the
+        key is half-open and this call took its probe slot.
+        """
+        if not keys:
+            return None, None
+        now = time.monotonic()
+        candidates = [k for k in keys if self.get(provider, k).allows_request(now)]
+        if not candidates:
+            # Every circuit is open: fall back to the key that opened longest ago
+            key = min(keys, key=lambda k: self.get(provider, k).opened_at or 0.0)
+            logger.warning(
+                f"All {provider} key circuits are open; using {key_fingerprint(key)} anyway."
+            )
+            return key, None
+        weights = [self.get(provider, k).score(now) for k in candidates]
+        key = random.choices(candidates, weights=weights, k=1)[0]
+        return key, self.get(provider, key).on_selected()
+
+    def record(
+        self,
+        provider: str,
+        api_key: str,
+        success: bool,
+        status_code: Optional[int] = None,
+        latency: Optional[float] = None,
+    ):
+        health = self.get(provider, api_key)
+        health.record(success, status_code, latency)
+        labels = {"provider": provider, "key": health.fingerprint}
+        API_KEY_REQUESTS.labels(
+            outcome="success" if success else str(status_code or "error"), **labels
+        ).inc()
+        API_KEY_HEALTH_SCORE.labels(**labels).set(health.score())
+        API_KEY_CIRCUIT_STATE.labels(**labels).set(CIRCUIT_STATE_VALUES[health.state])
+
+    def release(self, provider: str, api_key: str, probe: Optional[int]):
+        self.get(provider, api_key).release_probe(probe)
+
+    def snapshot(self) -> List[dict]:
+        return [health.snapshot() for health in self._health.values()]
+
+
+key_health_registry = KeyHealthRegistry()
@@ -1,11 +1,14 @@
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import Collection, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.api_key_models import APIKey
 from app.core.config import settings
+from app.services.api_key_health import is_key_failure, key_health_registry
+from app.services.api_key_usage_counter import KeyUsageCounter
 from cryptography.fernet import Fernet
-from sqlalchemy.sql import func
 
 logger = logging.getLogger(__name__)
 
@@ -18,33 +21,40 @@ class APIKeyManager:
 
         # Initialize in-memory cache
         self.api_keys: Dict[str, List[str]] = {}
-        self.current_indices: Dict[str, int] = {}
+        # api_keys row id of each decrypted key, for usage counting
+        self.key_ids: Dict[str, int] = {}
+        self.usage_counter = KeyUsageCounter()
         self.load_keys_from_db()
 
     def load_keys_from_db(self):
-        """Load active API keys from the database."""
+        """
+        Load active API keys from the database. The key pools are swapped in
+        as a whole, so concurrent get_next_key calls never see a partial load.
+        """
         db: Session = next(get_db())
         try:
+            api_keys: Dict[str, List[str]] = {}
+            key_ids: Dict[str, int] = {}
             active_keys = db.query(APIKey).filter(APIKey.is_active == True).all()
             for key in active_keys:
-                if key.provider not in self.api_keys:
-                    self.api_keys[key.provider] = []
-                    self.current_indices[key.provider] = 0
+                if key.provider not in api_keys:
+                    api_keys[key.provider] = []
 
                 # Decrypt the key
                 decrypted_key = self.cipher.decrypt(key.encrypted_key.encode()).decode()
-                self.api_keys[key.provider].append(decrypted_key)
-
-                # Update usage stats
-                key.usage_count += 1
-                key.last_used = func.now()
-                db.commit()
+                api_keys[key.provider].append(decrypted_key)
+                key_ids[decrypted_key] = key.id
 
+            self.key_ids = key_ids
+            self.api_keys = api_keys
             logger.info(f"Loaded {len(active_keys)} active API keys from database.")
             if not self.api_keys:
                 logger.warning("No active API keys found in the database!")
         except Exception as e:
             logger.error(f"Error loading API keys from database: {str(e)}")
+            if self.api_keys:
+                # A failed refresh keeps the keys that are already loaded
+                return
             # Fallback to settings if DB access fails
             self.api_keys = {
                 "google": [settings.GOOGLE_API_KEY] if settings.GOOGLE_API_KEY else [],
@@ -52,11 +62,27 @@ class APIKeyManager:
                     [settings.OPENROUTER_API_KEY] if settings.OPENROUTER_API_KEY else []
                 ),
             }
-            for provider in self.api_keys:
-                self.current_indices[provider] = 0
             logger.warning("Fallback to settings-based API keys.")
+        finally:
+            db.close()
 
     def get_next_key(self, provider: str) -> Optional[str]:
+        """
+        Pick a key for the provider, weighted by health score. Keys whose
+        circuit breaker is open are skipped until their cooldown has passed.
+        A half-open probe taken here is only freed by the call's result or
+        the probe timeout; calls that may end without one use checkout_key.
+        """
+        return self.checkout_key(provider)[0]
+
+    def checkout_key(
+        self, provider: str, exclude: Collection[str] = ()
+    ) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Like get_next_key, but also returns the token of the half-open probe
+        slot the call took (None if it took none), for release_key. Keys in
+        `exclude` are never picked.
+        """
         try:
             if provider not in self.api_keys or not self.api_keys[provider]:
                 logger.error(
@@ -66,17 +92,110 @@ class APIKeyManager:
                         "available_providers": list(self.api_keys.keys()),
                     },
                 )
-                return None
+                return None, None
 
-            keys = self.api_keys[provider]
-            current_index = self.current_indices[provider]
-            key = keys[current_index]
-            self.current_indices[provider] = (current_index + 1) % len(keys)
-            return key
+            keys = [key for key in self.api_keys[provider] if key not in exclude]
+            return key_health_registry.choose(provider, keys)
         except Exception as e:
             logger.error(
                 f"Unexpected error getting API key for provider {provider}: {str(e)}",
                 exc_info=True,
                 extra={"provider": provider},
             )
-            return None
+            return None, None
+
+    def has_other_key(self, provider: str, exclude: Collection[str]) -> bool:
+        """Whether the provider has a configured key outside `exclude`."""
+        return any(key not in exclude for key in self.api_keys.get(provider, []))
+
+    def report_key_result(
+        self,
+        provider: str,
+        key: str,
+        status_code: Optional[int] = None,
+        latency_seconds: Optional[float] = None,
+        success: Optional[bool] = None,
+    ):
+        """
+        Feed the outcome of a provider call back into the key's health score.
+        status_code is None when no HTTP response was received.
+        """
+        if not key:
+            return
+        key_id = self.key_ids.get(key)
+        if key_id is not None:
+            self.usage_counter.increment(key_id)
+        if success is None:
+            success = not is_key_failure(status_code)
+        key_health_registry.record(
+            provider, key, success, status_code=status_code, latency=latency_seconds
+        )
+
+    def release_key(self, provider: str, key: Optional[str], probe: Optional[int]):
+        """
+        Called when a call that checked out `key` is over, whatever its
+        outcome. If the call took the key's half-open probe slot (probe is its
+        token) and never reported a result (cancelled, or failed before the
+        request), this frees the slot; otherwise it does nothing.
+        """
+        if key:
+            key_health_registry.release(provider, key, probe)
+
+
+_shared_manager: Optional[APIKeyManager] = None
+_shared_manager_lock = threading.Lock()
+
+
+def get_api_key_manager() -> APIKeyManager:
+    """
+    Process-wide APIKeyManager. Keys are loaded on first use and kept current
+    by run_key_refresh (or an explicit refresh_keys call) instead of being
+    re-read for every orchestrator.
+    """
+    global _shared_manager
+    if _shared_manager is None:
+        with _shared_manager_lock:
+            if _shared_manager is None:
+                _shared_manager = APIKeyManager()
+    return _shared_manager
+
+
+async def refresh_keys() -> Dict[str, int]:
+    """Reload the shared manager's keys from the database; returns key counts per provider."""
+    manager = get_api_key_manager()
+    await asyncio.to_thread(manager.load_keys_from_db)
+    return {provider: len(keys) for provider, keys in manager.api_keys.items()}
+
+
+def flush_key_usage() -> int:
+    """Write the shared manager's pending key usage to the database; returns uses written."""
+    if _shared_manager is None:
+        return 0
+    db: Session = next(get_db())
+    try:
+        return _shared_manager.usage_counter.flush(db)
+    finally:
+        db.close()
+
+
+async def run_key_refresh(interval_seconds: float):
+    """Refresh the shared key pools every interval_seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            counts = await refresh_keys()
+            logger.info(f"Refreshed API keys: {counts}")
+        except Exception as e:
+            logger.error(f"Background API key refresh failed: {e}", exc_info=True)
+
+
+async def run_usage_flush(interval_seconds: float):
+    """Flush key usage counts every interval_seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            written = await asyncio.to_thread(flush_key_usage)
+            if written:
+                logger.debug(f"Flushed {written} API key uses.")
+        except Exception as e:
+            logger.error(f"API key usage flush failed: {e}", exc_info=True)
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Dict, Tuple
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+from app.models.api_key_models import APIKey
+
+logger = logging.getLogger(__name__)
+
+
+class KeyUsageCounter:
+    """
+    Write-behind usage counts for rows of the api_keys table.
+
+    increment() only appends to a deque and stores a timestamp, both atomic
+    operations, so the request path takes no lock and makes no DB call.
+    flush() drains the pending uses and applies them in one UPDATE; flushes
+    (the periodic one and the one at shutdown) run one at a time.
+    """
+
+    def __init__(self):
+        self._pending: Deque[int] = deque()
+        self._last_used: Dict[int, float] = {}
+        self._drain_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def increment(self, key_id: int):
+        self._last_used[key_id] = time.time()
+        self._pending.append(key_id)
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def drain(self) -> Tuple[Counter, Dict[int, datetime]]:
+        """Take every pending use: ({key_id: uses}, {key_id: last used})."""
+        counts: Counter = Counter()
+        # Only pop what is there now; uses appended meanwhile wait for the next flush.
+        # Concurrent drains would both count len() and pop past the end.
+        with self._drain_lock:
+            for _ in range(len(self._pending)):
+                counts[self._pending.popleft()] += 1
+        last_used = {
+            key_id: datetime.utcfromtimestamp(self._last_used[key_id])
+            for key_id in counts
+        }
+        return counts, last_used
+
+    def restore(self, counts: Counter):
+        """Put drained uses back after a failed flush."""
+        self._pending.extend(counts.elements())
+
+    def flush(self, db: Session) -> int:
+        """Write pending uses to api_keys in a single UPDATE; returns the number of uses written."""
+        with self._flush_lock:
+            return self._flush(db)
+
+    def _flush(self, db: Session) -> int:
+        counts, last_used = self.drain()
+        if not counts:
+            return 0
+        statement = (
+            update(APIKey)
+            .where(APIKey.id.in_(list(counts)))
+            .values(
+                # usage_count is nullable for rows inserted outside the ORM
+                usage_count=func.coalesce(APIKey.usage_count, 0)
+                + case(dict(counts), value=APIKey.id, else_=0),
+                last_used=case(last_used, value=APIKey.id, else_=APIKey.last_used),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            db.execute(statement)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self.restore(counts)
+            raise
+        return sum(counts.values())
@@ -1,126 +1,716 @@
 # ROO-AUDIT-TAG :: refactoring-epic-002-persistent-indexing.md :: Refactor CodebaseIndexingService to use pgvector
+import asyncio
+import hashlib
 import logging
-import httpx
-from typing import List, Dict, Optional
-from sqlalchemy.orm import Session
+import multiprocessing
+import re
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+from sqlalchemy import delete, func, insert, text, update
+from sqlalchemy.orm import Session, defer
 from pgvector.sqlalchemy import Vector
-from app.models.embedding import ProjectEmbedding
+from app.models.embedding import ProjectEmbedding, search_document
+from app.models.project_file import ProjectFile
 from app.core.config import settings
+from app.services.indexing_pipeline import IndexingPipeline
+from app.utils.code_chunker import chunk_hash, plan_chunks
+from app.utils.embedding_backends import EmbeddingBackend, create_embedding_backend
+from app.utils.embedding_cache import QueryEmbeddingCache, get_query_embedding_cache
+from app.utils.rank_fusion import reciprocal_rank_fusion
+from app.utils.vector_cache import ProjectVectorCache
 
 logger = logging.getLogger(__name__)
 
 
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+# Identifiers, paths and words; searched as alternatives (OR)
+_SEARCH_TERM = re.compile(r"[\w./-]+")
+_MAX_SEARCH_TERMS = 32
+# Dialects already warned about lacking full-text search (warned once each)
+_LEXICAL_UNSUPPORTED_WARNED = set()
+# Bound parameters per IN (...) list; SQLite allows 999 in older builds
+_MAX_IN_CLAUSE = 900
+# Files this small are chunked on the event loop: a pool round trip costs more
+_INLINE_CHUNK_MAX_CHARS = 4096
+
+
 class CodebaseIndexingService:
+    """
+    Embeds file chunks through an embedding backend (the embedding service,
+    or the local vectorizer when EMBEDDING_SERVICE_URL is unset) and stores
+    them in project_embeddings. Chunks are sent EMBEDDING_BATCH_SIZE at a
+    time, with as many batches in flight as the backend runs at once across
+    every embed_texts call and indexing pipeline of the service.
+
+    With EMBEDDING_VECTOR_CACHE_ENABLED, vector searches on hot projects run
+    against an in-memory copy of their vectors (vector_cache). Query
+    embeddings come from the process-wide query_embedding_cache when
+    EMBEDDING_QUERY_CACHE_ENABLED.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[EmbeddingBackend] = None,
+        query_embedding_cache: Optional[QueryEmbeddingCache] = None,
+    ):
+        self._backend = backend
+        self.query_embedding_cache = query_embedding_cache
+        if query_embedding_cache is None and settings.EMBEDDING_QUERY_CACHE_ENABLED:
+            self.query_embedding_cache = get_query_embedding_cache()
+        self._chunk_pool: Optional[ProcessPoolExecutor] = None
+        # Embedding batches in flight across all callers (one per event loop)
+        self._embed_slots: Optional[
+            Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]
+        ] = None
+        self.vector_cache: Optional[ProjectVectorCache] = None
+        if settings.EMBEDDING_VECTOR_CACHE_ENABLED:
+            self.vector_cache = ProjectVectorCache(
+                settings.EMBEDDING_VECTOR_CACHE_MAX_BYTES,
+                settings.EMBEDDING_VECTOR_CACHE_TTL_SECONDS,
+            )
+
+    def _get_backend(self) -> EmbeddingBackend:
+        if self._backend is None:
+            self._backend = create_embedding_backend()
+        return self._backend
+
+    def _get_chunk_pool(self) -> ProcessPoolExecutor:
+        """Worker processes that chunk files for the indexing pipeline."""
+        if self._chunk_pool is None:
+            workers = max(1, settings.EMBEDDING_PIPELINE_CHUNK_WORKERS)
+            # spawn: forking a process that runs threads can deadlock the child
+            self._chunk_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Started chunking pool with {workers} worker(s).")
+        return self._chunk_pool
+
+    def _get_embed_slots(self) -> asyncio.Semaphore:
+        """Limits embedding batches in flight to the backend's max_concurrency."""
+        loop = asyncio.get_running_loop()
+        if self._embed_slots is None or self._embed_slots[0] is not loop:
+            semaphore = asyncio.Semaphore(self._get_backend().max_concurrency)
+            self._embed_slots = (loop, semaphore)
+        return self._embed_slots[1]
+
+    async def close(self):
+        if self._backend is not None:
+            await self._backend.close()
+        if self._chunk_pool is not None:
+            self._chunk_pool.shutdown(wait=False, cancel_futures=True)
+            self._chunk_pool = None
+
+    async def _get_embeddings_from_service(
+        self, texts: List[str]
+    ) -> Optional[List[List[float]]]:
+        """Generate vectors for a batch of texts with the embedding backend"""
+        return await self._get_backend().embed(texts)
+
+    async def _embed_query(self, text: str) -> Optional[List[float]]:
+        embeddings = await self._get_embeddings_from_service([text])
+        return embeddings[0] if embeddings else None
 
     async def _get_embedding_from_service(self, text: str) -> Optional[List[float]]:
-        """Call external embedding service to generate vector"""
-        EMBEDDING_SERVICE_URL = settings.EMBEDDING_SERVICE_URL
-        if not EMBEDDING_SERVICE_URL:
-            logger.warning(
-                "EMBEDDING_SERVICE_URL is not set. Cannot generate embeddings."
+        """Embedding of a search query, through the query embedding cache"""
+        if self.query_embedding_cache is None:
+            return await self._embed_query(text)
+        return await self.query_embedding_cache.get_or_embed(
+            self._get_backend().model_name, text, self._embed_query
+        )
+
+    async def embed_texts(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed texts in batches of EMBEDDING_BATCH_SIZE, running up to the
+        backend's max_concurrency batches at once, counted together with every
+        other embed_texts call in flight. Results keep the input order; texts
+        in a failed batch get None.
+        """
+        batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+        semaphore = self._get_embed_slots()
+
+        async def embed_batch(batch: List[str]) -> List[Optional[List[float]]]:
+            async with semaphore:
+                embeddings = await self._get_embeddings_from_service(batch)
+            return embeddings or [None] * len(batch)
+
+        batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        return [embedding for batch in results for embedding in batch]
+
+    def _chunking_signature(self) -> str:
+        """
+        Identifies the chunking scheme and embedding model, so changing
+        either re-indexes every file.
+        """
+        signature = (
+            f"syntax:{settings.EMBEDDING_CHUNK_TARGET_CHARS}:"
+            f"{settings.EMBEDDING_CHUNK_OVERLAP_CHARS}"
+        )
+        model_id = self._get_backend().model_id
+        return f"{signature}:{model_id}" if model_id else signature
+
+    def _chunk_hash(self, chunk_text: str) -> str:
+        return chunk_hash(chunk_text, self._get_backend().model_id)
+
+    def _file_hash(self, content: str) -> str:
+        return _sha256(f"{self._chunking_signature()}\n{content}")
+
+    def _load_indexed_rows(
+        self, db: Session, project_id: str, file_paths: List[str]
+    ) -> Dict[str, List]:
+        """Indexed rows (id, file_path, content_hash, file_hash) of the given files, by path."""
+        rows: Dict[str, List] = defaultdict(list)
+        for i in range(0, len(file_paths), _MAX_IN_CLAUSE):
+            for row in (
+                db.query(
+                    ProjectEmbedding.id,
+                    ProjectEmbedding.file_path,
+                    ProjectEmbedding.content_hash,
+                    ProjectEmbedding.file_hash,
+                )
+                .filter(
+                    ProjectEmbedding.project_id == project_id,
+                    ProjectEmbedding.file_path.in_(file_paths[i : i + _MAX_IN_CLAUSE]),
+                )
+                .all()
+            ):
+                rows[row.file_path].append(row)
+        return rows
+
+    async def _plan_file_update(
+        self,
+        file_path: str,
+        content: str,
+        existing: List,
+        executor: Optional[Executor] = None,
+    ) -> Dict:
+        """
+        Compare a file with its indexed rows (from _load_indexed_rows). Returns
+        the chunks, which existing row ids to keep (by new chunk position) or
+        delete, and which chunk positions still need an embedding; "unchanged"
+        is True when the file hash matches and nothing needs to be done.
+
+        Chunking runs on executor (the default thread pool when None), off
+        the event loop, unless the file is under _INLINE_CHUNK_MAX_CHARS.
+        """
+        file_hash = self._file_hash(content)
+        if existing and all(row.file_hash == file_hash for row in existing):
+            return {"file_path": file_path, "file_hash": file_hash, "unchanged": True}
+
+        args = (
+            file_path,
+            content,
+            [(row.id, row.content_hash) for row in existing],
+            self._get_backend().model_id,
+            settings.EMBEDDING_CHUNK_TARGET_CHARS,
+            settings.EMBEDDING_CHUNK_OVERLAP_CHARS,
+        )
+        if len(content) <= _INLINE_CHUNK_MAX_CHARS:
+            plan = plan_chunks(*args)
+        else:
+            plan = await asyncio.get_running_loop().run_in_executor(
+                executor, plan_chunks, *args
             )
-            return None
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    EMBEDDING_SERVICE_URL, json={"text": text}, timeout=60.0
+        return {
+            "file_path": file_path,
+            "file_hash": file_hash,
+            "unchanged": False,
+            **plan,
+        }
+
+    def _write_file_updates(
+        self,
+        db: Session,
+        project_id: str,
+        plans: List[Dict],
+        embeddings: List[List[Optional[List[float]]]],
+    ) -> List[Dict]:
+        """
+        Write planned updates for a batch of files (embeddings[n] is for
+        plans[n]["to_embed"]) in one transaction: one DELETE for replaced
+        chunks, one bulk UPDATE for kept chunks and one multi-row INSERT for
+        new ones, so either all of the files' rows are replaced or none are.
+        A file's hash is only recorded when every chunk is stored, so a file
+        with failed embeddings is retried on the next re-index.
+        """
+        inserts, updates, deletes, results = [], [], [], []
+        for plan, file_embeddings in zip(plans, embeddings):
+            if plan["unchanged"]:
+                results.append(
+                    {"status": "unchanged", "embedded": 0, "kept": 0, "deleted": 0}
+                )
+                continue
+            chunks = plan["chunks"]
+            embedded = [
+                (i, vector)
+                for i, vector in zip(plan["to_embed"], file_embeddings)
+                if vector
+            ]
+            complete = len(embedded) == len(plan["to_embed"])
+            file_hash = plan["file_hash"] if complete else None
+            deletes.extend(plan["delete"])
+            for i, row_id in plan["keep"].items():
+                # Unchanged text can still move within the file
+                updates.append(
+                    {
+                        "id": row_id,
+                        "chunk_index": i,
+                        "total_chunks": len(chunks),
+                        "start_line": chunks[i]["start_line"],
+                        "end_line": chunks[i]["end_line"],
+                        "symbols": chunks[i]["symbols"],
+                        "file_hash": file_hash,
+                    }
+                )
+            for i, vector in embedded:
+                inserts.append(
+                    {
+                        "project_id": project_id,
+                        "file_path": plan["file_path"],
+                        "content_chunk": chunks[i]["text"],
+                        "chunk_index": i,
+                        "total_chunks": len(chunks),
+                        "start_line": chunks[i]["start_line"],
+                        "end_line": chunks[i]["end_line"],
+                        "symbols": chunks[i]["symbols"],
+                        "content_hash": self._chunk_hash(chunks[i]["text"]),
+                        "file_hash": file_hash,
+                        "embedding": vector,
+                    }
+                )
+            results.append(
+                {
+                    "status": "indexed" if complete else "partial",
+                    "embedded": len(embedded),
+                    "kept": len(plan["keep"]),
+                    "deleted": len(plan["delete"]),
+                }
+            )
+            if not complete:
+                logger.error(
+                    f"Failed to embed {len(plan['to_embed']) - len(embedded)} of "
+                    f"{len(chunks)} chunks for {plan['file_path']}."
                 )
-                response.raise_for_status()
-                return response.json().get("embedding")
-        except Exception as e:
-            logger.error(f"Failed to get embedding from service: {e}")
-            return None
 
-    async def _chunk_content(self, content: str, chunk_size: int = 2000) -> List[str]:
-        """Split content into manageable chunks for embedding"""
-        chunks = []
-        for i in range(0, len(content), chunk_size):
-            chunks.append(content[i : i + chunk_size])
-        return chunks
+        if not (inserts or updates or deletes):
+            return results
+        for i in range(0, len(deletes), _MAX_IN_CLAUSE):
+            db.execute(
+                delete(ProjectEmbedding).where(
+                    ProjectEmbedding.id.in_(deletes[i : i + _MAX_IN_CLAUSE])
+                )
+            )
+        if updates:
+            db.execute(update(ProjectEmbedding), updates)
+        if inserts:
+            db.execute(insert(ProjectEmbedding), inserts)
+        db.commit()
+        if self.vector_cache is not None:
+            self.vector_cache.invalidate(project_id)
+        logger.info(
+            f"Wrote {len(plans)} files for project {project_id}: "
+            f"{len(inserts)} chunks inserted, {len(updates)} kept, "
+            f"{len(deletes)} removed."
+        )
+        return results
 
     async def index_file_content(
         self, db: Session, project_id: str, file_path: str, content: str
-    ):
-        """Index content for a file in the codebase"""
+    ) -> Dict:
+        """
+        Index content for a file in the codebase. Only new or changed chunks
+        are embedded; chunks no longer in the file are removed.
+        """
         logger.info(f"Indexing content for file: {file_path} in project {project_id}")
+        existing = self._load_indexed_rows(db, project_id, [file_path])
+        plan = await self._plan_file_update(
+            file_path, content, existing.get(file_path, [])
+        )
+        embeddings = []
+        if not plan["unchanged"]:
+            embeddings = await self.embed_texts(
+                [plan["chunks"][i]["text"] for i in plan["to_embed"]]
+            )
+        return self._write_file_updates(db, project_id, [plan], [embeddings])[0]
 
-        # Chunk the content
-        chunks = await self._chunk_content(content)
-        success_count = 0
-
-        for i, chunk in enumerate(chunks):
-            embedding_vector = await self._get_embedding_from_service(chunk)
-            if embedding_vector:
-                new_embedding = ProjectEmbedding(
-                    project_id=project_id,
-                    file_path=file_path,
-                    content_chunk=chunk,
-                    chunk_index=i,
-                    total_chunks=len(chunks),
-                    embedding=embedding_vector,
+    def _set_search_params(
+        self, db: Session, ef_search: Optional[int], probes: Optional[int]
+    ):
+        """
+        Set pgvector's index search parameters for the current transaction
+        (set_config with is_local, like SET LOCAL).
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        for name, value in (("hnsw.ef_search", ef_search), ("ivfflat.probes", probes)):
+            if value is not None:
+                db.execute(
+                    text("SELECT set_config(:name, :value, true)"),
+                    {"name": name, "value": str(int(value))},
                 )
-                db.add(new_embedding)
-                success_count += 1
 
-        if success_count > 0:
-            db.commit()
-            logger.info(f"Successfully indexed {success_count} chunks for {file_path}.")
-        else:
-            logger.error(f"Failed to index any chunks for {file_path}.")
+    def _vector_rows(
+        self,
+        db: Session,
+        project_id: str,
+        query_embedding: List[float],
+        limit: int,
+        ef_search: Optional[int],
+        probes: Optional[int],
+    ) -> List:
+        """(row, L2 distance) pairs, nearest first."""
+        if self.vector_cache is not None:
+            return self._cached_vector_rows(db, project_id, query_embedding, limit)
+        self._set_search_params(db, ef_search, probes)
+        distance = ProjectEmbedding.embedding.l2_distance(query_embedding)
+        return (
+            db.query(ProjectEmbedding, distance.label("distance"))
+            .options(defer(ProjectEmbedding.embedding))
+            .filter(ProjectEmbedding.project_id == project_id)
+            .order_by(distance)
+            .limit(limit)
+            .all()
+        )
+
+    def _cached_vector_rows(
+        self, db: Session, project_id: str, query_embedding: List[float], limit: int
+    ) -> List:
+        """
+        Exact search on the project's cached vectors, loading them on a miss.
+        Rows are transient ProjectEmbedding objects built from the cache.
+        """
+        entry = self.vector_cache.get(project_id)
+        if entry is None:
+            generation = self.vector_cache.generation(project_id)
+            fields = [
+                ProjectEmbedding.id,
+                ProjectEmbedding.file_path,
+                ProjectEmbedding.content_chunk,
+                ProjectEmbedding.chunk_index,
+                ProjectEmbedding.total_chunks,
+                ProjectEmbedding.start_line,
+                ProjectEmbedding.end_line,
+                ProjectEmbedding.symbols,
+            ]
+            loaded = (
+                db.query(*fields, ProjectEmbedding.embedding)
+                .filter(
+                    ProjectEmbedding.project_id == project_id,
+                    ProjectEmbedding.embedding.isnot(None),
+                )
+                .all()
+            )
+            rows = [
+                {field.key: value for field, value in zip(fields, row)}
+                for row in loaded
+            ]
+            vectors = np.array([row[-1] for row in loaded], dtype=np.float32)
+            entry = self.vector_cache.put(project_id, rows, vectors, generation)
+            logger.info(
+                f"Loaded {len(rows)} vectors for project {project_id} into the cache."
+            )
+        return [
+            (ProjectEmbedding(**row), distance)
+            for row, distance in entry.search(query_embedding, limit)
+        ]
+
+    def _lexical_rows(
+        self, db: Session, project_id: str, query: str, limit: int
+    ) -> List:
+        """(row, ts_rank_cd) pairs for chunks matching any query term, best first."""
+        dialect = db.get_bind().dialect.name
+        if dialect != "postgresql":
+            if dialect not in _LEXICAL_UNSUPPORTED_WARNED:
+                _LEXICAL_UNSUPPORTED_WARNED.add(dialect)
+                logger.warning(
+                    f"Full-text codebase search needs PostgreSQL, not {dialect}; "
+                    f"lexical results are skipped."
+                )
+            return []
+        terms = list(dict.fromkeys(_SEARCH_TERM.findall(query)))[:_MAX_SEARCH_TERMS]
+        if not terms:
+            return []
+        tsquery = func.plainto_tsquery(text("'simple'::regconfig"), terms[0])
+        for term in terms[1:]:
+            tsquery = tsquery.op("||")(
+                func.plainto_tsquery(text("'simple'::regconfig"), term)
+            )
+        document = search_document()
+        rank = func.ts_rank_cd(document, tsquery)
+        return (
+            db.query(ProjectEmbedding, rank.label("rank"))
+            .options(defer(ProjectEmbedding.embedding))
+            .filter(
+                ProjectEmbedding.project_id == project_id,
+                document.op("@@")(tsquery),
+            )
+            .order_by(rank.desc())
+            .limit(limit)
+            .all()
+        )
+
+    def _result(
+        self,
+        row: ProjectEmbedding,
+        distance: Optional[float] = None,
+        score: Optional[float] = None,
+    ) -> Dict:
+        return {
+            "file_path": row.file_path,
+            "content_chunk": row.content_chunk,
+            "chunk_index": row.chunk_index,
+            "total_chunks": row.total_chunks,
+            "start_line": row.start_line,
+            "end_line": row.end_line,
+            "symbols": row.symbols or [],
+            # L2 distance: lower is closer; None for lexical-only matches
+            "similarity_score": float(distance) if distance is not None else None,
+            "score": score,
+        }
 
     async def query_codebase(
-        self, db: Session, project_id: str, query: str, top_k: int = 3
+        self,
+        db: Session,
+        project_id: str,
+        query: str,
+        top_k: int = 3,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        mode: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None,
+        latency_budget_ms: Optional[float] = None,
     ) -> List[Dict]:
-        """Query the codebase index for relevant code snippets"""
+        """
+        Query the codebase index for relevant code snippets.
+
+        mode is "vector" (embedding distance), "lexical" (full-text match on
+        file path and content, which catches exact identifiers and paths) or
+        "hybrid"; it defaults to EMBEDDING_SEARCH_MODE. Hybrid runs both
+        searches concurrently and merges them with reciprocal rank fusion
+        using weights (default EMBEDDING_HYBRID_WEIGHTS), fusing only what
+        finished within latency_budget_ms (default
+        EMBEDDING_HYBRID_LATENCY_BUDGET_MS). "score" is the fused score, or
+        the full-text rank in lexical mode.
+
+        ef_search (HNSW) and probes (IVFFlat) default to
+        EMBEDDING_HNSW_EF_SEARCH and EMBEDDING_IVFFLAT_PROBES. The index is
+        searched before the project filter applies, so ef_search should stay
+        well above top_k for projects holding a small share of all chunks.
+        """
         logger.info(
             f"Querying codebase for project {project_id} with query: {query[:50]}..."
         )
-        query_embedding = await self._get_embedding_from_service(query)
-        if not query_embedding:
-            return []
+        mode = mode or settings.EMBEDDING_SEARCH_MODE
+        if ef_search is None:
+            ef_search = settings.EMBEDDING_HNSW_EF_SEARCH
+        if probes is None:
+            probes = settings.EMBEDDING_IVFFLAT_PROBES
 
-        results = (
-            db.query(ProjectEmbedding)
-            .filter(ProjectEmbedding.project_id == project_id)
-            .order_by(ProjectEmbedding.embedding.l2_distance(query_embedding))
-            .limit(top_k)
-            .all()
+        if mode == "lexical":
+            rows = self._lexical_rows(db, project_id, query, top_k)
+            return [self._result(row, score=float(rank)) for row, rank in rows]
+        if mode == "vector":
+            query_embedding = await self._get_embedding_from_service(query)
+            if not query_embedding:
+                return []
+            rows = self._vector_rows(
+                db, project_id, query_embedding, top_k, ef_search, probes
+            )
+            return [self._result(row, distance=distance) for row, distance in rows]
+        if mode != "hybrid":
+            raise ValueError(f"Unknown codebase search mode: {mode}")
+        return await self._hybrid_query(
+            db,
+            project_id,
+            query,
+            top_k,
+            ef_search,
+            probes,
+            weights or settings.EMBEDDING_HYBRID_WEIGHTS,
+            (
+                latency_budget_ms
+                if latency_budget_ms is not None
+                else settings.EMBEDDING_HYBRID_LATENCY_BUDGET_MS
+            ),
         )
 
+    async def _hybrid_query(
+        self,
+        db: Session,
+        project_id: str,
+        query: str,
+        top_k: int,
+        ef_search: Optional[int],
+        probes: Optional[int],
+        weights: Dict[str, float],
+        latency_budget_ms: float,
+    ) -> List[Dict]:
+        # Each search runs in a worker thread on its own session, so the
+        # full-text query overlaps the embedding call and the vector query.
+        bind = db.get_bind()
+        candidates = max(top_k, settings.EMBEDDING_HYBRID_CANDIDATES)
+
+        def in_session(search, *args):
+            with Session(bind=bind) as session:
+                return search(session, *args)
+
+        async def vector_search():
+            query_embedding = await self._get_embedding_from_service(query)
+            if not query_embedding:
+                return []
+            return await asyncio.to_thread(
+                in_session,
+                self._vector_rows,
+                project_id,
+                query_embedding,
+                candidates,
+                ef_search,
+                probes,
+            )
+
+        tasks = {
+            "vector": asyncio.ensure_future(vector_search()),
+            "lexical": asyncio.ensure_future(
+                asyncio.to_thread(
+                    in_session, self._lexical_rows, project_id, query, candidates
+                )
+            ),
+        }
+        done, pending = await asyncio.wait(
+            tasks.values(), timeout=latency_budget_ms / 1000
+        )
+        if not done:
+            # Over budget with nothing to show: take whichever finishes first
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+        for task in pending:
+            task.cancel()
+
+        rankings, rows, distances = {}, {}, {}
+        for name, task in tasks.items():
+            if task not in done:
+                logger.warning(
+                    f"Hybrid codebase search: {name} search exceeded the "
+                    f"{latency_budget_ms:.0f}ms budget and was skipped."
+                )
+                continue
+            try:
+                results = task.result()
+            except Exception as e:
+                logger.error(f"Hybrid codebase search: {name} search failed: {e}")
+                continue
+            rankings[name] = [row.id for row, _ in results]
+            for row, value in results:
+                rows[row.id] = row
+                if name == "vector":
+                    distances[row.id] = value
+
+        fused = reciprocal_rank_fusion(
+            rankings, weights, k=settings.EMBEDDING_HYBRID_RRF_K
+        )
         return [
-            {
-                "file_path": r.file_path,
-                "content_chunk": r.content_chunk,
-                "chunk_index": r.chunk_index,
-                "total_chunks": r.total_chunks,
-                "similarity_score": float(
-                    ProjectEmbedding.embedding.l2_distance(query_embedding)
-                ),
-            }
-            for r in results
+            self._result(rows[row_id], distance=distances.get(row_id), score=score)
+            for row_id, score in fused[:top_k]
         ]
 
+    def _write_batch(
+        self, db: Session, project_id: str, batch: List[Tuple[Dict, List]]
+    ) -> List[Dict]:
+        """
+        Write (plan, embeddings) pairs in one transaction. If that fails, the
+        files are retried one by one so a single bad file does not fail the
+        rest; files that still fail are left out of the results.
+        """
+        try:
+            return self._write_file_updates(
+                db,
+                project_id,
+                [plan for plan, _ in batch],
+                [embeddings for _, embeddings in batch],
+            )
+        except Exception as e:
+            logger.error(
+                f"Failed to write a batch of {len(batch)} files, "
+                f"retrying them one by one: {e}"
+            )
+            db.rollback()
+        results = []
+        for plan, embeddings in batch:
+            try:
+                results.extend(
+                    self._write_file_updates(db, project_id, [plan], [embeddings])
+                )
+            except Exception as e:
+                logger.error(f"Failed to index {plan['file_path']}: {e}")
+                db.rollback()
+        return results
+
     async def batch_index_files(
         self, db: Session, project_id: str, files: Dict[str, str]
     ):
-        """Index multiple files in a batch"""
+        """
+        Index multiple files in a batch through the streaming pipeline
+        (app/services/indexing_pipeline.py): files are read in groups,
+        chunked, embedded in shared batches and bulk-written, with bounded
+        queues between the stages.
+        """
         logger.info(f"Batch indexing {len(files)} files for project {project_id}")
-        success_count = 0
+        return await IndexingPipeline(self, db, project_id).run(
+            list(files), lambda _, paths: {path: files[path] for path in paths}
+        )
 
-        for file_path, content in files.items():
-            try:
-                await self.index_file_content(db, project_id, file_path, content)
-                success_count += 1
-            except Exception as e:
-                logger.error(f"Failed to index {file_path}: {e}")
-                continue
+    async def reindex_project(self, db: Session, project_id: str):
+        """
+        Re-index every stored file of a project (project_files) through the
+        pipeline, reading contents a group at a time. Embeddings of files
+        that no longer exist are removed; unchanged files are skipped.
+        """
+        file_paths = [
+            file_path
+            for (file_path,) in db.query(ProjectFile.file_path)
+            .filter(ProjectFile.project_id == project_id)
+            .order_by(ProjectFile.file_path)
+        ]
+        logger.info(f"Re-indexing {len(file_paths)} files for project {project_id}")
+        current = set(file_paths)
+        removed = [
+            file_path
+            for (file_path,) in db.query(ProjectEmbedding.file_path)
+            .filter(ProjectEmbedding.project_id == project_id)
+            .distinct()
+            if file_path not in current
+        ]
+        for i in range(0, len(removed), _MAX_IN_CLAUSE):
+            db.execute(
+                delete(ProjectEmbedding).where(
+                    ProjectEmbedding.project_id == project_id,
+                    ProjectEmbedding.file_path.in_(removed[i : i + _MAX_IN_CLAUSE]),
+                )
+            )
+        db.commit()
+        if removed and self.vector_cache is not None:
+            self.vector_cache.invalidate(project_id)
 
-        return {
-            "status": "completed",
-            "project_id": project_id,
-            "total_files": len(files),
-            "success_count": success_count,
-        }
+        def load(session: Session, paths: List[str]) -> Dict[str, str]:
+            return {
+                file_path: content or ""
+                for file_path, content in session.query(
+                    ProjectFile.file_path, ProjectFile.content
+                ).filter(
+                    ProjectFile.project_id == project_id,
+                    ProjectFile.file_path.in_(paths),
+                )
+            }
+
+        result = await IndexingPipeline(self, db, project_id).run(file_paths, load)
+        result["removed_files"] = len(removed)
+        return result
 
     async def rebuild_index(self, db: Session, project_id: str):
         """Rebuild the index for a project from scratch"""
@@ -133,6 +723,8 @@ class CodebaseIndexingService:
                 .delete()
             )
             db.commit()
+            if self.vector_cache is not None:
+                self.vector_cache.invalidate(project_id)
             return {
                 "status": "rebuilt",
                 "project_id": project_id,
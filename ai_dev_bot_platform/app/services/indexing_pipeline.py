@@ -0,0 +1,265 @@
+"""
+Streaming pipeline that indexes files for CodebaseIndexingService.
+
+    read -> chunk -> embed -> write
+
+Stages are connected by bounded queues of EMBEDDING_PIPELINE_QUEUE_SIZE
+items. A slow stage fills the queue in front of it and blocks the stages
+before it, so when the embedding backend is slow, reading and chunking pause
+instead of pulling the whole project into memory.
+
+  * read  - loads EMBEDDING_PIPELINE_READ_BATCH_FILES files at a time, with
+            their indexed rows (one query per group)
+  * chunk - plans each file (chunks, kept and deleted rows) on
+            EMBEDDING_PIPELINE_CHUNK_WORKERS workers, each handing files to
+            the indexing service's pool of as many worker processes (small
+            files are chunked in place)
+  * embed - each of EMBEDDING_PIPELINE_EMBED_WORKERS workers (default: the
+            backend's max_concurrency) takes waiting plans up to about
+            EMBEDDING_BATCH_SIZE texts and embeds them together. Requests
+            wait on the service's embedding slots, so the backend never sees
+            more than its max_concurrency, whatever else is embedding.
+  * write - bulk-writes up to EMBEDDING_WRITE_BATCH_ROWS rows per
+            transaction, or whatever is waiting when its queue runs dry. One
+            worker, so transactions on the project's rows do not contend.
+
+The read and write stages run their queries in worker threads, each on its
+own session bound to the caller's engine, so the event loop keeps embedding
+while the database works.
+
+Per-stage files processed and busy time, and the depth of each queue, are
+exported as Prometheus metrics and returned with the run's results.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Callable, Dict, List, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import (
+    INDEXING_PIPELINE_BUSY_SECONDS,
+    INDEXING_PIPELINE_FILES,
+    INDEXING_PIPELINE_QUEUE_DEPTH,
+)
+
+if TYPE_CHECKING:
+    from app.services.codebase_indexing_service import CodebaseIndexingService
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("read", "chunk", "embed", "write")
+_DONE = object()
+
+
+class IndexingPipeline:
+    def __init__(
+        self, service: "CodebaseIndexingService", db: Session, project_id: str
+    ):
+        self.service = service
+        self.bind = db.get_bind()
+        self.project_id = project_id
+        self.stages = {name: {"files": 0, "busy_seconds": 0.0} for name in STAGES}
+        self.max_queue_depth: Dict[str, int] = {}
+        self._queue_depth: Dict[str, int] = {}
+        self.results: List[Dict] = []
+
+    async def run(
+        self,
+        file_paths: List[str],
+        load: Callable[[Session, List[str]], Dict[str, str]],
+    ) -> Dict:
+        """
+        Index file_paths; load(db, paths) returns {path: content} for a group
+        of them (paths it leaves out are skipped). It runs in a worker thread
+        with the read stage's session. Returns per-file results totals as
+        batch_index_files does, plus per-stage statistics.
+        """
+        queue_size = max(1, settings.EMBEDDING_PIPELINE_QUEUE_SIZE)
+        files, plans, embedded = (
+            asyncio.Queue(queue_size),
+            asyncio.Queue(queue_size),
+            asyncio.Queue(queue_size),
+        )
+        chunk_workers = max(1, settings.EMBEDDING_PIPELINE_CHUNK_WORKERS)
+        embed_workers = max(
+            1,
+            settings.EMBEDDING_PIPELINE_EMBED_WORKERS
+            or self.service._get_backend().max_concurrency,
+        )
+        started = time.perf_counter()
+        try:
+            async with asyncio.TaskGroup() as group:
+                readers = [group.create_task(self._read(file_paths, load, files))]
+                chunk_pool = self.service._get_chunk_pool()
+                chunkers = [
+                    group.create_task(self._chunk(files, plans, chunk_pool))
+                    for _ in range(chunk_workers)
+                ]
+                embedders = [
+                    group.create_task(self._embed(plans, embedded))
+                    for _ in range(embed_workers)
+                ]
+                group.create_task(self._write(embedded))
+                group.create_task(self._finish(readers, files, chunk_workers))
+                group.create_task(self._finish(chunkers, plans, embed_workers))
+                group.create_task(self._finish(embedders, embedded, 1))
+        finally:
+            # Items left behind by a failed run
+            for name, depth in self._queue_depth.items():
+                INDEXING_PIPELINE_QUEUE_DEPTH.labels(queue=name).dec(depth)
+        elapsed = time.perf_counter() - started
+
+        for stats in self.stages.values():
+            stats["files_per_second"] = (
+                stats["files"] / stats["busy_seconds"] if stats["busy_seconds"] else 0.0
+            )
+        return {
+            "status": "completed",
+            "project_id": self.project_id,
+            "total_files": len(file_paths),
+            "success_count": len(self.results),
+            "unchanged_count": sum(r["status"] == "unchanged" for r in self.results),
+            "embedded_chunks": sum(r["embedded"] for r in self.results),
+            "deleted_chunks": sum(r["deleted"] for r in self.results),
+            "elapsed_seconds": elapsed,
+            "stages": self.stages,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+    def _record(self, stage: str, files: int, started: float):
+        busy = time.perf_counter() - started
+        self.stages[stage]["files"] += files
+        self.stages[stage]["busy_seconds"] += busy
+        INDEXING_PIPELINE_FILES.labels(stage=stage).inc(files)
+        INDEXING_PIPELINE_BUSY_SECONDS.labels(stage=stage).inc(busy)
+
+    async def _put(self, queue: asyncio.Queue, name: str, item):
+        # Blocks while the queue is full: this is the backpressure
+        await queue.put(item)
+        self._queue_depth[name] = self._queue_depth.get(name, 0) + 1
+        INDEXING_PIPELINE_QUEUE_DEPTH.labels(queue=name).inc()
+        self.max_queue_depth[name] = max(
+            self.max_queue_depth.get(name, 0), queue.qsize()
+        )
+
+    def _took(self, name: str):
+        self._queue_depth[name] -= 1
+        INDEXING_PIPELINE_QUEUE_DEPTH.labels(queue=name).dec()
+
+    async def _finish(
+        self, producers: List[asyncio.Task], queue: asyncio.Queue, consumers: int
+    ):
+        """Once every producer is done, tell each consumer there is no more work."""
+        await asyncio.wait(producers)
+        if all(not task.cancelled() and task.exception() is None for task in producers):
+            for _ in range(consumers):
+                await queue.put(_DONE)
+
+    async def _read(self, file_paths: List[str], load, files: asyncio.Queue):
+        group_size = max(1, settings.EMBEDDING_PIPELINE_READ_BATCH_FILES)
+        for i in range(0, len(file_paths), group_size):
+            group = file_paths[i : i + group_size]
+            started = time.perf_counter()
+            contents, existing = await asyncio.to_thread(self._load, load, group)
+            self._record("read", len(contents), started)
+            for path in group:
+                if path in contents:
+                    await self._put(
+                        files,
+                        "files",
+                        (path, contents[path], existing.get(path, [])),
+                    )
+
+    def _load(self, load, group: List[str]):
+        with Session(bind=self.bind) as db:
+            contents = load(db, group)
+            existing = self.service._load_indexed_rows(
+                db, self.project_id, [path for path in group if path in contents]
+            )
+        return contents, existing
+
+    async def _chunk(
+        self, files: asyncio.Queue, plans: asyncio.Queue, chunk_pool: Executor
+    ):
+        while True:
+            item = await files.get()
+            if item is _DONE:
+                return
+            self._took("files")
+            file_path, content, existing = item
+            started = time.perf_counter()
+            try:
+                plan = await self.service._plan_file_update(
+                    file_path, content, existing, chunk_pool
+                )
+            except Exception as e:
+                logger.error(f"Failed to index {file_path}: {e}")
+                continue
+            self._record("chunk", 1, started)
+            await self._put(plans, "plans", plan)
+
+    async def _embed(self, plans: asyncio.Queue, embedded: asyncio.Queue):
+        batch_size = max(1, settings.EMBEDDING_BATCH_SIZE)
+        done = False
+        while not done:
+            item = await plans.get()
+            if item is _DONE:
+                return
+            self._took("plans")
+            group = [item]
+            texts = self._texts(item)
+            # Take plans that are already waiting, up to about one batch
+            while len(texts) < batch_size and not plans.empty():
+                item = plans.get_nowait()
+                if item is _DONE:
+                    done = True
+                    break
+                self._took("plans")
+                group.append(item)
+                texts += self._texts(item)
+
+            started = time.perf_counter()
+            embeddings = await self.service.embed_texts(texts) if texts else []
+            self._record("embed", len(group), started)
+            offset = 0
+            for plan in group:
+                count = len(self._texts(plan))
+                await self._put(
+                    embedded, "embedded", (plan, embeddings[offset : offset + count])
+                )
+                offset += count
+
+    def _write_batch(self, batch: List[Tuple[Dict, List]]) -> List[Dict]:
+        with Session(bind=self.bind) as db:
+            return self.service._write_batch(db, self.project_id, batch)
+
+    @staticmethod
+    def _texts(plan: Dict) -> List[str]:
+        if plan["unchanged"]:
+            return []
+        return [plan["chunks"][i]["text"] for i in plan["to_embed"]]
+
+    async def _write(self, embedded: asyncio.Queue):
+        batch: List[Tuple[Dict, List]] = []
+        rows = 0
+        while True:
+            item = await embedded.get()
+            if item is not _DONE:
+                self._took("embedded")
+                plan, _ = item
+                batch.append(item)
+                rows += 0 if plan["unchanged"] else len(plan["chunks"])
+            # Write a full batch, or what there is when nothing else is waiting
+            if batch and (
+                item is _DONE
+                or rows >= settings.EMBEDDING_WRITE_BATCH_ROWS
+                or embedded.empty()
+            ):
+                started = time.perf_counter()
+                self.results.extend(await asyncio.to_thread(self._write_batch, batch))
+                self._record("write", len(batch), started)
+                batch, rows = [], 0
+            if item is _DONE:
+                return
@@ -1,17 +1,90 @@
+import time
+from typing import Optional
 from telegram import Bot
 from app.core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Telegram rejects messages longer than 4096 characters
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
 
 class NotificationService:
     def __init__(self):
         self.bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
 
-    async def send_update(self, chat_id: int, message: str):
+    async def send_update(self, chat_id: int, message: str) -> Optional[int]:
         try:
-            await self.bot.send_message(chat_id=chat_id, text=message)
+            sent = await self.bot.send_message(chat_id=chat_id, text=message)
             logger.info(f"Sent notification to {chat_id}: {message}")
+            return sent.message_id
         except Exception as e:
             logger.error(f"Failed to send notification to {chat_id}: {e}")
+            return None
+
+    async def edit_update(self, chat_id: int, message_id: int, message: str) -> bool:
+        try:
+            await self.bot.edit_message_text(
+                chat_id=chat_id, message_id=message_id, text=message
+            )
+            return True
+        except Exception as e:
+            # 'Message is not modified' and flood-control errors land here too
+            logger.warning(f"Failed to edit message {message_id} in {chat_id}: {e}")
+            return False
+
+    def progress_message(self, chat_id: int) -> "ProgressMessage":
+        return ProgressMessage(self, chat_id)
+
+
+class ProgressMessage:
+    """
+    A single Telegram message that is edited in place as streamed output arrives.
+
+    Edits are throttled to TELEGRAM_EDIT_MIN_INTERVAL_SECONDS to stay within
+    Telegram's per-chat edit limits; the latest text is always flushed by finish().
+    """
+
+    def __init__(self, notifier: NotificationService, chat_id: int):
+        self.notifier = notifier
+        self.chat_id = chat_id
+        self.message_id: Optional[int] = None
+        self.min_interval = settings.TELEGRAM_EDIT_MIN_INTERVAL_SECONDS
+        self._header = ""
+        self._last_sent_text: Optional[str] = None
+        self._pending_text: Optional[str] = None
+        self._last_edit_at = 0.0
+
+    async def start(self, header: str):
+        self._header = header
+        self.message_id = await self.notifier.send_update(self.chat_id, header)
+        self._last_sent_text = header
+        self._last_edit_at = time.monotonic()
+
+    async def update(self, body: str):
+        self._pending_text = self._render(body)
+        if time.monotonic() - self._last_edit_at >= self.min_interval:
+            await self._flush()
+
+    async def finish(self, body: Optional[str] = None):
+        if body is not None:
+            self._pending_text = self._render(body)
+        await self._flush()
+
+    def _render(self, body: str) -> str:
+        text = f"{self._header}\n\n{body}" if body else self._header
+        if len(text) <= TELEGRAM_MAX_MESSAGE_LENGTH:
+            return text
+        # Keep the header and the most recent part of the stream
+        tail_length = TELEGRAM_MAX_MESSAGE_LENGTH - len(self._header) - 6
+        return f"{self._header}\n\n…{body[-tail_length:]}"
+
+    async def _flush(self):
+        text = self._pending_text
+        self._pending_text = None
+        if self.message_id is None or not text or text == self._last_sent_text:
+            return
+        if await self.notifier.edit_update(self.chat_id, self.message_id, text):
+            self._last_sent_text = text
+        self._last_edit_at = time.monotonic()
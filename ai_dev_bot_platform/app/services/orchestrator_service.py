@@ -7,21 +7,7 @@ import asyncio
 from typing import Optional
 from sqlalchemy.orm import Session
 from app.schemas.user import User
-from app.services.api_key_manager import APIKeyManager
-from app.utils.llm_client import LLMClient
-from app.agents.architect_agent import ArchitectAgent
-from app.agents.implementer_agent import ImplementerAgent
-from app.services.project_service import ProjectService
-from app.services.project_file_service import ProjectFileService
-from app.services.codebase_indexing_service import CodebaseIndexingService
-from app.services.billing_service import (
-    ModelPricingService,
-    APIKeyUsageService,
-    CreditTransactionService,
-)
-from app.services.user_service import UserService
-from app.services.storage_service import StorageService
-from app.services.notification_service import NotificationService
+from app.services.service_container import ServiceContainer, get_service_container
 from app.schemas.project import ProjectUpdate
 from app.core.config import settings
 from decimal import Decimal
@@ -30,21 +16,24 @@ logger = logging.getLogger(__name__)
 
 
 class OrchestratorService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, services: Optional[ServiceContainer] = None):
+        # Long-lived clients come from the application-scoped container;
+        # only the DB session is per request.
         self.db = db
-        self.api_key_manager = APIKeyManager()
-        self.llm_client = LLMClient(self.api_key_manager)
-        self.architect_agent = ArchitectAgent(self.llm_client)
-        self.implementer_agent = ImplementerAgent(self.llm_client)
-        self.project_service = ProjectService()
-        self.project_file_service = ProjectFileService()
-        self.codebase_indexing_service = CodebaseIndexingService()
-        self.model_pricing_service = ModelPricingService()
-        self.api_key_usage_service = APIKeyUsageService()
-        self.credit_transaction_service = CreditTransactionService()
-        self.storage_service = StorageService()
-        self.user_service = UserService()
-        self.notifier = NotificationService()
+        services = services or get_service_container()
+        self.api_key_manager = services.api_key_manager
+        self.llm_client = services.llm_client
+        self.architect_agent = services.architect_agent
+        self.implementer_agent = services.implementer_agent
+        self.project_service = services.project_service
+        self.project_file_service = services.project_file_service
+        self.codebase_indexing_service = services.codebase_indexing_service
+        self.model_pricing_service = services.model_pricing_service
+        self.api_key_usage_service = services.api_key_usage_service
+        self.credit_transaction_service = services.credit_transaction_service
+        self.storage_service = services.storage_service
+        self.user_service = services.user_service
+        self.notifier = services.notifier
 
     async def process_user_request(self, user: User, user_input: str) -> dict:
         """Main orchestration method that routes requests to appropriate agents"""
@@ -100,15 +89,20 @@ class OrchestratorService:
                 )
                 return
 
-            # 2. Call Architect Agent to generate the plan, docs, and TODOs
-            await self.notifier.send_update(
-                telegram_chat_id,
-                "🤖 The architect is thinking... This may take a moment.",
+            # 2. Call Architect Agent to generate the plan, docs, and TODOs.
+            # The response is streamed into a single message that is edited in place.
+            # Streaming keeps the response cache and single-flight coalescing but
+            # skips the planning hedge policy, which cannot take over a stream.
+            progress = self.notifier.progress_message(telegram_chat_id)
+            await progress.start(
+                "🤖 The architect is thinking... This may take a moment."
             )
             plan_result = await self.architect_agent.generate_initial_plan_and_docs(
                 project_requirements=project.description,
                 project_title=project.title,
+                on_progress=progress.update,
             )
+            await progress.finish()
 
             if "error" in plan_result:
                 error_msg = plan_result["error"]
@@ -4,20 +4,9 @@ import os
 from typing import Optional
 from sqlalchemy.orm import Session
 from app.schemas.user import User
-from app.services.api_key_manager import APIKeyManager
-from app.utils.llm_client import LLMClient
-from app.services.project_service import ProjectService
-from app.services.project_file_service import ProjectFileService
-from app.services.codebase_indexing_service import CodebaseIndexingService
-from app.services.billing_service import (
-    ModelPricingService,
-    APIKeyUsageService,
-    CreditTransactionService,
-)
-from app.services.user_service import UserService
-from app.services.storage_service import StorageService
-from app.services.notification_service import NotificationService
+from app.services.service_container import ServiceContainer, get_service_container
 from app.schemas.project import ProjectUpdate
+from app.schemas.api_key_schemas import APIKeyUsageCreate
 from app.core.config import settings
 from decimal import Decimal
 
@@ -25,19 +14,22 @@ logger = logging.getLogger(__name__)
 
 
 class ProjectHelpers:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, services: Optional[ServiceContainer] = None):
+        # Long-lived clients come from the application-scoped container;
+        # only the DB session is per request.
         self.db = db
-        self.api_key_manager = APIKeyManager()
-        self.llm_client = LLMClient(self.api_key_manager)
-        self.project_service = ProjectService()
-        self.project_file_service = ProjectFileService()
-        self.codebase_indexing_service = CodebaseIndexingService()
-        self.model_pricing_service = ModelPricingService()
-        self.api_key_usage_service = APIKeyUsageService()
-        self.credit_transaction_service = CreditTransactionService()
-        self.storage_service = StorageService()
-        self.user_service = UserService()
-        self.notifier = NotificationService()
+        services = services or get_service_container()
+        self.api_key_manager = services.api_key_manager
+        self.llm_client = services.llm_client
+        self.project_service = services.project_service
+        self.project_file_service = services.project_file_service
+        self.codebase_indexing_service = services.codebase_indexing_service
+        self.model_pricing_service = services.model_pricing_service
+        self.api_key_usage_service = services.api_key_usage_service
+        self.credit_transaction_service = services.credit_transaction_service
+        self.storage_service = services.storage_service
+        self.user_service = services.user_service
+        self.notifier = services.notifier
 
     async def handle_new_project(self, user: User, description: str) -> dict:
         """Handle creation of new project"""
@@ -63,7 +55,24 @@ class ProjectHelpers:
         task_type: str,
         project_id: Optional[uuid.UUID] = None,
     ):
-        """Deduct credits based on LLM usage"""
+        """
+        Deduct credits based on LLM usage.
+
+        Responses served from the LLM response cache ("cached") or shared with
+        an identical in-flight call ("coalesced") did not reach the provider:
+        no key usage is logged and their real cost is zero. Each caller is
+        still charged the response's tokens unless LLM_CHARGE_REUSED_RESPONSES
+        is off.
+        """
+        reused = "cached" if llm_response_data.get("cached") else None
+        if llm_response_data.get("coalesced"):
+            reused = "shared"
+        if reused and not settings.LLM_CHARGE_REUSED_RESPONSES:
+            logger.info(
+                f"Not charging user {user.id} for {reused} {task_type} response."
+            )
+            return
+
         model_provider = (
             "google"
             if "gemini" in llm_response_data.get("model_name_used", "").lower()
@@ -94,18 +103,31 @@ class ProjectHelpers:
             Decimal(output_tokens) / Decimal(1000000)
         ) * pricing.output_cost_per_million_tokens
 
-        # Log API usage
-        usage_log = {
-            "user_id": user.id,
-            "project_id": project_id,
-            "model_provider": model_provider,
-            "model_name": model_name_used,
-            "task_type": task_type,
-            "input_tokens_used": input_tokens,
-            "output_tokens_used": output_tokens,
-            "actual_cost_usd": actual_cost_usd,
-        }
-        api_usage_record = self.api_key_usage_service.log_usage(self.db, usage_log)
+        # Log API usage; a reused response used no key and cost nothing
+        api_key_usage_id = None
+        real_cost_usd = Decimal(0)
+        if not reused:
+            usage_log = {
+                "user_id": user.id,
+                "project_id": project_id,
+                "model_provider": model_provider,
+                "model_name": model_name_used,
+                "task_type": task_type,
+                "input_tokens_used": input_tokens,
+                "output_tokens_used": output_tokens,
+                "actual_cost_usd": actual_cost_usd,
+                "api_key_identifier": llm_response_data.get("api_key_identifier"),
+                "response_time_ms": llm_response_data.get("response_time_ms"),
+                "ttfb_ms": llm_response_data.get("ttfb_ms"),
+                "output_tokens_per_second": llm_response_data.get(
+                    "output_tokens_per_second"
+                ),
+            }
+            api_usage_record = self.api_key_usage_service.log_usage(
+                self.db, APIKeyUsageCreate(**usage_log)
+            )
+            api_key_usage_id = api_usage_record.id
+            real_cost_usd = actual_cost_usd
 
         # Calculate credits to deduct
         credits_to_deduct = (
@@ -134,11 +156,12 @@ class ProjectHelpers:
         transaction = {
             "user_id": user.id,
             "project_id": project_id,
-            "api_key_usage_id": api_usage_record.id,
+            "api_key_usage_id": api_key_usage_id,
             "transaction_type": "usage_deduction",
             "credits_amount": -credits_to_deduct,
-            "real_cost_associated_usd": actual_cost_usd,
-            "description": f"Usage for {task_type} with {model_name_used}",
+            "real_cost_associated_usd": real_cost_usd,
+            "description": f"Usage for {task_type} with {model_name_used}"
+            + (f" ({reused} response)" if reused else ""),
         }
         self.credit_transaction_service.record_transaction(self.db, transaction)
         logger.info(
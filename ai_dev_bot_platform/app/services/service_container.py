@@ -0,0 +1,71 @@
+import logging
+import threading
+from typing import Optional
+from app.agents.architect_agent import ArchitectAgent
+from app.agents.implementer_agent import ImplementerAgent
+from app.services.api_key_manager import APIKeyManager, get_api_key_manager
+from app.services.billing_service import (
+    ModelPricingService,
+    APIKeyUsageService,
+    CreditTransactionService,
+)
+from app.services.codebase_indexing_service import CodebaseIndexingService
+from app.services.notification_service import NotificationService
+from app.services.project_file_service import ProjectFileService
+from app.services.project_service import ProjectService
+from app.services.storage_service import StorageService
+from app.services.user_service import UserService
+from app.utils.llm_client import LLMClient
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Application-scoped services and long-lived clients (telegram.Bot, Supabase,
+    the LLM client). None of them hold per-request state: database sessions
+    are passed into each call, so request handlers only bind a session.
+    """
+
+    def __init__(self, api_key_manager: Optional[APIKeyManager] = None):
+        self.api_key_manager = api_key_manager or get_api_key_manager()
+        self.llm_client = LLMClient(self.api_key_manager)
+        self.architect_agent = ArchitectAgent(self.llm_client)
+        self.implementer_agent = ImplementerAgent(self.llm_client)
+        self.project_service = ProjectService()
+        self.project_file_service = ProjectFileService()
+        self.codebase_indexing_service = CodebaseIndexingService()
+        self.model_pricing_service = ModelPricingService()
+        self.api_key_usage_service = APIKeyUsageService()
+        self.credit_transaction_service = CreditTransactionService()
+        self.storage_service = StorageService()
+        self.user_service = UserService()
+        self.notifier = NotificationService()
+
+    async def close(self):
+        # A no-op unless the bot's HTTP client was initialised
+        await self.notifier.bot.shutdown()
+        await self.codebase_indexing_service.close()
+
+
+_container: Optional[ServiceContainer] = None
+_container_lock = threading.Lock()
+
+
+def get_service_container() -> ServiceContainer:
+    """Return the process-wide container, building it lazily outside the app lifespan (e.g. CLI)."""
+    global _container
+    if _container is None:
+        with _container_lock:
+            if _container is None:
+                _container = ServiceContainer()
+                logger.info("Service container created.")
+    return _container
+
+
+async def shutdown_service_container():
+    global _container
+    if _container is not None:
+        await _container.close()
+        _container = None
+        logger.info("Service container closed.")
@@ -0,0 +1,380 @@
+"""
+Structure-aware chunking of project files for embedding.
+
+Files are first cut into units along their structure, then consecutive units
+are packed into chunks of up to target_chars:
+  * Python     - top-level statements from ast; classes over the target are
+                 split into their members
+  * JS/TS      - top-level statements found by brace depth; blocks over the
+                 target are split at the next depth
+  * Markdown   - sections starting at headings (outside code fences)
+  * other text - paragraphs separated by blank lines
+
+Units over the target are split on line boundaries, and single lines over it
+by characters. Each chunk after the first repeats up to overlap_chars of
+trailing lines from the previous chunk.
+"""
+
+import ast
+import hashlib
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+PYTHON_EXTENSIONS = {".py", ".pyi"}
+BRACE_EXTENSIONS = {".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx"}
+MARKDOWN_EXTENSIONS = {".md", ".markdown"}
+
+# (first line, last line, symbol); 1-based, inclusive
+Unit = Tuple[int, int, Optional[str]]
+
+_JS_STRING_OR_COMMENT = re.compile(
+    r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`|//.*$|/\*.*?\*/"
+)
+_JS_DECLARATION = re.compile(
+    r"^\s*(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?"
+    r"(?:function\s*\*?|class|interface|type|enum|const|let|var)\s+([A-Za-z_$][\w$]*)"
+)
+_JS_MEMBER = re.compile(
+    r"^\s*(?!(?:if|for|while|switch|catch|return|else)\b)"
+    r"(?:(?:public|private|protected|static|readonly|async|get|set)\s+)*"
+    r"\*?([A-Za-z_$][\w$]*)\s*(?:\(|=|:)"
+)
+_JS_COMMENT_OR_DECORATOR = ("//", "/*", "*", "@")
+_JS_STATEMENT_ENDS = ("}", "};", ";", "})", "});", ")", ");")
+# Lines as ast counts them (str.splitlines also breaks on form feeds etc.)
+_LINE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$")
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+
+
+def chunk_source(
+    file_path: str, content: str, target_chars: int, overlap_chars: int = 0
+) -> List[Dict]:
+    """
+    Split a file into chunks of about target_chars.
+
+    Returns [{"text", "start_line", "end_line", "symbols"}, ...] where the line
+    range includes the overlap and symbols lists the functions, classes or
+    headings that start in the chunk.
+    """
+    lines = _LINE.findall(content)
+    if not lines:
+        return []
+    target_chars = max(1, target_chars)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    def size(start: int, end: int) -> int:
+        return offsets[end] - offsets[start - 1]
+
+    extension = os.path.splitext(file_path)[1].lower()
+    units = None
+    if extension in PYTHON_EXTENSIONS:
+        units = _python_units(content, lines, size, target_chars)
+    elif extension in BRACE_EXTENSIONS:
+        units = _brace_units(lines, size, target_chars)
+    elif extension in MARKDOWN_EXTENSIONS:
+        units = _markdown_units(lines)
+    if units is None:
+        units = _paragraph_units(lines)
+    return _pack(lines, units, size, target_chars, overlap_chars)
+
+
+def _python_units(
+    content: str, lines: List[str], size, target_chars: int
+) -> Optional[List[Unit]]:
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    if not tree.body:
+        return None
+    return _python_body_units(tree.body, 1, len(lines), "", lines, size, target_chars)
+
+
+def _python_body_units(
+    nodes: List[ast.stmt],
+    start: int,
+    end: int,
+    prefix: str,
+    lines: List[str],
+    size,
+    target_chars: int,
+) -> List[Unit]:
+    starts = []
+    previous = start
+    for node in nodes:
+        node_start = _node_start(node)
+        # Comments directly above a definition belong to it
+        while node_start - 1 > previous and lines[node_start - 2].lstrip().startswith(
+            "#"
+        ):
+            node_start -= 1
+        starts.append(max(node_start, previous))
+        previous = starts[-1]
+    starts[0] = start
+
+    units: List[Unit] = []
+    for i, node in enumerate(nodes):
+        unit_start = starts[i]
+        unit_end = starts[i + 1] - 1 if i + 1 < len(nodes) else end
+        if unit_end < unit_start:
+            continue
+        symbol = None
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            symbol = prefix + node.name
+        if (
+            isinstance(node, ast.ClassDef)
+            and size(unit_start, unit_end) > target_chars
+            and _node_start(node.body[0]) > unit_start
+        ):
+            members = _python_body_units(
+                node.body,
+                _node_start(node.body[0]),
+                unit_end,
+                f"{symbol}.",
+                lines,
+                size,
+                target_chars,
+            )
+            units.append((unit_start, members[0][0] - 1, symbol))
+            units.extend(members)
+        else:
+            units.append((unit_start, unit_end, symbol))
+    return units
+
+
+def _node_start(node: ast.stmt) -> int:
+    """First line of a statement, including its decorators."""
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+
+def _brace_depths(lines: List[str]) -> List[int]:
+    """Brace depth before each line (index 0 is line 1), ignoring strings and comments."""
+    depths = []
+    depth = 0
+    for line in lines:
+        depths.append(depth)
+        code = _JS_STRING_OR_COMMENT.sub("", line)
+        depth = max(0, depth + code.count("{") - code.count("}"))
+    depths.append(depth)
+    return depths
+
+
+def _brace_units(lines: List[str], size, target_chars: int) -> List[Unit]:
+    depths = _brace_depths(lines)
+    return _brace_block_units(lines, depths, 1, len(lines), 0, "", size, target_chars)
+
+
+def _brace_block_units(
+    lines: List[str],
+    depths: List[int],
+    start: int,
+    end: int,
+    base_depth: int,
+    prefix: str,
+    size,
+    target_chars: int,
+) -> List[Unit]:
+    starts = [start]
+    last_code = None
+    for number in range(start, end + 1):
+        stripped = lines[number - 1].strip()
+        if not stripped:
+            continue
+        if (
+            number > start
+            and depths[number - 1] == base_depth
+            and last_code is not None
+            and (last_code < number - 1 or _ends_statement(lines[last_code - 1]))
+        ):
+            starts.append(number)
+        last_code = number
+
+    units: List[Unit] = []
+    pattern = _JS_DECLARATION if base_depth == 0 else _JS_MEMBER
+    for i, unit_start in enumerate(starts):
+        unit_end = starts[i + 1] - 1 if i + 1 < len(starts) else end
+        symbol = None
+        for number in range(unit_start, unit_end + 1):
+            stripped = lines[number - 1].strip()
+            if not stripped or stripped.startswith(_JS_COMMENT_OR_DECORATOR):
+                continue
+            match = pattern.match(lines[number - 1])
+            if match:
+                symbol = prefix + match.group(1)
+            break
+        opening = _block_opening(depths, unit_start, unit_end, base_depth)
+        if size(unit_start, unit_end) > target_chars and opening is not None:
+            # Split the block at its members; the last line closes it
+            inner_end = unit_end
+            while inner_end > opening and depths[inner_end] != base_depth:
+                inner_end -= 1
+            members = _brace_block_units(
+                lines,
+                depths,
+                opening + 1,
+                inner_end - 1,
+                base_depth + 1,
+                f"{symbol}." if symbol else prefix,
+                size,
+                target_chars,
+            )
+            if members and members[0][0] <= members[-1][1]:
+                units.append((unit_start, opening, symbol))
+                units.extend(members)
+                units.append((inner_end, unit_end, None))
+                continue
+        units.append((unit_start, unit_end, symbol))
+    return units
+
+
+def _block_opening(
+    depths: List[int], start: int, end: int, base_depth: int
+) -> Optional[int]:
+    """The line that opens a block at base_depth + 1 and does not close it."""
+    for number in range(start, end):
+        if depths[number] > base_depth:
+            return number
+    return None
+
+
+def _ends_statement(line: str) -> bool:
+    code = _JS_STRING_OR_COMMENT.sub("", line).strip()
+    return code.endswith(_JS_STATEMENT_ENDS)
+
+
+def _markdown_units(lines: List[str]) -> List[Unit]:
+    starts: List[Tuple[int, Optional[str]]] = [(1, None)]
+    headings: List[Tuple[int, str]] = []
+    in_fence = False
+    for number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if stripped.startswith(("```", "~~~")):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _MARKDOWN_HEADING.match(stripped)
+        if match:
+            level = len(match.group(1))
+            headings = [h for h in headings if h[0] < level] + [(level, match.group(2))]
+            symbol = " > ".join(text for _, text in headings)
+            if number == 1:
+                starts[0] = (1, symbol)
+            else:
+                starts.append((number, symbol))
+    return [
+        (start, starts[i + 1][0] - 1 if i + 1 < len(starts) else len(lines), symbol)
+        for i, (start, symbol) in enumerate(starts)
+    ]
+
+
+def _paragraph_units(lines: List[str]) -> List[Unit]:
+    starts = [1]
+    for number in range(2, len(lines) + 1):
+        if not lines[number - 2].strip() and lines[number - 1].strip():
+            starts.append(number)
+    return [
+        (start, starts[i + 1] - 1 if i + 1 < len(starts) else len(lines), None)
+        for i, start in enumerate(starts)
+    ]
+
+
+def _line_windows(start: int, end: int, size, target_chars: int) -> List[Tuple]:
+    windows = []
+    window_start = start
+    for number in range(start + 1, end + 1):
+        if size(window_start, number) > target_chars:
+            windows.append((window_start, number - 1))
+            window_start = number
+    windows.append((window_start, end))
+    return windows
+
+
+def _pack(
+    lines: List[str], units: List[Unit], size, target_chars: int, overlap_chars: int
+) -> List[Dict]:
+    pieces: List[Unit] = []
+    for start, end, symbol in units:
+        if size(start, end) <= target_chars:
+            pieces.append((start, end, symbol))
+        else:
+            for i, (window_start, window_end) in enumerate(
+                _line_windows(start, end, size, target_chars)
+            ):
+                pieces.append((window_start, window_end, symbol if i == 0 else None))
+
+    spans: List[Tuple[int, int, List[str]]] = []
+    for start, end, symbol in pieces:
+        if spans and size(spans[-1][0], end) <= target_chars:
+            spans[-1] = (spans[-1][0], end, spans[-1][2])
+        else:
+            spans.append((start, end, []))
+        if symbol and symbol not in spans[-1][2]:
+            spans[-1][2].append(symbol)
+
+    chunks = []
+    previous_start = None
+    for start, end, symbols in spans:
+        chunk_start = start
+        if overlap_chars > 0 and previous_start is not None:
+            while (
+                chunk_start - 1 >= previous_start
+                and size(chunk_start - 1, start - 1) <= overlap_chars
+            ):
+                chunk_start -= 1
+        previous_start = start
+        text = "".join(lines[chunk_start - 1 : end])
+        # A single line over the target (e.g. minified code) is cut by characters
+        for offset in range(0, len(text), max(target_chars + overlap_chars, 1)):
+            chunks.append(
+                {
+                    "text": text[offset : offset + target_chars + overlap_chars],
+                    "start_line": chunk_start,
+                    "end_line": end,
+                    "symbols": list(symbols),
+                }
+            )
+    return chunks
+
+
+def chunk_hash(chunk_text: str, model_id: Optional[str] = None) -> str:
+    """Chunk text hash; with model_id, rows are only reused for vectors from the same model."""
+    value = f"{model_id}\n{chunk_text}" if model_id else chunk_text
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def plan_chunks(
+    file_path: str,
+    content: str,
+    existing: List[Tuple[Any, str]],
+    model_id: Optional[str],
+    target_chars: int,
+    overlap_chars: int = 0,
+) -> Dict:
+    """
+    Chunk a file and match the chunks with its indexed rows, given as
+    (row id, chunk hash) pairs. Returns the chunks, which row ids to keep (by
+    chunk position) or delete, and which chunk positions need an embedding.
+
+    Only depends on its arguments, so it can run in a worker process.
+    """
+    chunks = chunk_source(file_path, content, target_chars, overlap_chars)
+    ids_by_hash: Dict[str, List] = defaultdict(list)
+    for row_id, content_hash in existing:
+        ids_by_hash[content_hash].append(row_id)
+    keep: Dict[int, Any] = {}
+    to_embed: List[int] = []
+    for i, chunk in enumerate(chunks):
+        matches = ids_by_hash.get(chunk_hash(chunk["text"], model_id))
+        if matches:
+            keep[i] = matches.pop()
+        else:
+            to_embed.append(i)
+    return {
+        "chunks": chunks,
+        "keep": keep,
+        "delete": [row_id for ids in ids_by_hash.values() for row_id in ids],
+        "to_embed": to_embed,
+    }
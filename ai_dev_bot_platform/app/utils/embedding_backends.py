@@ -0,0 +1,249 @@
+"""
+Embedding backends for codebase indexing.
+
+A backend turns a batch of texts into vectors of EMBEDDING_DIMENSION, the
+size of project_embeddings.embedding:
+  * HTTPEmbeddingBackend  - the embedding service at EMBEDDING_SERVICE_URL
+                            (POST {"text": "..."} -> {"embedding": [...]}, or
+                            {"texts": [...]} -> {"embeddings": [...]} with
+                            EMBEDDING_HTTP_BATCH_REQUESTS)
+  * LocalEmbeddingBackend - a CPU-only feature-hashing vectorizer running in a
+                            process pool; needs no service or model download
+
+EMBEDDING_BACKEND picks one ("auto" uses the service when its URL is set).
+Vectors from different backends are not comparable, so each backend has a
+model_id that CodebaseIndexingService folds into its chunk and file hashes:
+switching backends re-embeds every chunk on the next re-index.
+"""
+
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+import re
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import httpx
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSION = 384
+
+# Identifiers and numbers, then the camelCase / snake_case words inside them
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+_SUBWORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+# Batches this small are hashed on the event loop: a pool round trip costs more
+_INLINE_MAX_CHARS = 4096
+
+
+class EmbeddingBackend:
+    """
+    Interface for embedding backends. embed() returns one vector per text,
+    in order, or None when the batch failed (the caller retries it on the
+    next re-index).
+    """
+
+    # Empty for the HTTP service, whose model is outside the application
+    model_id: str = ""
+
+    @property
+    def model_name(self) -> str:
+        """Identifies the model for caches of its vectors."""
+        return self.model_id
+
+    @property
+    def max_concurrency(self) -> int:
+        """Batches worth running at once."""
+        return 1
+
+    async def embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class HTTPEmbeddingBackend(EmbeddingBackend):
+    """
+    Calls the embedding service on one pooled HTTP client, sized to
+    EMBEDDING_MAX_CONCURRENT_BATCHES, that lives as long as the backend.
+    By default each text is its own request; with batch_requests (default
+    EMBEDDING_HTTP_BATCH_REQUESTS) a batch is sent in one request.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        http_client: Optional[httpx.AsyncClient] = None,
+        batch_requests: Optional[bool] = None,
+    ):
+        self.url = url
+        self._http_client = http_client
+        self.batch_requests = (
+            settings.EMBEDDING_HTTP_BATCH_REQUESTS
+            if batch_requests is None
+            else batch_requests
+        )
+
+    @property
+    def model_name(self) -> str:
+        return f"http:{self.url}"
+
+    @property
+    def max_concurrency(self) -> int:
+        return max(1, settings.EMBEDDING_MAX_CONCURRENT_BATCHES)
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=settings.EMBEDDING_HTTP_TIMEOUT_SECONDS,
+            )
+        return self._http_client
+
+    async def embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        try:
+            if not self.batch_requests:
+                # Texts of a batch go one after another; batches run concurrently
+                return [await self._embed_one(text) for text in texts]
+            response = await self._get_http_client().post(
+                self.url, json={"texts": texts}
+            )
+            response.raise_for_status()
+            embeddings = response.json().get("embeddings")
+            if not embeddings or len(embeddings) != len(texts):
+                raise ValueError(
+                    f"expected {len(texts)} embeddings, got {len(embeddings or [])}"
+                )
+            return embeddings
+        except Exception as e:
+            logger.error(
+                f"Failed to get embeddings for {len(texts)} texts from service: {e}"
+            )
+            return None
+
+    async def _embed_one(self, text: str) -> List[float]:
+        response = await self._get_http_client().post(self.url, json={"text": text})
+        response.raise_for_status()
+        embedding = response.json().get("embedding")
+        if not embedding:
+            raise ValueError("no embedding in the response")
+        return embedding
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+def hashing_embeddings(texts: List[str], dimension: int) -> np.ndarray:
+    """
+    Unit vectors from signed feature hashing, a sparse random projection of
+    each text's bag of identifiers and the words inside them (getUserName ->
+    getusername, get, user, name) with log-scaled counts. Texts sharing
+    identifiers end up close in L2 distance. Deterministic across processes
+    (crc32, not the salted built-in hash). Returns a float32 array of shape
+    (len(texts), dimension).
+    """
+    rows, buckets, weights = [], [], []
+    hashes = {}
+    for row, text in enumerate(texts):
+        features = Counter()
+        for identifier in _IDENTIFIER.findall(text):
+            features[identifier.lower()] += 1
+            words = _SUBWORD.findall(identifier)
+            if len(words) > 1:
+                features.update(word.lower() for word in words)
+        for feature, count in features.items():
+            h = hashes.get(feature)
+            if h is None:
+                h = hashes[feature] = zlib.crc32(feature.encode("utf-8"))
+            rows.append(row)
+            buckets.append(h % dimension)
+            weights.append((1.0 + math.log(count)) * (1.0 if h & 0x80000000 else -1.0))
+
+    vectors = np.zeros((len(texts), dimension), dtype=np.float32)
+    np.add.at(
+        vectors,
+        (np.array(rows, dtype=np.intp), np.array(buckets, dtype=np.intp)),
+        weights,
+    )
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    Embeds with hashing_embeddings in a process pool (EMBEDDING_LOCAL_WORKERS
+    processes, default one per CPU), so large batches neither block the event
+    loop nor hold the GIL. The pool is started on first use and shut down by
+    close().
+    """
+
+    def __init__(
+        self, workers: Optional[int] = None, dimension: int = EMBEDDING_DIMENSION
+    ):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.dimension = dimension
+        self.model_id = f"local-hashing-v1:{dimension}"
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.workers
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs threads (asyncio.to_thread,
+            # DB drivers) can deadlock the child
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Started local embedding pool with {self.workers} worker(s).")
+        return self._pool
+
+    async def embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        try:
+            if sum(len(text) for text in texts) <= _INLINE_MAX_CHARS:
+                vectors = hashing_embeddings(texts, self.dimension)
+            else:
+                vectors = await asyncio.get_running_loop().run_in_executor(
+                    self._get_pool(), hashing_embeddings, texts, self.dimension
+                )
+            return vectors.tolist()
+        except Exception as e:
+            logger.error(f"Failed to embed {len(texts)} texts locally: {e}")
+            return None
+
+    async def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def create_embedding_backend(name: Optional[str] = None) -> EmbeddingBackend:
+    """Build the backend named by EMBEDDING_BACKEND ("auto", "http" or "local")."""
+    name = name or settings.EMBEDDING_BACKEND
+    if name == "auto":
+        name = "http" if settings.EMBEDDING_SERVICE_URL else "local"
+    if name == "http":
+        if not settings.EMBEDDING_SERVICE_URL:
+            raise ValueError(
+                "EMBEDDING_BACKEND is 'http' but EMBEDDING_SERVICE_URL is not set"
+            )
+        return HTTPEmbeddingBackend(settings.EMBEDDING_SERVICE_URL)
+    if name == "local":
+        return LocalEmbeddingBackend(settings.EMBEDDING_LOCAL_WORKERS)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {name}")
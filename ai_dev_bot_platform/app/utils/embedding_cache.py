@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from typing import Awaitable, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.metrics import (
+    EMBEDDING_QUERY_CACHE_REQUESTS,
+    EMBEDDING_QUERY_CALLS_AVOIDED,
+)
+from app.utils.llm_cache import MemoryCacheTier
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """NFKC, case-folded, with runs of whitespace collapsed and the ends trimmed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+
+
+def make_query_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(
+        f"{model_name}\n{normalize_query(text)}".encode("utf-8")
+    ).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """
+    LRU+TTL cache of query embeddings keyed by embedding model and normalised
+    query text. Concurrent misses for the same key share one embedding call.
+    Failed embeddings (None) are not cached.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.memory = MemoryCacheTier(max_entries)
+        self._single_flight = SingleFlight()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_embed(
+        self,
+        model_name: str,
+        text: str,
+        embed: Callable[[str], Awaitable[Optional[List[float]]]],
+    ) -> Optional[List[float]]:
+        key = make_query_key(model_name, text)
+        with self._lock:
+            cached = self.memory.get(key)
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            EMBEDDING_QUERY_CACHE_REQUESTS.labels(result="hit").inc()
+            EMBEDDING_QUERY_CALLS_AVOIDED.labels(reason="cache").inc()
+            return cached["embedding"]
+        EMBEDDING_QUERY_CACHE_REQUESTS.labels(result="miss").inc()
+
+        async def fetch():
+            embedding = await embed(text)
+            if embedding:
+                with self._lock:
+                    self.memory.set(
+                        key, {"embedding": embedding}, time.time() + self.ttl_seconds
+                    )
+            return embedding
+
+        embedding, shared = await self._single_flight.do(key, fetch)
+        if shared:
+            with self._lock:
+                self.coalesced += 1
+            EMBEDDING_QUERY_CALLS_AVOIDED.labels(reason="coalesced").inc()
+        return embedding
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.memory),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "calls_avoided": self.hits + self.coalesced,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_query_embedding_cache: Optional[QueryEmbeddingCache] = None
+_query_embedding_cache_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """The process-wide cache, so every service embedding queries shares it."""
+    global _query_embedding_cache
+    if _query_embedding_cache is None:
+        with _query_embedding_cache_lock:
+            if _query_embedding_cache is None:
+                _query_embedding_cache = QueryEmbeddingCache(
+                    max_entries=settings.EMBEDDING_QUERY_CACHE_MAX_ENTRIES,
+                    ttl_seconds=settings.EMBEDDING_QUERY_CACHE_TTL_SECONDS,
+                )
+    return _query_embedding_cache
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+import google.ai.generativelanguage as glm
+from app.core.config import settings
+from app.utils.rate_limiter import key_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiResponse:
+    """Text, token usage and block reason of a GenerateContentResponse (or stream chunk)."""
+
+    def __init__(self, response: glm.GenerateContentResponse):
+        self.raw = response
+        candidates = response.candidates
+        self.parts = (
+            [part.text for part in candidates[0].content.parts if part.text]
+            if candidates
+            else []
+        )
+        self.text = "".join(self.parts)
+        self.usage_metadata = response.usage_metadata
+        self.prompt_feedback = response.prompt_feedback
+
+
+class _KeyClients:
+    """
+    The generative service client of one API key, and how many calls are
+    using it. The async (gRPC) client is used unless a REST endpoint
+    override is set, which only the sync client supports.
+    """
+
+    def __init__(self, client, is_async: bool):
+        self.client = client
+        self.is_async = is_async
+        self.in_flight = 0
+        self.evicted = False
+
+    async def call(self, method: str, request):
+        if self.is_async:
+            return await getattr(self.client, method)(request)
+        return await asyncio.to_thread(getattr(self.client, method), request)
+
+    async def release(self):
+        self.in_flight -= 1
+        if self.evicted and self.in_flight == 0:
+            await self.close()
+
+    async def close(self):
+        closed = self.client.transport.close()
+        if asyncio.iscoroutine(closed):
+            await closed
+
+
+class GeminiModel:
+    """A Gemini model bound to one API key's client."""
+
+    def __init__(self, model_name: str, clients: _KeyClients):
+        self.model_name = (
+            model_name if model_name.startswith("models/") else f"models/{model_name}"
+        )
+        self._clients = clients
+
+    @property
+    def client(self):
+        return self._clients.client
+
+    def _request(
+        self, prompt: str, params: Optional[Dict[str, Any]] = None
+    ) -> glm.GenerateContentRequest:
+        # params are GenerationConfig fields (temperature, max_output_tokens, ...)
+        return glm.GenerateContentRequest(
+            model=self.model_name,
+            contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+            generation_config=glm.GenerationConfig(**params) if params else None,
+        )
+
+    async def generate(
+        self, prompt: str, params: Optional[Dict[str, Any]] = None
+    ) -> GeminiResponse:
+        self._clients.in_flight += 1
+        try:
+            response = await self._clients.call(
+                "generate_content", self._request(prompt, params)
+            )
+        finally:
+            await self._clients.release()
+        return GeminiResponse(response)
+
+    async def stream(
+        self, prompt: str, params: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[GeminiResponse]:
+        """
+        Send a streamed request and return its chunks. The client stays in use
+        until the returned iterator is exhausted or closed.
+        """
+        self._clients.in_flight += 1
+        try:
+            responses = await self._clients.call(
+                "stream_generate_content", self._request(prompt, params)
+            )
+        except BaseException:
+            await self._clients.release()
+            raise
+        return self._iterate(responses)
+
+    async def _iterate(self, responses) -> AsyncIterator[GeminiResponse]:
+        try:
+            if hasattr(responses, "__aiter__"):
+                async for response in responses:
+                    yield GeminiResponse(response)
+                return
+            iterator = iter(responses)
+            while True:
+                response = await asyncio.to_thread(next, iterator, None)
+                if response is None:
+                    return
+                yield GeminiResponse(response)
+        finally:
+            await self._clients.release()
+
+
+class GeminiClientCache:
+    """
+    Gemini service clients per API key and model handles per (key, model),
+    so calls on different keys run in parallel instead of all going through
+    the SDK's single global configuration.
+
+    Both maps are LRU-bounded. Evicting a key drops its model handles and
+    closes its client once the last in-flight call on it is done.
+    """
+
+    def __init__(self, max_keys: int, max_models: int):
+        self.max_keys = max_keys
+        self.max_models = max_models
+        self._clients: "OrderedDict[str, _KeyClients]" = OrderedDict()
+        self._models: "OrderedDict[Tuple[str, str], GeminiModel]" = OrderedDict()
+        self._closing: Set[asyncio.Task] = set()
+
+    def _build_clients(self, api_key: str) -> _KeyClients:
+        client_options = {"api_key": api_key}
+        if settings.GEMINI_API_ENDPOINT:
+            client_options["api_endpoint"] = settings.GEMINI_API_ENDPOINT
+            clients = _KeyClients(
+                glm.GenerativeServiceClient(
+                    client_options=client_options, transport="rest"
+                ),
+                is_async=False,
+            )
+        else:
+            clients = _KeyClients(
+                glm.GenerativeServiceAsyncClient(client_options=client_options),
+                is_async=True,
+            )
+        logger.info(f"Created Gemini client for key {key_fingerprint(api_key)}.")
+        return clients
+
+    def _evict(self, api_key: str, clients: _KeyClients):
+        for model_key in [k for k in self._models if k[0] == api_key]:
+            del self._models[model_key]
+        clients.evicted = True
+        if clients.in_flight:
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(clients.close())
+        except RuntimeError:
+            # No loop to close a gRPC channel on; it is released with the client
+            return
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def clients(self, api_key: str) -> _KeyClients:
+        clients = self._clients.get(api_key)
+        if clients is None:
+            clients = self._clients[api_key] = self._build_clients(api_key)
+            while len(self._clients) > self.max_keys:
+                self._evict(*self._clients.popitem(last=False))
+        self._clients.move_to_end(api_key)
+        return clients
+
+    def model(self, api_key: str, model_name: str) -> GeminiModel:
+        """A GeminiModel bound to this key's client."""
+        clients = self.clients(api_key)
+        model = self._models.get((api_key, model_name))
+        if model is None:
+            model = GeminiModel(model_name, clients)
+            self._models[(api_key, model_name)] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        self._models.move_to_end((api_key, model_name))
+        return model
+
+    async def close(self):
+        """Close every client; called on shutdown."""
+        clients, self._clients = list(self._clients.values()), OrderedDict()
+        self._models.clear()
+        for key_clients in clients:
+            try:
+                await key_clients.close()
+            except Exception as e:
+                logger.warning(f"Failed to close a Gemini client: {e}")
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    def __len__(self):
+        return len(self._models)
+
+
+def build_gemini_client_cache_from_settings() -> GeminiClientCache:
+    return GeminiClientCache(
+        max_keys=settings.GEMINI_CLIENT_CACHE_MAX_KEYS,
+        max_models=settings.GEMINI_MODEL_CACHE_MAX_ENTRIES,
+    )
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def is_error_response(response: dict) -> bool:
+    return response.get("text_response", "").startswith("Error")
+
+
+class LatencyTracker:
+    """
+    Rolling window of call latencies per model.
+
+    Calls that were cancelled before finishing (a losing hedge attempt, or the
+    caller went away) are recorded as censored: they only show the call took
+    at least that long. Dropping them would leave just the calls that beat
+    the hedge, and the percentile would drift down with every hedge.
+    """
+
+    def __init__(self, window_size: int, min_samples: int):
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[Tuple[float, bool]]] = {}
+
+    def record(self, model_name: str, seconds: float, censored: bool = False):
+        samples = self._samples.get(model_name)
+        if samples is None:
+            samples = self._samples[model_name] = deque(maxlen=self.window_size)
+        samples.append((seconds, censored))
+
+    def percentile(self, model_name: str, percentile: float) -> Optional[float]:
+        """
+        Latency at `percentile` (0-1), or None until min_samples are seen.
+
+        Uses the Kaplan-Meier estimate so censored samples count as "still
+        running" up to their time. If too many calls were cut short to reach
+        the percentile, returns the longest time seen as a lower bound.
+        """
+        samples = self._samples.get(model_name)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        # Finished calls sort before censored ones at the same time
+        ordered = sorted(samples)
+        at_risk = len(ordered)
+        survival = 1.0
+        for seconds, censored in ordered:
+            if not censored:
+                survival *= 1 - 1 / at_risk
+                if survival <= 1 - percentile + 1e-9:
+                    return seconds
+            at_risk -= 1
+        return ordered[-1][0]
+
+
+class HedgeBudget:
+    """
+    Caps the share of calls that may fire a hedge. Each call under a hedge
+    policy earns `max_share` of a hedge, up to `burst` saved hedges, and
+    each hedge spends one.
+    """
+
+    def __init__(self, max_share: float, burst: float):
+        self.max_share = max_share
+        self.burst = burst
+        self._balance = 0.0
+
+    def on_call(self):
+        self._balance = min(self.burst, self._balance + self.max_share)
+
+    def try_spend(self) -> bool:
+        if self._balance < 1:
+            return False
+        self._balance -= 1
+        return True
+
+
+def get_hedge_policy(task_type: Optional[str]) -> Optional[dict]:
+    """Return the enabled hedge policy for a task type, if any."""
+    if not task_type:
+        return None
+    policy = settings.LLM_HEDGE_POLICIES.get(task_type)
+    if not policy or not policy.get("enabled"):
+        return None
+    return policy
+
+
+async def run_hedged(
+    primary: Callable[[], Awaitable[dict]],
+    hedge: Callable[[], Optional[Awaitable[dict]]],
+    delay_seconds: float,
+) -> Tuple[dict, str]:
+    """
+    Start `primary`; if it has not finished after `delay_seconds`, call
+    `hedge` to start a second attempt. `hedge` may return None instead (no
+    other key or model to try, or the hedge budget is spent), and then the
+    primary's result is returned. The first successful response wins and the
+    other attempt is cancelled, so only the winner's tokens are ever reported.
+
+    Returns (response, outcome) where outcome is one of "not_hedged",
+    "hedge_skipped", "primary_won", "hedge_won" or "both_failed".
+    """
+    primary_task = asyncio.ensure_future(primary())
+    attempts: Dict[asyncio.Task, str] = {primary_task: "primary"}
+    try:
+        done, pending = await asyncio.wait(attempts, timeout=delay_seconds)
+        if done:
+            return primary_task.result(), "not_hedged"
+
+        hedge_attempt = hedge()
+        if hedge_attempt is None:
+            return await primary_task, "hedge_skipped"
+        attempts[asyncio.ensure_future(hedge_attempt)] = "hedge"
+        pending = set(attempts)
+        first_error = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                response = task.result()
+                if not is_error_response(response):
+                    return response, f"{attempts[task]}_won"
+                first_error = first_error or response
+        return first_error, "both_failed"
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
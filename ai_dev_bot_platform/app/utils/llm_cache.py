@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import LLM_CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    model_name: str, prompt: str, system_prompt: str = None, params: dict = None
+) -> str:
+    """Content address of an LLM request: sha256 over model, prompts and params."""
+    material = json.dumps(
+        {
+            "model": model_name,
+            "system_prompt": system_prompt or "",
+            "prompt": prompt,
+            "params": params or {},
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheTier:
+    """Size-bounded LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: dict, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheTier:
+    """On-disk tier. Evicts least recently used rows once max_entries is exceeded."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[float, dict]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return row[1], json.loads(row[0])
+
+    def set(self, key: str, value: dict, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, time.time()),
+            )
+            self._conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LLMResponseCache:
+    """
+    Two-tier (memory LRU -> SQLite) cache of successful LLM responses.
+    Disk hits are promoted to the memory tier.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        memory_max_entries: int,
+        sqlite_path: Optional[str] = None,
+        sqlite_max_entries: int = 0,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.memory = MemoryCacheTier(memory_max_entries)
+        self.disk: Optional[SQLiteCacheTier] = None
+        if sqlite_path:
+            try:
+                self.disk = SQLiteCacheTier(sqlite_path, sqlite_max_entries)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open LLM cache at {sqlite_path}: {e}")
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self.memory.get(key)
+        if value is not None:
+            LLM_CACHE_REQUESTS.labels(tier="memory", result="hit").inc()
+            return value
+        LLM_CACHE_REQUESTS.labels(tier="memory", result="miss").inc()
+
+        if self.disk is None:
+            return None
+        try:
+            entry = await asyncio.to_thread(self.disk.get, key)
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache disk read failed: {e}")
+            entry = None
+        if entry is None:
+            LLM_CACHE_REQUESTS.labels(tier="disk", result="miss").inc()
+            return None
+        LLM_CACHE_REQUESTS.labels(tier="disk", result="hit").inc()
+        expires_at, value = entry
+        self.memory.set(key, value, expires_at)
+        return value
+
+    async def set(self, key: str, value: dict):
+        expires_at = time.time() + self.ttl_seconds
+        self.memory.set(key, value, expires_at)
+        if self.disk is None:
+            return
+        try:
+            await asyncio.to_thread(self.disk.set, key, value, expires_at)
+        except sqlite3.Error as e:
+            logger.error(f"LLM cache disk write failed: {e}")
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+def build_llm_cache_from_settings() -> LLMResponseCache:
+    return LLMResponseCache(
+        ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+        memory_max_entries=settings.LLM_CACHE_MEMORY_MAX_ENTRIES,
+        sqlite_path=settings.LLM_CACHE_SQLITE_PATH,
+        sqlite_max_entries=settings.LLM_CACHE_DISK_MAX_ENTRIES,
+    )
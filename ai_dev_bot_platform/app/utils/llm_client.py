@@ -1,52 +1,675 @@
+import asyncio
+import json
 import logging
+import time
+import importlib.util
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    TYPE_CHECKING,
+)
 import httpx
-import google.generativeai as genai
-from app.services.api_key_manager import APIKeyManager
 from app.core.config import settings
+from app.utils.gemini_clients import (
+    GeminiClientCache,
+    build_gemini_client_cache_from_settings,
+)
+from app.utils.llm_cache import (
+    LLMResponseCache,
+    build_llm_cache_from_settings,
+    make_cache_key,
+)
+from app.core.metrics import (
+    LLM_COALESCED_REQUESTS,
+    LLM_HEDGED_REQUESTS,
+    LLM_OUTPUT_TOKENS_PER_SECOND,
+    LLM_REQUEST_DURATION_SECONDS,
+    LLM_TIME_TO_FIRST_BYTE_SECONDS,
+    LLM_TOKEN_ESTIMATE_RATIO,
+)
+from app.utils.hedging import (
+    HedgeBudget,
+    LatencyTracker,
+    get_hedge_policy,
+    is_error_response,
+    run_hedged,
+)
+from app.utils.rate_limiter import (
+    LLMRateLimiter,
+    build_rate_limiter_from_settings,
+    key_fingerprint,
+)
+from app.utils.single_flight import SingleFlight
+from app.utils.token_budget import estimate_tokens, model_family
+
+if TYPE_CHECKING:
+    # Imported for annotations only: app.services imports this module.
+    from app.services.api_key_manager import APIKeyManager
 
 logger = logging.getLogger(__name__)
 
 
+def _estimate_tokens(model_name: str, *texts: Optional[str]) -> int:
+    # Offline pre-call estimate; rate limits are corrected with real usage afterwards
+    return sum(estimate_tokens(text, model_name) for text in texts)
+
+
+def _call_timings(key_result: dict, api_key: str, output_tokens: int) -> dict:
+    """Wall-clock time, time to first byte and output throughput of a provider call."""
+    elapsed = time.monotonic() - key_result["started_at"]
+    return {
+        "response_time_ms": int(elapsed * 1000),
+        "ttfb_ms": int((key_result["first_byte_at"] - key_result["started_at"]) * 1000),
+        "output_tokens_per_second": output_tokens / elapsed if elapsed > 0 else 0.0,
+        "api_key_identifier": key_fingerprint(api_key),
+    }
+
+
+# Fields that describe one provider call, not the response; kept out of the cache
+_PER_CALL_FIELDS = (
+    "response_time_ms",
+    "ttfb_ms",
+    "output_tokens_per_second",
+    "api_key_identifier",
+)
+
+
+def _cacheable(response: dict) -> dict:
+    return {k: v for k, v in response.items() if k not in _PER_CALL_FIELDS}
+
+
+def _observe_call_timings(response: dict, task_type: Optional[str]):
+    if "response_time_ms" not in response:
+        return
+    model_name = response["model_name_used"]
+    labels = {
+        "provider": "openrouter" if "/" in model_name else "google",
+        "model": model_name,
+        "task_type": task_type or "unspecified",
+    }
+    LLM_REQUEST_DURATION_SECONDS.labels(**labels).observe(
+        response["response_time_ms"] / 1000
+    )
+    LLM_TIME_TO_FIRST_BYTE_SECONDS.labels(**labels).observe(response["ttfb_ms"] / 1000)
+    LLM_OUTPUT_TOKENS_PER_SECOND.labels(**labels).observe(
+        response["output_tokens_per_second"]
+    )
+
+
+def _error_status_code(error: Exception) -> Optional[int]:
+    """HTTP status carried by a provider exception, or None for transport errors."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code
+    # google.api_core exceptions expose the HTTP status as .code
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def _provider_for(model_name: str) -> str:
+    # Simple routing logic: if model name contains '/', assume it's for OpenRouter.
+    # Otherwise, assume it's a Gemini model.
+    return "openrouter" if "/" in model_name else "google"
+
+
 class LLMClient:
-    def __init__(self, api_key_manager: APIKeyManager):
+    # Process-wide pooled HTTP client shared by every LLMClient instance.
+    # Created in the FastAPI lifespan (see main.py) and closed on shutdown.
+    _http_client: Optional[httpx.AsyncClient] = None
+    # Process-wide response cache, built on first use when caching is requested.
+    _response_cache: Optional[LLMResponseCache] = None
+    # Process-wide RPM/TPM limits and in-flight cap shared by all provider calls.
+    _rate_limiter: Optional[LLMRateLimiter] = None
+    # Observed per-model latencies, used to decide when to hedge a slow call.
+    _latency_tracker: Optional[LatencyTracker] = None
+    # Caps how many of the calls under a hedge policy may fire a hedge.
+    _hedge_budget: Optional[HedgeBudget] = None
+    # In-flight identical requests (same cache key) share one upstream call.
+    _single_flight: Optional[SingleFlight] = None
+    # Gemini clients per API key and model handles per (key, model).
+    _gemini_clients: Optional[GeminiClientCache] = None
+
+    @classmethod
+    def _build_http_client(cls) -> httpx.AsyncClient:
+        # HTTP/2 requires the optional 'h2' package (httpx[http2])
+        http2_enabled = (
+            settings.LLM_HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+        )
+        if settings.LLM_HTTP2_ENABLED and not http2_enabled:
+            logger.warning(
+                "HTTP/2 requested but 'h2' is not installed. Using HTTP/1.1."
+            )
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        return httpx.AsyncClient(
+            http2=http2_enabled,
+            limits=limits,
+            timeout=settings.LLM_HTTP_TIMEOUT_SECONDS,
+        )
+
+    @classmethod
+    async def startup(cls):
+        """Create the shared HTTP client. Called once on application startup."""
+        if cls._http_client is None or cls._http_client.is_closed:
+            cls._http_client = cls._build_http_client()
+            logger.info("Shared LLM HTTP client created.")
+
+    @classmethod
+    async def shutdown(cls):
+        """Release process-wide client state. Called once on application shutdown."""
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
+            logger.info("Shared LLM HTTP client closed.")
+        if cls._response_cache is not None:
+            cls._response_cache.close()
+            cls._response_cache = None
+        # Limiter locks and in-flight tasks are bound to the running event loop
+        cls._rate_limiter = None
+        cls._single_flight = None
+        if cls._gemini_clients is not None:
+            await cls._gemini_clients.close()
+            cls._gemini_clients = None
+
+    @classmethod
+    def get_response_cache(cls) -> LLMResponseCache:
+        if cls._response_cache is None:
+            cls._response_cache = build_llm_cache_from_settings()
+        return cls._response_cache
+
+    @classmethod
+    def get_rate_limiter(cls) -> LLMRateLimiter:
+        if cls._rate_limiter is None:
+            cls._rate_limiter = build_rate_limiter_from_settings()
+        return cls._rate_limiter
+
+    @classmethod
+    def get_single_flight(cls) -> SingleFlight:
+        if cls._single_flight is None:
+            cls._single_flight = SingleFlight()
+        return cls._single_flight
+
+    @classmethod
+    def get_gemini_clients(cls) -> GeminiClientCache:
+        if cls._gemini_clients is None:
+            cls._gemini_clients = build_gemini_client_cache_from_settings()
+        return cls._gemini_clients
+
+    @classmethod
+    def get_latency_tracker(cls) -> LatencyTracker:
+        if cls._latency_tracker is None:
+            cls._latency_tracker = LatencyTracker(
+                window_size=settings.LLM_LATENCY_WINDOW_SIZE,
+                min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+            )
+        return cls._latency_tracker
+
+    @classmethod
+    def get_hedge_budget(cls) -> HedgeBudget:
+        if cls._hedge_budget is None:
+            cls._hedge_budget = HedgeBudget(
+                max_share=settings.LLM_HEDGE_MAX_SHARE,
+                burst=settings.LLM_HEDGE_BUDGET_BURST,
+            )
+        return cls._hedge_budget
+
+    @classmethod
+    def get_http_client(cls) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it lazily outside the app lifespan (e.g. CLI)."""
+        if cls._http_client is None or cls._http_client.is_closed:
+            cls._http_client = cls._build_http_client()
+        return cls._http_client
+
+    @asynccontextmanager
+    async def _track_key_result(self, provider: str, api_key: str):
+        """
+        Report the outcome and latency of a provider request to the key manager.
+        The body sets result["status_code"] when it receives an HTTP response,
+        and result["first_byte_at"] when the first bytes of a stream arrive;
+        otherwise the end of the block counts as the first byte.
+        """
+        started_at = time.monotonic()
+        result = {"status_code": 200, "started_at": started_at, "first_byte_at": None}
+        try:
+            yield result
+        except Exception as e:
+            self.api_key_manager.report_key_result(
+                provider, api_key, _error_status_code(e), time.monotonic() - started_at
+            )
+            raise
+        if result["first_byte_at"] is None:
+            result["first_byte_at"] = time.monotonic()
+        self.api_key_manager.report_key_result(
+            provider, api_key, result["status_code"], time.monotonic() - started_at
+        )
+
+    def __init__(self, api_key_manager: "APIKeyManager"):
         self.api_key_manager = api_key_manager
-        self.google_api_key_configured = False
-        google_key = self.api_key_manager.get_next_key("google")
-        if google_key:
-            try:
-                genai.configure(api_key=google_key)
-                self.google_api_key_configured = True
-                logger.info("Google Gemini API configured.")
-            except Exception as e:
-                logger.error(f"Failed to configure Google Gemini API: {e}")
-        else:
-            logger.warning("Google API key not found in APIKeyManager for LLMClient.")
 
     async def call_llm(
-        self, model_name: str, prompt: str, system_prompt: str = None
+        self,
+        model_name: str,
+        prompt: str,
+        system_prompt: str = None,
+        use_cache: Optional[bool] = None,
+        task_type: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
     ) -> dict:
         """
         Routes the LLM call to the appropriate provider based on the model name.
+
+        params are generation parameters in the provider's own names, sent with
+        the request: merged into the OpenRouter body (temperature, max_tokens,
+        ...) or used as the Gemini GenerationConfig (temperature,
+        max_output_tokens, ...).
+
+        Successful responses are cached when use_cache is True, or when it is None
+        and LLM_CACHE_ENABLED is set; pass use_cache=False to bypass the cache.
+        The key covers the model, both prompts and params. Cache hits carry
+        "cached": True and none of the per-call timings or key identifier.
+
+        With LLM_SINGLE_FLIGHT_ENABLED, concurrent identical calls share one
+        upstream request; every caller but the first gets "coalesced": True.
+
+        task_type ("planning", "implementation", "verification") selects the
+        hedge policy from LLM_HEDGE_POLICIES and labels the latency metrics.
+
+        Provider responses also carry response_time_ms, ttfb_ms,
+        output_tokens_per_second and api_key_identifier (a key fingerprint).
         """
+        if use_cache is None:
+            use_cache = settings.LLM_CACHE_ENABLED
+        cache_key = make_cache_key(model_name, prompt, system_prompt, params)
+
+        if use_cache:
+            cached_response = await self.get_response_cache().get(cache_key)
+            if cached_response is not None:
+                logger.info(f"LLM cache hit for model: {model_name}")
+                return {**cached_response, "cached": True}
+
+        if not settings.LLM_SINGLE_FLIGHT_ENABLED:
+            return await self._fetch_response(
+                cache_key,
+                model_name,
+                prompt,
+                system_prompt,
+                task_type,
+                use_cache,
+                params,
+            )
+        return await self._fetch_coalesced(
+            cache_key, model_name, prompt, system_prompt, task_type, use_cache, params
+        )
+
+    async def call_llm_many(
+        self,
+        requests: List[Dict[str, Any]],
+        max_concurrency: Optional[int] = None,
+        pricing_lookup: Optional[Callable[[str], Any]] = None,
+    ) -> dict:
+        """
+        Run many call_llm requests with bounded concurrency.
+
+        Each request is a dict of call_llm keyword arguments (model_name, prompt,
+        and optionally system_prompt, use_cache, task_type, params). Provider limits
+        still apply per call. A failing item yields an error response in its
+        slot instead of failing the batch.
+
+        pricing_lookup(model_name) may return a ModelPricing-like object; when
+        given, cost_usd totals the provider cost of the non-reused responses.
+
+        Returns {"results": [...in input order...], "succeeded", "failed",
+        "input_tokens", "output_tokens", "cost_usd"}.
+        """
+        semaphore = asyncio.Semaphore(
+            max_concurrency or settings.LLM_BATCH_MAX_CONCURRENCY
+        )
+
+        async def run(request: Dict[str, Any]) -> dict:
+            async with semaphore:
+                try:
+                    return await self.call_llm(**request)
+                except Exception as e:
+                    logger.error(f"Batch LLM item failed: {e}", exc_info=True)
+                    return {
+                        "text_response": f"Error: {str(e)}",
+                        "input_tokens": 0,
+                        "output_tokens": 0,
+                        "model_name_used": request.get("model_name"),
+                    }
+
+        results = await asyncio.gather(*(run(request) for request in requests))
+
+        failed = sum(1 for result in results if is_error_response(result))
+        # Cached and coalesced responses did not reach the provider
+        billable = [r for r in results if not (r.get("cached") or r.get("coalesced"))]
+        input_tokens = sum(r.get("input_tokens") or 0 for r in billable)
+        output_tokens = sum(r.get("output_tokens") or 0 for r in billable)
+        cost_usd = None
+        if pricing_lookup is not None:
+            cost_usd = Decimal(0)
+            for result in billable:
+                pricing = pricing_lookup(result.get("model_name_used"))
+                if pricing is None:
+                    continue
+                cost_usd += (
+                    Decimal(result.get("input_tokens") or 0) / Decimal(1000000)
+                ) * pricing.input_cost_per_million_tokens + (
+                    Decimal(result.get("output_tokens") or 0) / Decimal(1000000)
+                ) * pricing.output_cost_per_million_tokens
+
+        logger.info(
+            f"Batch of {len(requests)} LLM calls finished: {failed} failed, "
+            f"{input_tokens} input / {output_tokens} output tokens"
+        )
+        return {
+            "results": list(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cost_usd": cost_usd,
+        }
+
+    async def _fetch_response(
+        self,
+        cache_key: str,
+        model_name: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        task_type: Optional[str],
+        use_cache: bool,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> dict:
+        response = await self._call_with_hedging(
+            model_name, prompt, system_prompt, task_type, params
+        )
+        if use_cache and not is_error_response(response):
+            await self.get_response_cache().set(cache_key, _cacheable(response))
+        return response
+
+    async def _call_with_hedging(
+        self,
+        model_name: str,
+        prompt: str,
+        system_prompt: str = None,
+        task_type: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> dict:
+        """
+        Call the provider, firing a second attempt if the first runs past the
+        policy's latency percentile. The hedge goes to the policy's fallback
+        model, or to the same model on a key the first attempt is not using.
+        With neither available, or the hedge budget spent, the first attempt
+        is simply awaited.
+        """
+        policy = get_hedge_policy(task_type)
+        if policy is None:
+            return await self._call_provider(
+                model_name, prompt, system_prompt, task_type, params
+            )
+
+        delay = self.get_latency_tracker().percentile(
+            model_name, policy.get("percentile", 0.95)
+        )
+        if delay is None:
+            delay = policy.get("default_delay_seconds", 60.0)
+        hedge_model = policy.get("fallback_model") or model_name
+        budget = self.get_hedge_budget()
+        budget.on_call()
+        # Keys taken by either attempt; a same-model hedge must use another one
+        used_keys: Set[str] = set()
+
+        def hedge():
+            if hedge_model == model_name and not self.api_key_manager.has_other_key(
+                _provider_for(model_name), used_keys
+            ):
+                return None
+            if not budget.try_spend():
+                return None
+            return self._call_provider(
+                hedge_model, prompt, system_prompt, task_type, params, used_keys
+            )
+
+        response, outcome = await run_hedged(
+            lambda: self._call_provider(
+                model_name, prompt, system_prompt, task_type, params, used_keys
+            ),
+            hedge,
+            delay,
+        )
+        LLM_HEDGED_REQUESTS.labels(task_type=task_type, outcome=outcome).inc()
+        if outcome in ("primary_won", "hedge_won"):
+            logger.info(
+                f"Hedged {task_type} call after {delay:.1f}s: {outcome} ({response['model_name_used']})"
+            )
+        return response
+
+    async def _call_provider(
+        self,
+        model_name: str,
+        prompt: str,
+        system_prompt: str = None,
+        task_type: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        used_keys: Optional[Set[str]] = None,
+    ) -> dict:
+        estimated_input_tokens = _estimate_tokens(model_name, system_prompt, prompt)
+        started_at = time.monotonic()
+        try:
+            response = await self._route_call(
+                model_name, prompt, system_prompt, params, used_keys
+            )
+        except asyncio.CancelledError:
+            # A cut-short attempt (e.g. the slower side of a hedge) still ran
+            # this long; without it the latency percentile only sees winners
+            self.get_latency_tracker().record(
+                model_name, time.monotonic() - started_at, censored=True
+            )
+            raise
+        if not is_error_response(response):
+            self.get_latency_tracker().record(model_name, time.monotonic() - started_at)
+            _observe_call_timings(response, task_type)
+        actual_input_tokens = response.get("input_tokens") or 0
+        if actual_input_tokens and estimated_input_tokens:
+            ratio = actual_input_tokens / estimated_input_tokens
+            LLM_TOKEN_ESTIMATE_RATIO.labels(family=model_family(model_name)).observe(
+                ratio
+            )
+            logger.info(
+                f"Token estimate for {model_name}: estimated {estimated_input_tokens}, "
+                f"actual {actual_input_tokens} input tokens ({ratio:.2f}x)"
+            )
+        return response
+
+    async def _route_call(
+        self,
+        model_name: str,
+        prompt: str,
+        system_prompt: str = None,
+        params: Optional[Dict[str, Any]] = None,
+        used_keys: Optional[Set[str]] = None,
+    ) -> dict:
         logger.info(f"Routing call for model: {model_name}")
-        # Simple routing logic: if model name contains '/', assume it's for OpenRouter.
-        # Otherwise, assume it's a Gemini model.
-        if "/" in model_name:
+        if _provider_for(model_name) == "openrouter":
             logger.info(f"Identified as OpenRouter model. Calling OpenRouter...")
             return await self.call_openrouter(
-                model_name=model_name, prompt=prompt, system_prompt=system_prompt
+                model_name=model_name,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                params=params,
+                used_keys=used_keys,
             )
         else:
             logger.info(f"Identified as Gemini model. Calling Gemini...")
             # Gemini doesn't use a separate system prompt in the same way.
             # We can prepend it to the user prompt.
             full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
-            return await self.call_gemini(prompt=full_prompt, model_name=model_name)
+            return await self.call_gemini(
+                prompt=full_prompt,
+                model_name=model_name,
+                params=params,
+                used_keys=used_keys,
+            )
 
-    async def call_gemini(self, prompt: str, model_name: str = None) -> dict:
+    async def stream_llm(
+        self,
+        model_name: str,
+        prompt: str,
+        system_prompt: str = None,
+        use_cache: Optional[bool] = None,
+        task_type: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Streaming counterpart of call_llm.
+
+        Yields {"type": "delta", "text": ...} chunks as they arrive, followed by a
+        single {"type": "final", ...} chunk with the same keys call_llm returns
+        (text_response, input_tokens, output_tokens, model_name_used, and the
+        call timings on success).
+
+        Caching and single-flight coalescing work as in call_llm. A cache hit,
+        or a call that joins an identical one already in flight, yields the
+        whole text as one delta before the final chunk. Identical call_llm and
+        stream_llm calls made while a stream runs join that stream.
+
+        Streamed calls are not hedged: the caller consumes the text as it
+        arrives, so a second attempt could not take the stream over. task_type
+        only labels the latency metrics here.
+        """
+        if use_cache is None:
+            use_cache = settings.LLM_CACHE_ENABLED
+        cache_key = make_cache_key(model_name, prompt, system_prompt, params)
+
+        if use_cache:
+            cached_response = await self.get_response_cache().get(cache_key)
+            if cached_response is not None:
+                logger.info(f"LLM cache hit for model: {model_name}")
+                yield {"type": "delta", "text": cached_response["text_response"]}
+                yield {"type": "final", **cached_response, "cached": True}
+                return
+
+        flight = None
+        if settings.LLM_SINGLE_FLIGHT_ENABLED:
+            flight = self.get_single_flight().lead(cache_key)
+            if flight is None:
+                response = await self._fetch_coalesced(
+                    cache_key,
+                    model_name,
+                    prompt,
+                    system_prompt,
+                    task_type,
+                    use_cache,
+                    params,
+                )
+                yield {"type": "delta", "text": response["text_response"]}
+                yield {"type": "final", **response}
+                return
+
+        logger.info(f"Routing streaming call for model: {model_name}")
+        if "/" in model_name:
+            stream = self.stream_openrouter(
+                model_name=model_name,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                params=params,
+            )
+        else:
+            full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+            stream = self.stream_gemini(
+                prompt=full_prompt, model_name=model_name, params=params
+            )
+        try:
+            async for chunk in stream:
+                if chunk["type"] == "final":
+                    response = {k: v for k, v in chunk.items() if k != "type"}
+                    if not is_error_response(response):
+                        _observe_call_timings(chunk, task_type)
+                        if use_cache:
+                            await self.get_response_cache().set(
+                                cache_key, _cacheable(response)
+                            )
+                    if flight is not None:
+                        flight.set_result(response)
+                yield chunk
+        finally:
+            if flight is not None and not flight.done():
+                flight.set_exception(
+                    RuntimeError(f"Streamed call to {model_name} ended early.")
+                )
+                # Mark the exception retrieved: the stream may have had no joiners
+                flight.exception()
+
+    async def _fetch_coalesced(
+        self,
+        cache_key: str,
+        model_name: str,
+        prompt: str,
+        system_prompt: Optional[str],
+        task_type: Optional[str],
+        use_cache: bool,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> dict:
+        """
+        Fetch the response through single-flight, joining an identical call
+        already in flight. A failed shared call becomes an error response.
+        """
+
+        def fetch():
+            return self._fetch_response(
+                cache_key,
+                model_name,
+                prompt,
+                system_prompt,
+                task_type,
+                use_cache,
+                params,
+            )
+
+        try:
+            response, shared = await self.get_single_flight().do(cache_key, fetch)
+        except Exception as e:
+            logger.error(f"Shared call for model {model_name} failed: {e}")
+            return {
+                "text_response": f"Error: {str(e)}",
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "model_name_used": model_name,
+            }
+        if not shared:
+            return response
+        LLM_COALESCED_REQUESTS.inc()
+        logger.info(f"Coalesced identical in-flight call for model: {model_name}")
+        return {**response, "coalesced": True}
+
+    async def call_gemini(
+        self,
+        prompt: str,
+        model_name: str = None,
+        params: Optional[Dict[str, Any]] = None,
+        used_keys: Optional[Set[str]] = None,
+    ) -> dict:
+        """
+        used_keys, when given, holds keys a sibling attempt of the same
+        request already took: they are skipped and the chosen key is added.
+        """
         if model_name is None:
             model_name = settings.DEFAULT_GEMINI_MODEL
-        if not self.google_api_key_configured:
+        # Each call picks a key by health, so Gemini traffic spreads across keys
+        google_key, probe = self.api_key_manager.checkout_key("google", used_keys or ())
+        if google_key and used_keys is not None:
+            used_keys.add(google_key)
+        if not google_key:
             return {
                 "text_response": "Error: Google Gemini API not configured.",
                 "input_tokens": 0,
@@ -60,13 +683,19 @@ class LLMClient:
                     f"Invalid model name '{model_name}' for Gemini API. Should not contain '/'."
                 )
 
-            model = genai.GenerativeModel(model_name)
-            response = await model.generate_content_async(prompt)
+            model = self.get_gemini_clients().model(google_key, model_name)
+            async with self.get_rate_limiter().reserve(
+                "google", google_key, _estimate_tokens(model_name, prompt)
+            ) as reservation, self._track_key_result(
+                "google", google_key
+            ) as key_result:
+                response = await model.generate(prompt, params)
 
             # Use .usage_metadata for token counts if available
             usage_metadata = getattr(response, "usage_metadata", {})
             prompt_tokens = getattr(usage_metadata, "prompt_token_count", 0)
             candidates_tokens = getattr(usage_metadata, "candidates_token_count", 0)
+            reservation.settle(prompt_tokens + candidates_tokens)
 
             if response.parts:
                 return {
@@ -74,6 +703,7 @@ class LLMClient:
                     "input_tokens": prompt_tokens,
                     "output_tokens": candidates_tokens,
                     "model_name_used": model_name,
+                    **_call_timings(key_result, google_key, candidates_tokens),
                 }
             elif (
                 hasattr(response, "prompt_feedback")
@@ -105,11 +735,194 @@ class LLMClient:
                 "output_tokens": 0,
                 "model_name_used": model_name,
             }
+        finally:
+            # Frees a half-open probe slot if the call ended without a result
+            self.api_key_manager.release_key("google", google_key, probe)
+
+    async def stream_gemini(
+        self,
+        prompt: str,
+        model_name: str = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[dict]:
+        if model_name is None:
+            model_name = settings.DEFAULT_GEMINI_MODEL
+        final = {
+            "type": "final",
+            "text_response": "",
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "model_name_used": model_name,
+        }
+        google_key, probe = self.api_key_manager.checkout_key("google")
+        if not google_key:
+            final["text_response"] = "Error: Google Gemini API not configured."
+            yield final
+            return
+        try:
+            if "/" in model_name:
+                raise ValueError(
+                    f"Invalid model name '{model_name}' for Gemini API. Should not contain '/'."
+                )
+
+            model = self.get_gemini_clients().model(google_key, model_name)
+            parts = []
+            async with self.get_rate_limiter().reserve(
+                "google", google_key, _estimate_tokens(model_name, prompt)
+            ) as reservation:
+                async with self._track_key_result("google", google_key) as key_result:
+                    response = await model.stream(prompt, params)
+                async for chunk in response:
+                    # Usage metadata is cumulative; the last chunk carries the totals
+                    usage_metadata = getattr(chunk, "usage_metadata", None)
+                    if usage_metadata:
+                        final["input_tokens"] = getattr(
+                            usage_metadata, "prompt_token_count", 0
+                        )
+                        final["output_tokens"] = getattr(
+                            usage_metadata, "candidates_token_count", 0
+                        )
+                    if chunk.parts:
+                        parts.append(chunk.text)
+                        yield {"type": "delta", "text": chunk.text}
+            reservation.settle(final["input_tokens"] + final["output_tokens"])
+
+            if parts:
+                final["text_response"] = "".join(parts)
+                final.update(
+                    _call_timings(key_result, google_key, final["output_tokens"])
+                )
+            else:
+                final["text_response"] = (
+                    "Error: No content generated by Gemini or unknown error."
+                )
+            yield final
+        except Exception as e:
+            logger.error(
+                f"Error streaming from Gemini API ({model_name}): {e}", exc_info=True
+            )
+            final["text_response"] = f"Error communicating with Gemini: {str(e)}"
+            yield final
+        finally:
+            # Frees a half-open probe slot if the call ended without a result
+            self.api_key_manager.release_key("google", google_key, probe)
+
+    async def stream_openrouter(
+        self,
+        model_name: str,
+        prompt: str,
+        system_prompt: str = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[dict]:
+        final = {
+            "type": "final",
+            "text_response": "",
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "model_name_used": model_name,
+        }
+        openrouter_key, probe = self.api_key_manager.checkout_key("openrouter")
+        if not openrouter_key:
+            final["text_response"] = "Error: OpenRouter API key not configured."
+            yield final
+            return
+
+        headers = {
+            "Authorization": f"Bearer {openrouter_key}",
+            "Content-Type": "application/json",
+        }
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        data = {
+            **(params or {}),
+            "model": model_name,
+            "messages": messages,
+            "stream": True,
+            "usage": {"include": True},
+        }
+
+        parts = []
+        try:
+            client = self.get_http_client()
+            async with self.get_rate_limiter().reserve(
+                "openrouter",
+                openrouter_key,
+                _estimate_tokens(model_name, system_prompt, prompt),
+            ) as reservation, self._track_key_result(
+                "openrouter", openrouter_key
+            ) as key_result, client.stream(
+                "POST", settings.OPENROUTER_API_URL, headers=headers, json=data
+            ) as response:
+                key_result["status_code"] = response.status_code
+                key_result["first_byte_at"] = time.monotonic()
+                if response.is_error:
+                    error_text = (await response.aread()).decode(errors="replace")
+                    logger.error(
+                        f"HTTP error streaming from OpenRouter API ({model_name}): {response.status_code} - {error_text}"
+                    )
+                    final["text_response"] = (
+                        f"Error with OpenRouter API ({response.status_code}): {error_text}"
+                    )
+                    yield final
+                    return
+
+                # Server-sent events: 'data: {...}' lines, ': comment' keep-alives
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:") :].strip()
+                    if payload == "[DONE]":
+                        break
+                    event = json.loads(payload)
+                    usage = event.get("usage")
+                    if usage:
+                        final["input_tokens"] = usage.get("prompt_tokens", 0)
+                        final["output_tokens"] = usage.get("completion_tokens", 0)
+                    for choice in event.get("choices", []):
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            parts.append(delta)
+                            yield {"type": "delta", "text": delta}
+            reservation.settle(final["input_tokens"] + final["output_tokens"])
+
+            if parts:
+                final["text_response"] = "".join(parts)
+                final.update(
+                    _call_timings(key_result, openrouter_key, final["output_tokens"])
+                )
+            else:
+                logger.error(f"OpenRouter stream for {model_name} returned no content.")
+                final["text_response"] = (
+                    "Error: Unexpected response format from OpenRouter."
+                )
+            yield final
+        except Exception as e:
+            logger.error(
+                f"Error streaming from OpenRouter API ({model_name}): {e}",
+                exc_info=True,
+            )
+            final["text_response"] = f"Error communicating with OpenRouter: {str(e)}"
+            yield final
+        finally:
+            # Frees a half-open probe slot if the call ended without a result
+            self.api_key_manager.release_key("openrouter", openrouter_key, probe)
 
     async def call_openrouter(
-        self, model_name: str, prompt: str, system_prompt: str = None
+        self,
+        model_name: str,
+        prompt: str,
+        system_prompt: str = None,
+        params: Optional[Dict[str, Any]] = None,
+        used_keys: Optional[Set[str]] = None,
     ) -> dict:
-        openrouter_key = self.api_key_manager.get_next_key("openrouter")
+        """used_keys works as in call_gemini."""
+        openrouter_key, probe = self.api_key_manager.checkout_key(
+            "openrouter", used_keys or ()
+        )
+        if openrouter_key and used_keys is not None:
+            used_keys.add(openrouter_key)
         if not openrouter_key:
             return {
                 "text_response": "Error: OpenRouter API key not configured.",
@@ -127,30 +940,46 @@ class LLMClient:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
 
-        data = {"model": model_name, "messages": messages}
-        api_url = "https://openrouter.ai/api/v1/chat/completions"
+        data = {**(params or {}), "model": model_name, "messages": messages}
+        api_url = settings.OPENROUTER_API_URL
 
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                response = await client.post(api_url, headers=headers, json=data)
-                response.raise_for_status()
-                result = response.json()
-                if result.get("choices") and result["choices"][0].get("message"):
-                    return {
-                        "text_response": result["choices"][0]["message"]["content"],
-                        "input_tokens": result.get("usage", {}).get("prompt_tokens", 0),
-                        "output_tokens": result.get("usage", {}).get(
-                            "completion_tokens", 0
-                        ),
-                        "model_name_used": model_name,
-                    }
-                logger.error(f"Unexpected OpenRouter response format: {result}")
+            client = self.get_http_client()
+            async with self.get_rate_limiter().reserve(
+                "openrouter",
+                openrouter_key,
+                _estimate_tokens(model_name, system_prompt, prompt),
+            ) as reservation, self._track_key_result(
+                "openrouter", openrouter_key
+            ) as key_result, client.stream(
+                "POST", api_url, headers=headers, json=data
+            ) as response:
+                # Streamed so the headers mark the time to first byte
+                key_result["status_code"] = response.status_code
+                key_result["first_byte_at"] = time.monotonic()
+                await response.aread()
+            response.raise_for_status()
+            result = response.json()
+            usage = result.get("usage", {})
+            reservation.settle(
+                usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+            )
+            if result.get("choices") and result["choices"][0].get("message"):
+                output_tokens = usage.get("completion_tokens", 0)
                 return {
-                    "text_response": "Error: Unexpected response format from OpenRouter.",
-                    "input_tokens": 0,
-                    "output_tokens": 0,
+                    "text_response": result["choices"][0]["message"]["content"],
+                    "input_tokens": usage.get("prompt_tokens", 0),
+                    "output_tokens": output_tokens,
                     "model_name_used": model_name,
+                    **_call_timings(key_result, openrouter_key, output_tokens),
                 }
+            logger.error(f"Unexpected OpenRouter response format: {result}")
+            return {
+                "text_response": "Error: Unexpected response format from OpenRouter.",
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "model_name_used": model_name,
+            }
         except httpx.HTTPStatusError as e:
             error_text = e.response.text
             logger.error(
@@ -173,3 +1002,6 @@ class LLMClient:
                 "output_tokens": 0,
                 "model_name_used": model_name,
             }
+        finally:
+            # Frees a half-open probe slot if the call ended without a result
+            self.api_key_manager.release_key("openrouter", openrouter_key, probe)
@@ -0,0 +1,21 @@
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+def reciprocal_rank_fusion(
+    rankings: Dict[str, Sequence[Hashable]],
+    weights: Optional[Dict[str, float]] = None,
+    k: float = 60.0,
+) -> List[Tuple[Hashable, float]]:
+    """
+    Merge ranked lists with reciprocal rank fusion: an item scores
+    sum(weight / (k + rank)) over the lists it appears in (ranks from 1).
+    Returns (item, score) pairs, best first; ties keep first-seen order.
+    """
+    weights = weights or {}
+    scores: Dict[Hashable, float] = defaultdict(float)
+    for name, ranking in rankings.items():
+        weight = weights.get(name, 1.0)
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += weight / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+from app.core.config import settings
+from app.core.metrics import LLM_IN_FLIGHT_CALLS, LLM_RATE_LIMIT_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Stable, non-reversible identifier for an API key (safe for logs and metrics)."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_minute`.
+
+    acquire() waits for capacity instead of failing. Waiters are served in
+    arrival order because the lock is held while sleeping.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.refill_per_second = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated_at) * self.refill_per_second,
+        )
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        # A request larger than the whole bucket could never fit; cap it at capacity
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.refill_per_second)
+
+    def debit(self, amount: float):
+        """Adjust for usage known only after the call. May leave the bucket in debt."""
+        self._refill()
+        self.tokens = max(self.tokens - amount, -self.capacity)
+
+
+class RateLimitReservation:
+    def __init__(self, token_buckets: List[TokenBucket], estimated_tokens: int):
+        self.token_buckets = token_buckets
+        self.estimated_tokens = estimated_tokens
+
+    def settle(self, actual_tokens: int):
+        """Correct the token-per-minute buckets with the real token usage."""
+        difference = actual_tokens - self.estimated_tokens
+        if difference:
+            for bucket in self.token_buckets:
+                bucket.debit(difference)
+
+
+class LLMRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits per provider and per key,
+    plus a global cap on in-flight provider calls.
+
+    `limits` maps provider -> {"provider_rpm", "provider_tpm", "key_rpm", "key_tpm"};
+    missing or zero values mean unlimited.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, int]], max_concurrent_calls: int):
+        self.limits = limits
+        self._semaphore = asyncio.Semaphore(max_concurrent_calls)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def _bucket(self, name: str, rate_per_minute: int) -> TokenBucket:
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = TokenBucket(rate_per_minute)
+        return bucket
+
+    def _buckets_for(self, provider: str, api_key: str):
+        limits = self.limits.get(provider, {})
+        fingerprint = key_fingerprint(api_key) if api_key else "none"
+        request_buckets, token_buckets = [], []
+        for scope, scope_id in (("provider", provider), ("key", fingerprint)):
+            rpm = limits.get(f"{scope}_rpm", 0)
+            tpm = limits.get(f"{scope}_tpm", 0)
+            if rpm:
+                request_buckets.append(self._bucket(f"{scope}:{scope_id}:rpm", rpm))
+            if tpm:
+                token_buckets.append(self._bucket(f"{scope}:{scope_id}:tpm", tpm))
+        return request_buckets, token_buckets
+
+    @asynccontextmanager
+    async def reserve(
+        self, provider: str, api_key: str, estimated_tokens: int
+    ) -> AsyncIterator[RateLimitReservation]:
+        request_buckets, token_buckets = self._buckets_for(provider, api_key)
+        started_at = time.monotonic()
+        for bucket in request_buckets:
+            await bucket.acquire(1)
+        for bucket in token_buckets:
+            await bucket.acquire(estimated_tokens)
+        async with self._semaphore:
+            waited = time.monotonic() - started_at
+            LLM_RATE_LIMIT_WAIT_SECONDS.labels(provider=provider).observe(waited)
+            if waited > 1.0:
+                logger.info(f"Waited {waited:.2f}s for {provider} rate-limit capacity.")
+            LLM_IN_FLIGHT_CALLS.labels(provider=provider).inc()
+            try:
+                yield RateLimitReservation(token_buckets, estimated_tokens)
+            finally:
+                LLM_IN_FLIGHT_CALLS.labels(provider=provider).dec()
+
+
+def build_rate_limiter_from_settings() -> LLMRateLimiter:
+    return LLMRateLimiter(
+        limits=settings.LLM_RATE_LIMITS,
+        max_concurrent_calls=settings.LLM_MAX_CONCURRENT_CALLS,
+    )
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one underlying call.
+
+    The call runs as its own task and every caller awaits it through
+    asyncio.shield, so one caller being cancelled does not cancel the call
+    for the others. The call is only cancelled once every caller has gone.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run or join the call for `key`. Returns (result, shared) where shared is True for joiners."""
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller was cancelled: nobody needs the result any more
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def lead(self, key: str) -> Optional[asyncio.Future]:
+        """
+        Claim `key` for a call the caller runs itself, such as a stream it
+        consumes as it arrives. Concurrent do() calls for the key join it.
+
+        Returns a future the caller must resolve with the result (or an
+        exception) once the call ends, or None when a call for `key` is
+        already in flight; join that one with do() instead.
+        """
+        if key in self._flights:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        flight = _Flight(future)
+        # The leader counts as a waiter, so joiners leaving never cancel its call
+        flight.waiters = 1
+        self._flights[key] = flight
+        future.add_done_callback(lambda _: self._forget(key, flight))
+        return future
+
+    def _forget(self, key: str, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def __len__(self):
+        return len(self._flights)
@@ -0,0 +1,125 @@
+import logging
+import math
+import re
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Average characters per BPE token by model family. Calibrate against the
+# "Token estimate" log lines / llm_token_estimate_ratio metric.
+CHARS_PER_TOKEN = {
+    "gemini": 4.0,
+    "deepseek": 3.6,
+    "claude": 3.5,
+    "gpt": 4.0,
+    "llama": 3.8,
+    "default": 3.8,
+}
+
+# Words and single punctuation characters, roughly how BPE pre-tokenizers split text
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+TRUNCATION_MARKER = "\n... [truncated to fit the context budget]"
+
+
+def model_family(model_name: Optional[str]) -> str:
+    name = (model_name or "").lower()
+    for family in ("gemini", "deepseek", "claude", "gpt", "llama"):
+        if family in name:
+            return family
+    if "anthropic/" in name:
+        return "claude"
+    if "openai/" in name:
+        return "gpt"
+    return "default"
+
+
+def estimate_tokens(text: Optional[str], model_name: Optional[str] = None) -> int:
+    """Offline token estimate: short words count as one token, long ones are split."""
+    if not text:
+        return 0
+    chars_per_token = CHARS_PER_TOKEN[model_family(model_name)]
+    tokens = 0
+    for match in _PIECE_RE.finditer(text):
+        length = match.end() - match.start()
+        tokens += (
+            1 if length <= chars_per_token else math.ceil(length / chars_per_token)
+        )
+    return tokens
+
+
+def context_budget(model_name: Optional[str]) -> int:
+    """Prompt token budget for a model: its family's context budget minus the output reserve."""
+    budgets = settings.LLM_CONTEXT_TOKEN_BUDGETS
+    family = model_family(model_name)
+    budget = budgets.get(family, budgets.get("default", 30000))
+    return max(0, budget - settings.LLM_OUTPUT_TOKEN_RESERVE)
+
+
+class PromptSection:
+    """A named block of prompt text. Lower priority sections are trimmed first."""
+
+    def __init__(self, name: str, text: str, priority: int = 0, required: bool = False):
+        self.name = name
+        self.text = text or ""
+        self.priority = priority
+        self.required = required
+
+
+def fit_sections(
+    sections: List[PromptSection],
+    model_name: Optional[str],
+    reserved_tokens: int = 0,
+    budget_tokens: Optional[int] = None,
+) -> Dict[str, str]:
+    """
+    Trim sections so that they, plus `reserved_tokens` of fixed prompt text,
+    fit the model's budget. Sections are cut from the end, lowest priority
+    first; required sections are never trimmed.
+
+    Returns {section name: text to use}.
+    """
+    budget = budget_tokens if budget_tokens is not None else context_budget(model_name)
+    fitted = {section.name: section.text for section in sections}
+    estimates = {
+        section.name: estimate_tokens(section.text, model_name) for section in sections
+    }
+    over = reserved_tokens + sum(estimates.values()) - budget
+    if over <= 0:
+        return fitted
+
+    # Trimmed sections end with the marker, so its tokens come out of what they keep
+    marker_tokens = estimate_tokens(TRUNCATION_MARKER, model_name)
+    for section in sorted(sections, key=lambda s: s.priority):
+        if over <= 0:
+            break
+        if section.required or not estimates[section.name]:
+            continue
+        keep_tokens = estimates[section.name] - over - marker_tokens
+        kept_tokens = 0
+        if keep_tokens <= 0:
+            fitted[section.name] = ""
+        else:
+            # Token density varies along the text: shrink until the estimate fits
+            keep_chars = int(len(section.text) * keep_tokens / estimates[section.name])
+            kept_tokens = estimate_tokens(section.text[:keep_chars], model_name)
+            while kept_tokens > keep_tokens:
+                keep_chars = min(
+                    keep_chars - 1, keep_chars * keep_tokens // kept_tokens
+                )
+                kept_tokens = estimate_tokens(section.text[:keep_chars], model_name)
+            fitted[section.name] = section.text[:keep_chars] + TRUNCATION_MARKER
+            kept_tokens += marker_tokens
+        over -= estimates[section.name] - kept_tokens
+        logger.info(
+            f"Prompt budget: trimmed section '{section.name}' from "
+            f"{estimates[section.name]} to ~{kept_tokens} tokens for {model_name}."
+        )
+
+    if over > 0:
+        logger.warning(
+            f"Prompt for {model_name} still exceeds its budget of {budget} tokens "
+            f"by ~{over} tokens after trimming optional sections."
+        )
+    return fitted
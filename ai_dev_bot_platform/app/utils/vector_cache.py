@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import (
+    EMBEDDING_VECTOR_CACHE_BYTES,
+    EMBEDDING_VECTOR_CACHE_REQUESTS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rough per-row cost of the cached result fields beyond their text
+_ROW_OVERHEAD_BYTES = 200
+
+
+class ProjectVectors:
+    """
+    One project's embeddings as a contiguous float32 matrix (one row per
+    chunk) with precomputed squared norms, plus the fields query results
+    need, so a search touches no database.
+    """
+
+    def __init__(self, rows: List[Dict], vectors: np.ndarray):
+        self.rows = rows
+        self.matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not rows:
+            self.matrix = self.matrix.reshape(0, 0)
+        self.norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+        self.loaded_at = time.monotonic()
+        self.nbytes = (
+            self.matrix.nbytes
+            + self.norms.nbytes
+            + sum(
+                len(row.get("content_chunk") or "")
+                + len(row.get("file_path") or "")
+                + _ROW_OVERHEAD_BYTES
+                for row in rows
+            )
+        )
+
+    def search(self, query: List[float], top_k: int) -> List[Tuple[Dict, float]]:
+        """(row, L2 distance) for the top_k nearest rows, nearest first (exact)."""
+        if not self.rows or top_k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2, one matrix-vector product for all rows
+        squared = self.norms - 2.0 * (self.matrix @ q) + float(q @ q)
+        if top_k < len(self.rows):
+            nearest = np.argpartition(squared, top_k - 1)[:top_k]
+            nearest = nearest[np.argsort(squared[nearest])]
+        else:
+            nearest = np.argsort(squared)
+        distances = np.sqrt(np.maximum(squared[nearest], 0.0))
+        return [
+            (self.rows[i], float(distance)) for i, distance in zip(nearest, distances)
+        ]
+
+
+class ProjectVectorCache:
+    """
+    In-process cache of ProjectVectors by project, LRU-bounded by max_bytes.
+
+    Index writes invalidate a project. Entries also expire after ttl_seconds,
+    which bounds staleness from writes made by other processes. A load that
+    started before an invalidation is not stored (generation check), so a
+    slow reader cannot put back vectors a writer just replaced.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, ProjectVectors]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, project_id) -> Optional[ProjectVectors]:
+        key = str(project_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                time.monotonic() - entry.loaded_at > self.ttl_seconds
+            ):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                EMBEDDING_VECTOR_CACHE_REQUESTS.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        EMBEDDING_VECTOR_CACHE_REQUESTS.labels(result="hit").inc()
+        return entry
+
+    def generation(self, project_id) -> int:
+        """Take before loading a project; pass to put()."""
+        with self._lock:
+            return self._generations.get(str(project_id), 0)
+
+    def put(
+        self, project_id, rows: List[Dict], vectors: np.ndarray, generation: int
+    ) -> ProjectVectors:
+        """Cache a loaded project and return it (also when it is not stored)."""
+        key = str(project_id)
+        entry = ProjectVectors(rows, vectors)
+        with self._lock:
+            if self._generations.get(key, 0) != generation:
+                return entry
+            if entry.nbytes > self.max_bytes:
+                logger.info(
+                    f"Vectors for project {key} ({entry.nbytes} bytes) exceed the "
+                    f"{self.max_bytes} byte cache budget; not cached."
+                )
+                return entry
+            self._remove(key)
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            EMBEDDING_VECTOR_CACHE_BYTES.set(self.bytes)
+        return entry
+
+    def invalidate(self, project_id):
+        key = str(project_id)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._remove(key)
+            EMBEDDING_VECTOR_CACHE_BYTES.set(self.bytes)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.nbytes
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "projects": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -6,11 +6,21 @@ from decimal import Decimal
 
 from app.core.logging_config import setup_logging
 from app.telegram_bot.bot_main import run_bot
-from app.api.endpoints import stripe_webhooks
+from app.api.endpoints import admin, stripe_webhooks
 from app.api.health import router as health_router
 from app.db.session import get_db
 from app.services.user_service import UserService
-
+from app.services.api_key_manager import (
+    flush_key_usage,
+    run_key_refresh,
+    run_usage_flush,
+)
+from app.services.service_container import (
+    get_service_container,
+    shutdown_service_container,
+)
+from app.core.config import settings
+from app.utils.llm_client import LLMClient
 
 # Setup logging at the application's entry point
 setup_logging()
@@ -19,9 +29,20 @@ setup_logging()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # This code runs on startup
+    await LLMClient.startup()
+    # Long-lived clients (Telegram bot, Supabase, Gemini) are built once here
+    app.state.services = get_service_container()
     print("Application startup: Starting Telegram bot in background...")
     loop = asyncio.get_event_loop()
     bot_task = loop.create_task(run_bot())
+    key_refresh_task = None
+    if settings.API_KEY_REFRESH_INTERVAL_SECONDS > 0:
+        key_refresh_task = loop.create_task(
+            run_key_refresh(settings.API_KEY_REFRESH_INTERVAL_SECONDS)
+        )
+    usage_flush_task = loop.create_task(
+        run_usage_flush(settings.API_KEY_USAGE_FLUSH_INTERVAL_SECONDS)
+    )
     yield
     # This code runs on shutdown
     print("Application shutdown: Stopping Telegram bot...")
@@ -30,11 +51,27 @@ async def lifespan(app: FastAPI):
         await bot_task
     except asyncio.CancelledError:
         print("Bot task successfully cancelled.")
+    for task in (key_refresh_task, usage_flush_task):
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    # A periodic flush cancelled mid-way keeps running in its thread; the
+    # counter's flush lock makes this final flush wait for it.
+    try:
+        await asyncio.to_thread(flush_key_usage)
+    except Exception as e:
+        print(f"Final API key usage flush failed: {e}")
+    await shutdown_service_container()
+    await LLMClient.shutdown()
 
 
 app = FastAPI(title="AI Development Assistant API", lifespan=lifespan)
 app.include_router(stripe_webhooks.router, prefix="/api/v1", tags=["Stripe"])
 app.include_router(health_router, prefix="/health", tags=["health"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
 
 
 @app.get("/")
@@ -0,0 +1,177 @@
+"""
+Benchmark: structure-aware chunking vs the fixed-width chunker.
+
+Chunks a corpus of project files (by default this repository's .py and .md
+files) with:
+  * fixed-2000 - the previous 2000-character slices
+  * fixed-N    - fixed slices of the structure-aware target size
+  * syntax-N   - app.utils.code_chunker at the target size and overlap
+
+Retrieval quality: every function or method with a docstring becomes a query
+(the docstring's first line). Chunks are ranked with BM25, a lexical stand-in
+for the embedding model so the benchmark runs offline. A query counts as a
+hit@k when one of the top k chunks contains the whole function source, i.e.
+the retrieved context is usable without fetching more. Functions longer than
+the target size cannot fit in a chunk and are skipped.
+
+Throughput: chunks and MB per second of chunking the corpus.
+
+Usage (from ai_dev_bot_platform/):
+    python -m scripts.benchmark_chunking --target 1500 --overlap 200
+"""
+
+import argparse
+import ast
+import glob
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+
+from app.utils.code_chunker import chunk_source
+
+TOKEN = re.compile(r"[A-Za-z][a-z0-9]*|[0-9]+")
+K_VALUES = (1, 3, 5)
+
+
+def _tokens(text: str) -> List[str]:
+    return [token.lower() for token in TOKEN.findall(text)]
+
+
+def _fixed_chunker(size: int) -> Callable[[str, str], List[str]]:
+    def chunk(file_path: str, content: str) -> List[str]:
+        return [content[i : i + size] for i in range(0, len(content), size)]
+
+    return chunk
+
+
+def _syntax_chunker(target: int, overlap: int) -> Callable[[str, str], List[str]]:
+    def chunk(file_path: str, content: str) -> List[str]:
+        return [c["text"] for c in chunk_source(file_path, content, target, overlap)]
+
+    return chunk
+
+
+def _load_corpus(patterns: List[str]) -> Dict[str, str]:
+    corpus = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if os.path.isfile(path) and "__pycache__" not in path:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    corpus[path] = f.read()
+    return corpus
+
+
+def _queries(corpus: Dict[str, str], max_chars: int) -> List[Tuple[str, str]]:
+    """(query, function source) for each documented function that fits in a chunk."""
+    queries = []
+    for path, content in corpus.items():
+        if not path.endswith(".py"):
+            continue
+        try:
+            tree = ast.parse(content)
+        except SyntaxError:
+            continue
+        for node in ast.walk(tree):
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            docstring = ast.get_docstring(node)
+            source = ast.get_source_segment(content, node)
+            if not docstring or not source or len(source) > max_chars:
+                continue
+            query = docstring.strip().splitlines()[0]
+            if len(_tokens(query)) >= 3:
+                queries.append((query, source))
+    return queries
+
+
+class _BM25:
+    def __init__(self, documents: List[str], k1: float = 1.2, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.term_counts = [Counter(_tokens(doc)) for doc in documents]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / max(len(self.lengths), 1)
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    def top(self, query: str, k: int) -> List[int]:
+        terms = set(_tokens(query))
+        scores = []
+        for index, counts in enumerate(self.term_counts):
+            norm = self.k1 * (
+                1 - self.b + self.b * self.lengths[index] / self.average_length
+            )
+            score = sum(
+                self.idf[t] * counts[t] * (self.k1 + 1) / (counts[t] + norm)
+                for t in terms
+                if t in counts
+            )
+            scores.append((score, index))
+        scores.sort(reverse=True)
+        return [index for _, index in scores[:k]]
+
+
+def _evaluate(
+    label: str,
+    chunker: Callable[[str, str], List[str]],
+    corpus: Dict[str, str],
+    queries: List[Tuple[str, str]],
+) -> str:
+    start = time.perf_counter()
+    chunks = [
+        chunk for path, content in corpus.items() for chunk in chunker(path, content)
+    ]
+    elapsed = time.perf_counter() - start
+    megabytes = sum(len(content) for content in corpus.values()) / 1e6
+
+    index = _BM25(chunks)
+    hits = Counter()
+    for query, source in queries:
+        top = index.top(query, max(K_VALUES))
+        for k in K_VALUES:
+            if any(source in chunks[i] for i in top[:k]):
+                hits[k] += 1
+    recall = " ".join(f"hit@{k}={hits[k] / max(len(queries), 1):.3f}" for k in K_VALUES)
+    mean_chars = sum(len(chunk) for chunk in chunks) / max(len(chunks), 1)
+    return (
+        f"{label:<12} chunks={len(chunks):6d} mean={mean_chars:6.0f}ch {recall} "
+        f"| {len(chunks) / elapsed:9.0f} chunks/s {megabytes / elapsed:6.1f} MB/s"
+    )
+
+
+def main(patterns: List[str], target: int, overlap: int):
+    corpus = _load_corpus(patterns)
+    queries = _queries(corpus, target)
+    print(
+        f"{len(corpus)} files, {sum(map(len, corpus.values())) / 1e6:.2f} MB, "
+        f"{len(queries)} queries, target={target} overlap={overlap}"
+    )
+    chunkers = {
+        "fixed-2000": _fixed_chunker(2000),
+        f"fixed-{target}": _fixed_chunker(target),
+        f"syntax-{target}": _syntax_chunker(target, overlap),
+    }
+    for label, chunker in chunkers.items():
+        print(_evaluate(label, chunker, corpus, queries))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--glob",
+        action="append",
+        dest="patterns",
+        help="Files to index (repeatable); defaults to this repo's .py and .md files",
+    )
+    parser.add_argument("--target", type=int, default=1500)
+    parser.add_argument("--overlap", type=int, default=200)
+    args = parser.parse_args()
+    main(args.patterns or ["**/*.py", "../**/*.md"], args.target, args.overlap)
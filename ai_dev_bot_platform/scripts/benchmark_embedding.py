@@ -0,0 +1,162 @@
+"""
+Benchmark: embedding throughput (chunks per second) of codebase indexing.
+
+Starts scripts/fake_embedding_server.py on a local port and embeds the same
+synthetic chunks with:
+  * sequential - one request per chunk on a new httpx.AsyncClient each
+                 (the previous CodebaseIndexingService behaviour)
+  * batched    - CodebaseIndexingService.embed_texts for each
+                 (EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CONCURRENT_BATCHES) pair,
+                 with EMBEDDING_HTTP_BATCH_REQUESTS on
+  * local      - the same with LocalEmbeddingBackend (no server) at
+                 EMBEDDING_BATCH_SIZE=64 and each --local-workers pool size
+
+The server charges a fixed cost per request plus a small cost per text, so
+batching amortises the request cost and concurrency overlaps requests up to
+the server's worker limit.
+
+Usage (from ai_dev_bot_platform/):
+    python -m scripts.benchmark_embedding --chunks 2000 --request-ms 20 --per-text-ms 0.5 \\
+        --local-workers 1 4
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List, Optional
+
+import httpx
+import uvicorn
+
+from app.core.config import settings
+from app.services.codebase_indexing_service import CodebaseIndexingService
+from app.utils.embedding_backends import EmbeddingBackend, LocalEmbeddingBackend
+from scripts.fake_embedding_server import create_app
+
+CONFIGURATIONS = [(1, 1), (16, 1), (64, 1), (16, 4), (64, 4), (128, 8)]
+
+
+def _make_chunks(count: int) -> List[str]:
+    return [
+        f"def function_{i}(value):\n    return value * {i}\n" * 40 for i in range(count)
+    ]
+
+
+async def _run_sequential(url: str, chunks: List[str]) -> float:
+    start = time.perf_counter()
+    for chunk in chunks:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(url, json={"text": chunk}, timeout=60.0)
+            response.raise_for_status()
+            response.json().get("embedding")
+    return time.perf_counter() - start
+
+
+async def _run_batched(
+    chunks: List[str],
+    batch_size: int,
+    concurrency: int,
+    backend: Optional[EmbeddingBackend] = None,
+) -> float:
+    settings.EMBEDDING_BATCH_SIZE = batch_size
+    settings.EMBEDDING_MAX_CONCURRENT_BATCHES = concurrency
+    service = CodebaseIndexingService(backend)
+    try:
+        if isinstance(backend, LocalEmbeddingBackend):
+            # Start the worker processes outside the timed run
+            await asyncio.gather(
+                *(service.embed_texts(chunks[:64]) for _ in range(backend.workers))
+            )
+        start = time.perf_counter()
+        embeddings = await service.embed_texts(chunks)
+        elapsed = time.perf_counter() - start
+    finally:
+        await service.close()
+    if any(embedding is None for embedding in embeddings):
+        raise RuntimeError("Some batches failed; see the log")
+    return elapsed
+
+
+async def main(
+    chunks: int,
+    sequential_chunks: int,
+    port: int,
+    request_ms: float,
+    per_text_ms: float,
+    server_concurrency: int,
+    local_workers: List[int],
+):
+    app = create_app(
+        {
+            "request_latency": {"distribution": "fixed", "ms": request_ms},
+            "per_text_latency": {"distribution": "fixed", "ms": per_text_ms},
+            "max_concurrency": server_concurrency,
+        }
+    )
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"http://127.0.0.1:{port}/embed"
+    settings.EMBEDDING_SERVICE_URL = url
+    settings.EMBEDDING_HTTP_BATCH_REQUESTS = True
+    texts = _make_chunks(chunks)
+    try:
+        # The per-chunk baseline is slow, so it runs on a prefix
+        sequential_texts = texts[:sequential_chunks]
+        sequential_rate = len(sequential_texts) / await _run_sequential(
+            url, sequential_texts
+        )
+        results = []
+        for batch_size, concurrency in CONFIGURATIONS:
+            elapsed = await _run_batched(texts, batch_size, concurrency)
+            results.append((batch_size, concurrency, len(texts) / elapsed))
+    finally:
+        server.should_exit = True
+        await server_task
+    local_results = []
+    for workers in local_workers:
+        elapsed = await _run_batched(texts, 64, 1, LocalEmbeddingBackend(workers))
+        local_results.append((workers, len(texts) / elapsed))
+
+    print(
+        f"{chunks} chunks, server: {request_ms}ms/request + {per_text_ms}ms/text, "
+        f"{server_concurrency} workers"
+    )
+    print(f"sequential             {sequential_rate:9.1f} chunks/s")
+    for batch_size, concurrency, rate in results:
+        print(
+            f"batch={batch_size:<4} concurrency={concurrency:<2} {rate:9.1f} chunks/s "
+            f"({rate / sequential_rate:5.1f}x)"
+        )
+    for workers, rate in local_results:
+        print(
+            f"local workers={workers:<3}      {rate:9.1f} chunks/s "
+            f"({rate / sequential_rate:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--sequential-chunks", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--request-ms", type=float, default=20)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    parser.add_argument("--server-concurrency", type=int, default=8)
+    parser.add_argument("--local-workers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.chunks,
+            args.sequential_chunks,
+            args.port,
+            args.request_ms,
+            args.per_text_ms,
+            args.server_concurrency,
+            args.local_workers,
+        )
+    )
@@ -0,0 +1,112 @@
+"""
+Benchmark: per-call OpenRouter latency with and without the pooled HTTP client.
+
+Starts a local stand-in OpenRouter server and compares:
+  * unpooled - a new httpx.AsyncClient per call (the previous LLMClient behaviour)
+  * pooled   - LLMClient.call_openrouter using the shared, pooled client
+
+Usage (from ai_dev_bot_platform/):
+    python -m scripts.benchmark_llm_pooling --calls 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from app.core.config import settings
+from app.utils.llm_client import LLMClient
+
+stand_in_app = FastAPI()
+
+
+@stand_in_app.post("/api/v1/chat/completions")
+async def chat_completions(payload: dict):
+    return {
+        "choices": [{"message": {"role": "assistant", "content": "ok"}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 1},
+        "model": payload.get("model"),
+    }
+
+
+class _StaticKeyManager:
+    """Minimal stand-in for APIKeyManager so the benchmark needs no database."""
+
+    def checkout_key(self, provider: str, exclude=()):
+        return "benchmark-key", None
+
+    def release_key(self, provider: str, key, probe):
+        pass
+
+
+def _summarise(label: str, samples: List[float]) -> str:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    return (
+        f"{label:<10} mean={statistics.mean(samples_ms):7.2f}ms "
+        f"p50={statistics.median(samples_ms):7.2f}ms p95={p95:7.2f}ms"
+    )
+
+
+async def _run_unpooled(api_url: str, calls: int) -> List[float]:
+    samples = []
+    payload = {"model": "bench/model", "messages": [{"role": "user", "content": "hi"}]}
+    for _ in range(calls):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(timeout=120.0) as client:
+            response = await client.post(api_url, json=payload)
+            response.raise_for_status()
+            response.json()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def _run_pooled(calls: int) -> List[float]:
+    llm_client = LLMClient.__new__(LLMClient)
+    llm_client.api_key_manager = _StaticKeyManager()
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        result = await llm_client.call_openrouter(model_name="bench/model", prompt="hi")
+        if result["text_response"].startswith("Error"):
+            raise RuntimeError(result["text_response"])
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(calls: int, port: int):
+    server = uvicorn.Server(
+        uvicorn.Config(stand_in_app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    api_url = f"http://127.0.0.1:{port}/api/v1/chat/completions"
+    settings.OPENROUTER_API_URL = api_url
+    await LLMClient.startup()
+    try:
+        unpooled = await _run_unpooled(api_url, calls)
+        pooled = await _run_pooled(calls)
+    finally:
+        await LLMClient.shutdown()
+        server.should_exit = True
+        await server_task
+
+    print(f"{calls} sequential calls against {api_url}")
+    print(_summarise("unpooled", unpooled))
+    print(_summarise("pooled", pooled))
+    print(f"speedup    {statistics.mean(unpooled) / statistics.mean(pooled):.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.port))
@@ -0,0 +1,192 @@
+"""
+Benchmark: OrchestratorService.start_planning_phase end to end, fully offline.
+
+Runs the planning phase for many projects against scripts/fake_llm_server.py,
+with a throwaway SQLite database and a notifier that records Telegram messages
+instead of sending them. Reports throughput and p50/p95/p99 latency.
+
+Usage (from ai_dev_bot_platform/):
+    python -m scripts.benchmark_orchestrator --runs 200 --concurrency 20
+    python -m scripts.benchmark_orchestrator --model gemini-2.5-flash --scenario slow.json
+"""
+
+import os
+import tempfile
+
+# The database and secrets must be in place before the app modules are imported
+_DB_DIR = tempfile.mkdtemp(prefix="orchestrator-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'bench.sqlite3')}"
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:benchmark")
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List, Optional, Tuple
+
+import uvicorn
+from cryptography.fernet import Fernet
+
+from app.core.config import settings
+from app.db.session import Base, SessionLocal, engine
+from app.models.api_key_models import APIKey
+from app.models.project import Project
+from app.models.user import User
+from app.services.notification_service import NotificationService
+from app.services.orchestrator_service import OrchestratorService
+from app.utils.llm_client import LLMClient
+from scripts.fake_llm_server import create_app, load_scenario
+
+PLAN_RESPONSE = """## Architecture
+A FastAPI service backed by PostgreSQL.
+
+Technology Stack:
+backend: Python, FastAPI
+database: PostgreSQL
+
+### Implementation TODO List
+- [ ] Create the project skeleton
+- [ ] Add the data models
+- [ ] Expose the REST endpoints
+"""
+
+PLANNING_SCENARIO = {
+    "latency": {"distribution": "lognormal", "median_ms": 200, "sigma": 0.5},
+    "chunk_latency": {"distribution": "fixed", "ms": 5},
+    "scripts": [{"match": "Implementation TODO List", "response": PLAN_RESPONSE}],
+}
+
+
+class _RecordingNotifier(NotificationService):
+    """Keeps messages in memory instead of calling Telegram."""
+
+    def __init__(self):
+        super().__init__()
+        self.messages: List[str] = []
+
+    async def send_update(self, chat_id: int, message: str) -> Optional[int]:
+        self.messages.append(message)
+        return len(self.messages)
+
+    async def edit_update(self, chat_id: int, message_id: int, message: str) -> bool:
+        self.messages[message_id - 1] = message
+        return True
+
+
+def seed_database(runs: int, keys_per_provider: int = 3) -> list:
+    Base.metadata.create_all(
+        engine, tables=[User.__table__, Project.__table__, APIKey.__table__]
+    )
+    cipher = Fernet(settings.API_KEY_ENCRYPTION_KEY)
+    db = SessionLocal()
+    try:
+        for provider in ("openrouter", "google"):
+            for index in range(keys_per_provider):
+                token = f"fake-{provider}-key-{index}".encode()
+                db.add(
+                    APIKey(
+                        provider=provider,
+                        encrypted_key=cipher.encrypt(token).decode(),
+                    )
+                )
+        user = User(telegram_user_id=1, username="bench", credit_balance=0)
+        db.add(user)
+        db.flush()
+        projects = [
+            Project(
+                user_id=user.id,
+                title=f"Benchmark project {index}",
+                description="A small todo-list web service with user accounts.",
+            )
+            for index in range(runs)
+        ]
+        db.add_all(projects)
+        db.commit()
+        return [project.id for project in projects]
+    finally:
+        db.close()
+
+
+async def _plan(project_id) -> Tuple[float, bool]:
+    """Run one planning phase; returns (seconds, whether the plan was saved)."""
+    db = SessionLocal()
+    try:
+        orchestrator = OrchestratorService(db)
+        orchestrator.notifier = _RecordingNotifier()
+        start = time.perf_counter()
+        await orchestrator.start_planning_phase(project_id, telegram_chat_id=1)
+        elapsed = time.perf_counter() - start
+        return elapsed, db.get(Project, project_id).status == "planning_complete"
+    finally:
+        db.close()
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(percentile * len(ordered)))]
+
+
+async def main(args):
+    if not settings.API_KEY_ENCRYPTION_KEY:
+        settings.API_KEY_ENCRYPTION_KEY = Fernet.generate_key().decode()
+    scenario = {**PLANNING_SCENARIO, **load_scenario(args.scenario)}
+    server = uvicorn.Server(
+        uvicorn.Config(
+            create_app(scenario), host="127.0.0.1", port=args.port, log_level="warning"
+        )
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    settings.OPENROUTER_API_URL = f"{base_url}/api/v1/chat/completions"
+    settings.GEMINI_API_ENDPOINT = base_url
+    settings.ARCHITECT_MODEL = args.model
+    # Progress edits would otherwise be throttled to Telegram's pace
+    settings.TELEGRAM_EDIT_MIN_INTERVAL_SECONDS = 0
+    project_ids = seed_database(args.runs)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run(project_id) -> Tuple[float, bool]:
+        async with semaphore:
+            return await _plan(project_id)
+
+    await LLMClient.startup()
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(run(pid) for pid in project_ids))
+        wall_time = time.perf_counter() - start
+        provider_stats = server.config.app.state.provider.stats
+    finally:
+        await LLMClient.shutdown()
+        server.should_exit = True
+        await server_task
+
+    samples_ms = [seconds * 1000 for seconds, _ in results]
+    succeeded = sum(1 for _, ok in results if ok)
+    print(
+        f"{args.runs} planning runs, concurrency {args.concurrency}, "
+        f"model {args.model}, fake provider at {base_url}"
+    )
+    print(
+        f"succeeded  {succeeded}/{args.runs}; provider responses {dict(provider_stats)}"
+    )
+    print(f"throughput {succeeded / wall_time:8.2f} plans/s (wall {wall_time:.2f}s)")
+    print(
+        f"latency    mean={statistics.mean(samples_ms):8.2f}ms "
+        f"p50={_percentile(samples_ms, 0.50):8.2f}ms "
+        f"p95={_percentile(samples_ms, 0.95):8.2f}ms "
+        f"p99={_percentile(samples_ms, 0.99):8.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--model", default=settings.ARCHITECT_MODEL)
+    parser.add_argument("--scenario", help="JSON scenario merged over the default")
+    parser.add_argument("--port", type=int, default=8766)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""
+Benchmark: cost of constructing an OrchestratorService (once per Telegram message).
+
+Compares:
+  * per-request - a fresh APIKeyManager and fresh services/clients per
+                  orchestrator, re-reading and decrypting api_keys every time
+                  (the original behaviour)
+  * shared-keys - the process-wide APIKeyManager, but fresh services/clients
+                  (telegram.Bot, Supabase, Gemini) per orchestrator
+  * container   - everything from the application-scoped ServiceContainer;
+                  only the DB session is bound per request
+
+For each mode it reports construction latency and, as a measure of memory
+churn, the peak traced heap while constructing (tracemalloc, in a separate
+pass of at most TRACED_CONSTRUCTIONS constructions since tracing is slow).
+
+Uses the same throwaway SQLite database as benchmark_orchestrator.
+
+Usage (from ai_dev_bot_platform/):
+    python -m scripts.benchmark_orchestrator_construction --constructions 500 --keys 20
+"""
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import Callable, List
+
+from cryptography.fernet import Fernet
+
+# Imported first: it points the app at the throwaway database
+from scripts.benchmark_orchestrator import seed_database
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.api_key_manager import APIKeyManager, get_api_key_manager
+from app.services.orchestrator_service import OrchestratorService
+from app.services.service_container import ServiceContainer, get_service_container
+
+TRACED_CONSTRUCTIONS = 20
+
+MODES = {
+    "per-request": lambda db: OrchestratorService(
+        db, ServiceContainer(APIKeyManager())
+    ),
+    "shared-keys": lambda db: OrchestratorService(db, ServiceContainer()),
+    "container": lambda db: OrchestratorService(db),
+}
+
+
+def _construct(build: Callable, constructions: int) -> List[float]:
+    samples = []
+    db = SessionLocal()
+    try:
+        for _ in range(constructions):
+            start = time.perf_counter()
+            build(db)
+            samples.append(time.perf_counter() - start)
+    finally:
+        db.close()
+    return samples
+
+
+def _peak_heap_kib(build: Callable, constructions: int) -> float:
+    tracemalloc.start()
+    try:
+        _construct(build, constructions)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def _summarise(label: str, samples: List[float], peak_kib: float) -> str:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    return (
+        f"{label:<12} mean={statistics.mean(samples_ms):8.3f}ms "
+        f"p50={statistics.median(samples_ms):8.3f}ms p95={p95:8.3f}ms "
+        f"peak heap={peak_kib:8.1f}KiB"
+    )
+
+
+def main(constructions: int, keys_per_provider: int):
+    if not settings.API_KEY_ENCRYPTION_KEY:
+        settings.API_KEY_ENCRYPTION_KEY = Fernet.generate_key().decode()
+    seed_database(runs=1, keys_per_provider=keys_per_provider)
+    # Loaded once, as on startup
+    get_api_key_manager()
+    get_service_container()
+
+    print(
+        f"{constructions} OrchestratorService constructions, "
+        f"{keys_per_provider} keys per provider"
+    )
+    means = {}
+    for label, build in MODES.items():
+        samples = _construct(build, constructions)
+        means[label] = statistics.mean(samples)
+        peak_kib = _peak_heap_kib(build, min(constructions, TRACED_CONSTRUCTIONS))
+        print(_summarise(label, samples, peak_kib))
+    print(f"speedup      {means['per-request'] / means['container']:.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--constructions", type=int, default=500)
+    parser.add_argument("--keys", type=int, default=10)
+    args = parser.parse_args()
+    main(args.constructions, args.keys)
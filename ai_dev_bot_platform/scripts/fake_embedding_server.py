@@ -0,0 +1,113 @@
+"""
+Offline stand-in for the embedding service used by CodebaseIndexingService.
+
+    POST /embed  {"texts": ["...", ...]}  ->  {"embeddings": [[...], ...]}
+                 {"text": "..."}          ->  {"embedding": [...]}
+
+Embeddings are deterministic unit vectors seeded by a hash of the text, so the
+same text always maps to the same vector. Each request costs
+request_latency + per_text_latency * len(texts), and at most max_concurrency
+requests are served at once, like a model server with a fixed worker pool.
+Latency specs use the same format as scripts/fake_llm_server.py.
+
+Point the application at it with:
+    EMBEDDING_SERVICE_URL=http://127.0.0.1:8766/embed
+
+    python -m scripts.fake_embedding_server --port 8766
+
+GET /_fake/stats returns request and text counts.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import math
+import random
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from scripts.fake_llm_server import sample_latency
+
+DEFAULT_CONFIG: Dict[str, Any] = {
+    "seed": 1234,
+    "dimension": 384,
+    # Fixed cost of one request (model call overhead, network, batching)
+    "request_latency": {"distribution": "fixed", "ms": 20},
+    # Marginal cost of each text in a batch
+    "per_text_latency": {"distribution": "fixed", "ms": 0.5},
+    "max_concurrency": 8,
+    # Requests with more texts than this get a 413
+    "max_batch_size": 256,
+}
+
+
+def fake_embedding(text: str, dimension: int) -> List[float]:
+    """Deterministic unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimension)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def create_app(config: Optional[dict] = None) -> FastAPI:
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    rng = random.Random(config["seed"])
+    stats: Counter = Counter()
+    slots = asyncio.Semaphore(config["max_concurrency"])
+    app = FastAPI(title="Fake embedding service")
+    app.state.stats = stats
+
+    @app.get("/_fake/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/embed")
+    async def embed(payload: dict):
+        batched = "texts" in payload
+        texts = payload["texts"] if batched else [payload.get("text", "")]
+        if len(texts) > config["max_batch_size"]:
+            stats["rejected"] += 1
+            return JSONResponse(
+                {"error": f"Batch of {len(texts)} exceeds {config['max_batch_size']}"},
+                status_code=413,
+            )
+        async with slots:
+            delay = sample_latency(config["request_latency"], rng) + sum(
+                sample_latency(config["per_text_latency"], rng) for _ in texts
+            )
+            await asyncio.sleep(delay)
+        stats["requests"] += 1
+        stats["texts"] += len(texts)
+        embeddings = [fake_embedding(text, config["dimension"]) for text in texts]
+        if batched:
+            return {"embeddings": embeddings}
+        return {"embedding": embeddings[0]}
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--request-ms", type=float, default=20)
+    parser.add_argument("--per-text-ms", type=float, default=0.5)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(
+            {
+                "request_latency": {"distribution": "fixed", "ms": args.request_ms},
+                "per_text_latency": {"distribution": "fixed", "ms": args.per_text_ms},
+                "max_concurrency": args.max_concurrency,
+            }
+        ),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
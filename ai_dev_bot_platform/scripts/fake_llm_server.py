@@ -0,0 +1,282 @@
+"""
+Offline stand-in for the LLM providers, for deterministic load and latency testing.
+
+Speaks the two provider APIs LLMClient uses:
+  * OpenRouter chat completions  POST /api/v1/chat/completions  (incl. "stream": true SSE)
+  * Gemini generate content      POST /v1beta/models/{model}:generateContent
+                                 POST /v1beta/models/{model}:streamGenerateContent
+
+Point the application at it through settings (or the equivalent env vars):
+    OPENROUTER_API_URL=http://127.0.0.1:8765/api/v1/chat/completions
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765
+
+Behaviour is driven by a JSON scenario (see DEFAULT_SCENARIO); any key can be
+overridden per model under "models". Latency specs take a "distribution" of
+fixed (ms), uniform (min_ms, max_ms), normal (mean_ms, stddev_ms),
+lognormal (median_ms, sigma) or exponential (mean_ms).
+
+    python -m scripts.fake_llm_server --port 8765 --scenario scenario.json
+
+GET /_fake/stats returns request counts; PUT /_fake/scenario swaps the scenario.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.utils.token_budget import estimate_tokens
+
+DEFAULT_SCENARIO: Dict[str, Any] = {
+    "seed": 1234,
+    # Time to the first byte of the response
+    "latency": {"distribution": "lognormal", "median_ms": 300, "sigma": 0.4},
+    # Delay between streamed chunks
+    "chunk_latency": {"distribution": "fixed", "ms": 10},
+    "chunk_chars": 64,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "retry_after_seconds": 1,
+    # First entry whose regex matches the prompt wins: {"match", "response", "status"}
+    "scripts": [],
+    "default_response": "OK",
+    "models": {},
+}
+
+
+def sample_latency(spec: Optional[dict], rng: random.Random) -> float:
+    """Draw one latency in seconds from a latency spec."""
+    if not spec:
+        return 0.0
+    distribution = spec.get("distribution", "fixed")
+    if distribution == "fixed":
+        ms = spec.get("ms", 0)
+    elif distribution == "uniform":
+        ms = rng.uniform(spec["min_ms"], spec["max_ms"])
+    elif distribution == "normal":
+        ms = rng.gauss(spec["mean_ms"], spec["stddev_ms"])
+    elif distribution == "lognormal":
+        ms = rng.lognormvariate(math.log(spec["median_ms"]), spec.get("sigma", 0.5))
+    elif distribution == "exponential":
+        ms = rng.expovariate(1.0 / spec["mean_ms"])
+    else:
+        raise ValueError(f"Unknown latency distribution: {distribution}")
+    return max(0.0, ms) / 1000.0
+
+
+class FakeLLMProvider:
+    """Scenario state shared by the OpenRouter and Gemini routes."""
+
+    def __init__(self, scenario: Optional[dict] = None):
+        self.stats: Counter = Counter()
+        self.load(scenario or {})
+
+    def load(self, scenario: dict):
+        self.scenario = {**DEFAULT_SCENARIO, **scenario}
+        self.rng = random.Random(self.scenario["seed"])
+
+    def for_model(self, model_name: str) -> dict:
+        return {**self.scenario, **self.scenario["models"].get(model_name, {})}
+
+    def pick_outcome(self, model_name: str, prompt: str) -> dict:
+        """Decide status, text and timings for one request."""
+        scenario = self.for_model(model_name)
+        outcome = {
+            "status": 200,
+            "text": scenario["default_response"],
+            "latency": sample_latency(scenario["latency"], self.rng),
+            "retry_after": scenario["retry_after_seconds"],
+        }
+        roll = self.rng.random()
+        if roll < scenario["rate_limit_rate"]:
+            outcome["status"] = 429
+        elif roll < scenario["rate_limit_rate"] + scenario["error_rate"]:
+            outcome["status"] = 500
+        else:
+            for script in scenario["scripts"]:
+                if re.search(script["match"], prompt):
+                    outcome["text"] = script.get("response", outcome["text"])
+                    outcome["status"] = script.get("status", 200)
+                    break
+        return outcome
+
+    def chunks(self, model_name: str, text: str) -> List[str]:
+        size = max(1, self.for_model(model_name)["chunk_chars"])
+        return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+    def chunk_delay(self, model_name: str) -> float:
+        return sample_latency(self.for_model(model_name)["chunk_latency"], self.rng)
+
+
+def create_app(scenario: Optional[dict] = None) -> FastAPI:
+    provider = FakeLLMProvider(scenario)
+    app = FastAPI(title="Fake LLM provider")
+    app.state.provider = provider
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return dict(provider.stats)
+
+    @app.put("/_fake/scenario")
+    async def replace_scenario(scenario: dict):
+        provider.load(scenario)
+        provider.stats.clear()
+        return provider.scenario
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(payload: dict):
+        model_name = payload.get("model", "")
+        prompt = "\n".join(
+            message.get("content") or "" for message in payload.get("messages", [])
+        )
+        outcome = provider.pick_outcome(model_name, prompt)
+        provider.stats[f"openrouter:{outcome['status']}"] += 1
+        await asyncio.sleep(outcome["latency"])
+
+        if outcome["status"] != 200:
+            return _error_response(
+                outcome, {"error": {"code": outcome["status"], "message": "injected"}}
+            )
+
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt, model_name),
+            "completion_tokens": estimate_tokens(outcome["text"], model_name),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if not payload.get("stream"):
+            return {
+                "id": "fake-completion",
+                "model": model_name,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": outcome["text"]},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+
+        async def events() -> AsyncIterator[str]:
+            yield ": OPENROUTER PROCESSING\n\n"
+            for text in provider.chunks(model_name, outcome["text"]):
+                chunk = {"choices": [{"index": 0, "delta": {"content": text}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(provider.chunk_delay(model_name))
+            final = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            yield f"data: {json.dumps({**final, 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1beta/models/{model_name}:generateContent")
+    async def generate_content(model_name: str, payload: dict):
+        return await _gemini(model_name, payload, stream=False, sse=False)
+
+    @app.post("/v1beta/models/{model_name}:streamGenerateContent")
+    async def stream_generate_content(model_name: str, payload: dict, request: Request):
+        # alt=sse is the public REST API; the SDK's REST transport asks for a JSON array
+        sse = request.query_params.get("alt") == "sse"
+        return await _gemini(model_name, payload, stream=True, sse=sse)
+
+    async def _gemini(model_name: str, payload: dict, stream: bool, sse: bool):
+        prompt = "\n".join(
+            part.get("text", "")
+            for content in payload.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        outcome = provider.pick_outcome(model_name, prompt)
+        provider.stats[f"gemini:{outcome['status']}"] += 1
+        await asyncio.sleep(outcome["latency"])
+
+        if outcome["status"] != 200:
+            status = "RESOURCE_EXHAUSTED" if outcome["status"] == 429 else "INTERNAL"
+            return _error_response(
+                outcome,
+                {
+                    "error": {
+                        "code": outcome["status"],
+                        "message": "injected",
+                        "status": status,
+                    }
+                },
+            )
+
+        prompt_tokens = estimate_tokens(prompt, model_name)
+
+        def candidate(text: str, output_tokens: int) -> dict:
+            return {
+                "candidates": [
+                    {
+                        "content": {"parts": [{"text": text}], "role": "model"},
+                        "finishReason": "STOP",
+                        "index": 0,
+                    }
+                ],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": output_tokens,
+                    "totalTokenCount": prompt_tokens + output_tokens,
+                },
+            }
+
+        if not stream:
+            return candidate(
+                outcome["text"], estimate_tokens(outcome["text"], model_name)
+            )
+
+        async def events() -> AsyncIterator[str]:
+            emitted = ""
+            if not sse:
+                yield "["
+            for index, text in enumerate(provider.chunks(model_name, outcome["text"])):
+                emitted += text
+                body = json.dumps(candidate(text, estimate_tokens(emitted, model_name)))
+                if sse:
+                    yield f"data: {body}\r\n\r\n"
+                else:
+                    yield ("," if index else "") + body + "\n"
+                await asyncio.sleep(provider.chunk_delay(model_name))
+            if not sse:
+                yield "]"
+
+        media_type = "text/event-stream" if sse else "application/json"
+        return StreamingResponse(events(), media_type=media_type)
+
+    return app
+
+
+def _error_response(outcome: dict, body: dict) -> JSONResponse:
+    headers = {}
+    if outcome["status"] == 429:
+        headers["Retry-After"] = str(outcome["retry_after"])
+    return JSONResponse(body, status_code=outcome["status"], headers=headers)
+
+
+def load_scenario(path: Optional[str]) -> dict:
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", help="Path to a JSON scenario file")
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(load_scenario(args.scenario)),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
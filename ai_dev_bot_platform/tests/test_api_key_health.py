@@ -0,0 +1,152 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+from app.services.api_key_health import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    KeyHealthRegistry,
+    is_key_failure,
+)
+from app.services.api_key_manager import APIKeyManager
+from app.utils.llm_client import LLMClient
+
+
+def test_key_failure_classification():
+    assert is_key_failure(None)
+    assert is_key_failure(429)
+    assert is_key_failure(503)
+    assert is_key_failure(401)
+    assert not is_key_failure(200)
+    assert not is_key_failure(400)
+
+
+def test_breaker_opens_probes_and_closes():
+    registry = KeyHealthRegistry()
+    with patch("app.services.api_key_health.settings") as mock_settings:
+        mock_settings.API_KEY_BREAKER_FAILURE_THRESHOLD = 2
+        mock_settings.API_KEY_BREAKER_COOLDOWN_SECONDS = 0
+        mock_settings.API_KEY_BREAKER_PROBE_TIMEOUT_SECONDS = 300.0
+        mock_settings.API_KEY_LATENCY_REFERENCE_SECONDS = 30.0
+
+        registry.record("openrouter", "bad", False, status_code=429)
+        registry.record("openrouter", "bad", False, status_code=429)
+        health = registry.get("openrouter", "bad")
+        assert health.state == OPEN
+
+        # Cooldown elapsed: exactly one half-open probe is let through
+        assert registry.choose("openrouter", ["bad"])[0] == "bad"
+        assert health.state == HALF_OPEN
+        assert not health.allows_request(0)
+
+        registry.record("openrouter", "bad", True, status_code=200, latency=1.0)
+        assert health.state == CLOSED
+
+
+def test_choose_skips_open_circuits():
+    registry = KeyHealthRegistry()
+    with patch("app.services.api_key_health.settings") as mock_settings:
+        mock_settings.API_KEY_BREAKER_FAILURE_THRESHOLD = 1
+        mock_settings.API_KEY_BREAKER_COOLDOWN_SECONDS = 3600
+        mock_settings.API_KEY_LATENCY_REFERENCE_SECONDS = 30.0
+
+        registry.record("openrouter", "bad", False, status_code=500)
+        chosen = {registry.choose("openrouter", ["bad", "good"])[0] for _ in range(20)}
+        assert chosen == {"good"}
+
+
+def test_unreported_probe_expires():
+    registry = KeyHealthRegistry()
+    with patch("app.services.api_key_health.settings") as mock_settings:
+        mock_settings.API_KEY_BREAKER_FAILURE_THRESHOLD = 1
+        mock_settings.API_KEY_BREAKER_COOLDOWN_SECONDS = 0
+        mock_settings.API_KEY_BREAKER_PROBE_TIMEOUT_SECONDS = 300.0
+        mock_settings.API_KEY_LATENCY_REFERENCE_SECONDS = 30.0
+
+        registry.record("openrouter", "bad", False, status_code=500)
+        assert registry.choose("openrouter", ["bad"])[0] == "bad"
+        health = registry.get("openrouter", "bad")
+
+        assert not health.allows_request(health.probe_started_at + 299)
+        assert health.allows_request(health.probe_started_at + 300)
+
+
+@pytest.fixture
+def half_open_manager(monkeypatch):
+    """An APIKeyManager whose only key per provider is past its breaker cooldown."""
+    registry = KeyHealthRegistry()
+    monkeypatch.setattr("app.services.api_key_manager.key_health_registry", registry)
+    monkeypatch.setattr(settings, "API_KEY_BREAKER_COOLDOWN_SECONDS", 0)
+    with patch.object(APIKeyManager, "load_keys_from_db"):
+        manager = APIKeyManager()
+    manager.api_keys = {"openrouter": ["flaky"], "google": ["flaky"]}
+    for provider in manager.api_keys:
+        for _ in range(settings.API_KEY_BREAKER_FAILURE_THRESHOLD):
+            registry.record(provider, "flaky", False, status_code=503)
+    return manager, registry
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_call_frees_the_probe_slot(half_open_manager):
+    manager, registry = half_open_manager
+    health = registry.get("openrouter", "flaky")
+    started = asyncio.Event()
+
+    async def hang(request):
+        started.set()
+        await asyncio.sleep(3600)
+
+    llm_client = LLMClient(manager)
+    LLMClient._http_client = httpx.AsyncClient(transport=httpx.MockTransport(hang))
+    try:
+        call = asyncio.create_task(llm_client.call_openrouter("vendor/model", "hi"))
+        await started.wait()
+        assert health.state == HALF_OPEN and health.probe_in_flight
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+    finally:
+        await LLMClient.shutdown()
+
+    # The cancelled probe reported nothing, but the key can be probed again
+    assert health.state == HALF_OPEN and not health.probe_in_flight
+    assert manager.get_next_key("openrouter") == "flaky"
+    assert health.probe_in_flight
+
+
+@pytest.mark.asyncio
+async def test_probe_failing_before_the_request_frees_the_probe_slot(
+    half_open_manager,
+):
+    manager, registry = half_open_manager
+    health = registry.get("google", "flaky")
+
+    response = await LLMClient(manager).call_gemini("hi", model_name="vendor/model")
+
+    assert response["text_response"].startswith("Error communicating with Gemini")
+    assert health.state == HALF_OPEN and not health.probe_in_flight
+
+
+def test_release_only_frees_the_probe_the_caller_took():
+    registry = KeyHealthRegistry()
+    with patch("app.services.api_key_health.settings") as mock_settings:
+        mock_settings.API_KEY_BREAKER_FAILURE_THRESHOLD = 1
+        mock_settings.API_KEY_BREAKER_COOLDOWN_SECONDS = 0
+        mock_settings.API_KEY_BREAKER_PROBE_TIMEOUT_SECONDS = 300.0
+        mock_settings.API_KEY_LATENCY_REFERENCE_SECONDS = 30.0
+
+        registry.record("openrouter", "bad", False, status_code=500)
+        key, probe = registry.choose("openrouter", ["bad"])
+        health = registry.get("openrouter", "bad")
+        assert key == "bad" and probe is not None
+
+        # The probe is in flight, so this caller gets the all-open fallback
+        key, other = registry.choose("openrouter", ["bad"])
+        assert key == "bad" and other is None
+        registry.release("openrouter", "bad", other)
+        assert health.probe_in_flight
+
+        registry.release("openrouter", "bad", probe)
+        assert not health.probe_in_flight
@@ -0,0 +1,105 @@
+import threading
+import pytest
+from unittest.mock import patch
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models.api_key_models import APIKey
+from app.services import api_key_manager
+from app.services.api_key_manager import (
+    APIKeyManager,
+    get_api_key_manager,
+    refresh_keys,
+)
+from app.services.api_key_usage_counter import KeyUsageCounter
+
+
+@pytest.fixture
+def fake_key_source(monkeypatch):
+    """Serve key pools from a dict instead of the api_keys table."""
+    pools = {"openrouter": ["key-a"]}
+    loads = []
+
+    def load_keys_from_db(self):
+        loads.append(self)
+        self.api_keys = {provider: list(keys) for provider, keys in pools.items()}
+
+    monkeypatch.setattr(api_key_manager, "_shared_manager", None)
+    with patch.object(APIKeyManager, "load_keys_from_db", load_keys_from_db):
+        yield pools, loads
+
+
+@pytest.mark.asyncio
+async def test_shared_manager_is_loaded_once_and_refreshed(fake_key_source):
+    pools, loads = fake_key_source
+
+    manager = get_api_key_manager()
+    assert get_api_key_manager() is manager
+    assert len(loads) == 1
+    assert manager.get_next_key("openrouter") == "key-a"
+
+    # A rotated key becomes visible after a refresh, without a new manager
+    pools["openrouter"] = ["key-b"]
+    counts = await refresh_keys()
+
+    assert counts == {"openrouter": 1}
+    assert len(loads) == 2
+    assert get_api_key_manager() is manager
+    assert manager.get_next_key("openrouter") == "key-b"
+
+
+def test_usage_counter_flushes_in_one_update():
+    engine = create_engine("sqlite://")
+    APIKey.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    db.add_all(
+        [
+            APIKey(id=1, provider="openrouter", encrypted_key="a", usage_count=5),
+            APIKey(id=2, provider="google", encrypted_key="b", usage_count=0),
+        ]
+    )
+    db.commit()
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    counter = KeyUsageCounter()
+    for key_id in (1, 1, 2):
+        counter.increment(key_id)
+
+    assert counter.flush(db) == 3
+    assert counter.pending() == 0
+    assert counter.flush(db) == 0
+    assert len([s for s in statements if s.startswith("UPDATE")]) == 1
+
+    rows = {row.id: row for row in db.query(APIKey).all()}
+    assert rows[1].usage_count == 7
+    assert rows[2].usage_count == 1
+    assert rows[1].last_used is not None
+
+
+def test_usage_counter_concurrent_drains_lose_no_uses():
+    counter = KeyUsageCounter()
+    for i in range(200000):
+        counter.increment(i % 7)
+    start = threading.Barrier(4)
+    drained, errors = [], []
+
+    def drain():
+        start.wait()
+        try:
+            drained.append(counter.drain()[0])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=drain) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sum(sum(counts.values()) for counts in drained) == 200000
+    assert counter.pending() == 0
@@ -0,0 +1,138 @@
+import pytest
+from app.utils.code_chunker import chunk_hash, chunk_source, plan_chunks
+
+PYTHON_SOURCE = '''import os
+
+
+# Loads settings
+def load(path):
+    return open(path).read()
+
+
+class Store:
+    """Keeps things."""
+
+    def get(self, key):
+        return self.items[key]
+
+    @property
+    def size(self):
+        return len(self.items)
+'''
+
+JS_SOURCE = """import x from "y";
+
+// Adds one
+export function addOne(a) {
+  if (a) {
+    return a + 1;
+  }
+  return 1;
+}
+
+class Counter {
+  constructor() {
+    this.value = "}";
+  }
+  increment(step) {
+    this.value += step;
+  }
+}
+"""
+
+MARKDOWN_SOURCE = """# Guide
+Intro text.
+
+## Install
+```
+# not a heading
+pip install app
+```
+
+## Usage
+Run it.
+"""
+
+
+@pytest.mark.parametrize(
+    "file_path, content",
+    [
+        ("app.py", PYTHON_SOURCE),
+        ("app.ts", JS_SOURCE),
+        ("README.md", MARKDOWN_SOURCE),
+        ("notes.txt", "one\n\ntwo\nthree\n\nfour"),
+        ("broken.py", "def broken(:\n    pass\n\nx = 1\n"),
+    ],
+)
+def test_chunks_without_overlap_cover_the_file(file_path, content):
+    for target in (10, 40, 5000):
+        chunks = chunk_source(file_path, content, target)
+        assert "".join(chunk["text"] for chunk in chunks) == content
+        assert chunks[0]["start_line"] == 1
+        assert chunks[-1]["end_line"] == content.count("\n") + (
+            not content.endswith("\n")
+        )
+
+
+def test_python_chunks_follow_definitions_and_split_large_classes():
+    chunks = chunk_source("app.py", PYTHON_SOURCE, 70)
+    assert [chunk["symbols"] for chunk in chunks] == [
+        [],
+        ["load"],
+        ["Store"],
+        ["Store.get"],
+        ["Store.size"],
+    ]
+    # The comment above load() and the decorator of size() stay with them
+    assert chunks[1]["text"].startswith("# Loads settings\ndef load")
+    assert chunks[4]["text"].lstrip().startswith("@property")
+    assert (chunks[1]["start_line"], chunks[1]["end_line"]) == (4, 8)
+
+
+def test_brace_and_markdown_symbols():
+    js_chunks = chunk_source("app.ts", JS_SOURCE, 60)
+    assert [symbol for chunk in js_chunks for symbol in chunk["symbols"]] == [
+        "addOne",
+        "Counter",
+        "Counter.constructor",
+        "Counter.increment",
+    ]
+    md_chunks = chunk_source("README.md", MARKDOWN_SOURCE, 50)
+    assert [chunk["symbols"] for chunk in md_chunks] == [
+        ["Guide"],
+        ["Guide > Install"],
+        ["Guide > Usage"],
+    ]
+
+
+def test_overlap_repeats_trailing_lines_of_previous_chunk():
+    content = "".join(f"line {i}\n\n" for i in range(10))
+    chunks = chunk_source("notes.txt", content, 16, overlap_chars=8)
+    assert (chunks[0]["start_line"], chunks[0]["end_line"]) == (1, 4)
+    # "line 1\n\n" (lines 3-4) is repeated at the start of the next chunk
+    assert (chunks[1]["start_line"], chunks[1]["end_line"]) == (3, 8)
+    assert chunks[1]["text"] == "line 1\n\nline 2\n\nline 3\n\n"
+
+
+def test_long_lines_are_cut_by_characters():
+    chunks = chunk_source("bundle.min.js", "x" * 25, 10)
+    assert [len(chunk["text"]) for chunk in chunks] == [10, 10, 5]
+    assert all(chunk["start_line"] == 1 for chunk in chunks)
+
+
+def test_plan_chunks_keeps_rows_of_unchanged_chunks():
+    content = "first\n\nsecond\n\nthird\n"
+    old_chunks = chunk_source("notes.txt", "first\n\nchanged\n", 8)
+    existing = [
+        (f"row-{i}", chunk_hash(chunk["text"], "model"))
+        for i, chunk in enumerate(old_chunks)
+    ]
+
+    plan = plan_chunks("notes.txt", content, existing, "model", 8)
+
+    assert plan["chunks"] == chunk_source("notes.txt", content, 8)
+    assert plan["keep"] == {0: "row-0"}
+    assert plan["delete"] == ["row-1"]
+    assert plan["to_embed"] == [1, 2]
+    # Rows embedded by another model are not reused
+    assert plan_chunks("notes.txt", content, existing, "other", 8)["keep"] == {}
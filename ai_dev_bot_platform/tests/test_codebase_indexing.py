@@ -1,8 +1,25 @@
 import pytest
 import asyncio
+import time
+import uuid
+import httpx
+import numpy as np
 from unittest.mock import MagicMock, patch
+from sqlalchemy import create_engine, delete, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import sessionmaker
+from app.models.embedding import ProjectEmbedding
+from app.utils.embedding_backends import (
+    HTTPEmbeddingBackend,
+    LocalEmbeddingBackend,
+    hashing_embeddings,
+)
+from app.utils.rank_fusion import reciprocal_rank_fusion
 from app.services.codebase_indexing_service import CodebaseIndexingService
 from app.services.api_key_manager import APIKeyManager
+from scripts.fake_embedding_server import create_app as create_embedding_app
+from scripts.fake_embedding_server import fake_embedding
 
 
 @pytest.mark.asyncio
@@ -146,3 +163,404 @@ async def test_integration_with_storage():
             mock_llm.generate_response.assert_called_once()
             assert result is not None
             assert "Indexed content" in result
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_batches_requests_and_keeps_order(monkeypatch):
+    app = create_embedding_app(
+        {
+            "dimension": 8,
+            "request_latency": None,
+            "per_text_latency": None,
+            "max_batch_size": 3,
+        }
+    )
+    monkeypatch.setattr(
+        "app.services.codebase_indexing_service.settings.EMBEDDING_BATCH_SIZE", 3
+    )
+    indexing_service = CodebaseIndexingService(
+        HTTPEmbeddingBackend(
+            "http://fake/embed",
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+            batch_requests=True,
+        )
+    )
+    texts = [f"chunk {i}" for i in range(7)]
+    try:
+        embeddings = await indexing_service.embed_texts(texts)
+        requests = app.state.stats["requests"]
+        # Batches over the server's limit are rejected and come back as None
+        monkeypatch.setattr(
+            "app.services.codebase_indexing_service.settings.EMBEDDING_BATCH_SIZE", 4
+        )
+        partial = await indexing_service.embed_texts(texts)
+    finally:
+        await indexing_service.close()
+
+    assert embeddings == [fake_embedding(text, 8) for text in texts]
+    assert requests == 3
+    assert partial[:4] == [None] * 4
+    assert partial[4:] == [fake_embedding(text, 8) for text in texts[4:]]
+
+
+@pytest.mark.asyncio
+async def test_http_backend_sends_one_text_per_request_by_default():
+    app = create_embedding_app(
+        {"dimension": 8, "request_latency": None, "per_text_latency": None}
+    )
+    backend = HTTPEmbeddingBackend(
+        "http://fake/embed", httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    )
+    texts = [f"chunk {i}" for i in range(3)]
+    try:
+        embeddings = await backend.embed(texts)
+    finally:
+        await backend.close()
+
+    assert embeddings == [fake_embedding(text, 8) for text in texts]
+    assert app.state.stats["requests"] == 3
+
+
+@pytest.mark.asyncio
+async def test_reindex_embeds_only_changed_chunks(monkeypatch, tmp_path):
+    # A database file: the indexing pipeline writes from worker threads
+    engine = create_engine(f"sqlite:///{tmp_path / 'index.db'}")
+    ProjectEmbedding.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    app = create_embedding_app(
+        {"dimension": 384, "request_latency": None, "per_text_latency": None}
+    )
+    # One function per chunk
+    monkeypatch.setattr(
+        "app.services.codebase_indexing_service.settings.EMBEDDING_CHUNK_TARGET_CHARS",
+        40,
+    )
+    monkeypatch.setattr(
+        "app.services.codebase_indexing_service.settings.EMBEDDING_CHUNK_OVERLAP_CHARS",
+        0,
+    )
+    indexing_service = CodebaseIndexingService(
+        HTTPEmbeddingBackend(
+            "http://fake/embed",
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+        )
+    )
+    project_id = uuid.uuid4()
+    first = "def first():\n    return 1\n\n\n"
+    second = "def second():\n    return 2\n\n\n"
+    third = "def third():\n    return 3\n"
+    try:
+        created = await indexing_service.index_file_content(
+            db, project_id, "main.py", first + second + third
+        )
+        unchanged = await indexing_service.batch_index_files(
+            db, project_id, {"main.py": first + second + third}
+        )
+        # Middle chunk edited, last chunk removed
+        edited = await indexing_service.index_file_content(
+            db, project_id, "main.py", first + second.replace("2", "22")
+        )
+    finally:
+        await indexing_service.close()
+
+    assert created == {"status": "indexed", "embedded": 3, "kept": 0, "deleted": 0}
+    assert unchanged["unchanged_count"] == 1
+    assert unchanged["embedded_chunks"] == 0
+    assert edited == {"status": "indexed", "embedded": 1, "kept": 1, "deleted": 2}
+    assert app.state.stats["texts"] == 4
+    rows = db.query(ProjectEmbedding).order_by(ProjectEmbedding.chunk_index).all()
+    assert [row.symbols for row in rows] == [["first"], ["second"]]
+    assert "return 22" in rows[1].content_chunk
+    assert [(row.start_line, row.end_line) for row in rows] == [(1, 4), (5, 8)]
+    assert all(row.total_chunks == 2 for row in rows)
+    db.close()
+
+
+def test_embedding_index_uses_hnsw_with_l2_opclass():
+    index = next(
+        index
+        for index in ProjectEmbedding.__table__.indexes
+        if index.name == "ix_project_embeddings_embedding_hnsw"
+    )
+    ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+    assert "USING hnsw (embedding vector_l2_ops)" in ddl
+    assert "WITH (m = 16, ef_construction = 64)" in ddl
+
+
+@pytest.mark.asyncio
+async def test_query_codebase_sets_search_params_per_query(monkeypatch):
+    monkeypatch.setattr(
+        "app.services.codebase_indexing_service.settings.EMBEDDING_HNSW_EF_SEARCH", 40
+    )
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    row = ProjectEmbedding(file_path="main.py", content_chunk="x", symbols=["main"])
+    query = db.query.return_value.options.return_value
+    query.filter.return_value.order_by.return_value.limit.return_value.all.return_value = [
+        (row, 0.25)
+    ]
+    indexing_service = CodebaseIndexingService()
+    with patch.object(
+        indexing_service, "_get_embedding_from_service", return_value=[0.0] * 384
+    ):
+        results = await indexing_service.query_codebase(
+            db, uuid.uuid4(), "entry point", ef_search=200, mode="vector"
+        )
+        await indexing_service.query_codebase(
+            db, uuid.uuid4(), "entry point", mode="vector"
+        )
+
+    params = [call.args[1] for call in db.execute.call_args_list]
+    assert params == [
+        {"name": "hnsw.ef_search", "value": "200"},
+        {"name": "hnsw.ef_search", "value": "40"},
+    ]
+    assert results[0]["file_path"] == "main.py"
+    assert results[0]["symbols"] == ["main"]
+    assert results[0]["similarity_score"] == 0.25
+
+
+def _chunk_row(name: str) -> ProjectEmbedding:
+    return ProjectEmbedding(id=uuid.uuid4(), file_path=f"{name}.py", content_chunk=name)
+
+
+@pytest.mark.asyncio
+async def test_hybrid_query_fuses_searches_within_latency_budget():
+    shared, vector_only, lexical_only = (
+        _chunk_row("shared"),
+        _chunk_row("vector"),
+        _chunk_row("lexical"),
+    )
+    lexical_delay = {"seconds": 0.0}
+
+    def vector_rows(db, project_id, embedding, limit, ef_search, probes):
+        return [(vector_only, 0.1), (shared, 0.2)]
+
+    def lexical_rows(db, project_id, query, limit):
+        time.sleep(lexical_delay["seconds"])
+        return [(shared, 0.9), (lexical_only, 0.5)]
+
+    indexing_service = CodebaseIndexingService()
+    db = MagicMock()
+    with patch.object(
+        indexing_service, "_get_embedding_from_service", return_value=[0.0] * 384
+    ), patch.object(indexing_service, "_vector_rows", vector_rows), patch.object(
+        indexing_service, "_lexical_rows", lexical_rows
+    ):
+        fused = await indexing_service.query_codebase(
+            db, uuid.uuid4(), "load_only", top_k=3, mode="hybrid"
+        )
+        lexical_heavy = await indexing_service.query_codebase(
+            db,
+            uuid.uuid4(),
+            "load_only",
+            top_k=3,
+            mode="hybrid",
+            weights={"vector": 0.1, "lexical": 1.0},
+        )
+        lexical_delay["seconds"] = 0.5
+        over_budget = await indexing_service.query_codebase(
+            db, uuid.uuid4(), "load_only", top_k=3, mode="hybrid", latency_budget_ms=50
+        )
+
+    # Found by both searches, so it ranks first
+    assert [r["file_path"] for r in fused] == ["shared.py", "vector.py", "lexical.py"]
+    assert fused[0]["similarity_score"] == 0.2
+    assert fused[2]["similarity_score"] is None
+    assert [r["file_path"] for r in lexical_heavy][:2] == ["shared.py", "lexical.py"]
+    # The slow full-text search is left out
+    assert [r["file_path"] for r in over_budget] == ["vector.py", "shared.py"]
+
+
+def test_lexical_search_is_skipped_with_one_warning_off_postgres(monkeypatch, caplog):
+    monkeypatch.setattr(
+        "app.services.codebase_indexing_service._LEXICAL_UNSUPPORTED_WARNED", set()
+    )
+    engine = create_engine("sqlite://")
+    db = sessionmaker(bind=engine)()
+    indexing_service = CodebaseIndexingService()
+
+    with caplog.at_level("WARNING"):
+        first = indexing_service._lexical_rows(db, uuid.uuid4(), "load_only", 5)
+        second = indexing_service._lexical_rows(db, uuid.uuid4(), "load_only", 5)
+
+    assert first == second == []
+    warnings = [r for r in caplog.records if "Full-text" in r.getMessage()]
+    assert len(warnings) == 1 and warnings[0].levelname == "WARNING"
+    assert not [r for r in caplog.records if r.levelname == "ERROR"]
+
+
+def test_reciprocal_rank_fusion_weights_lists():
+    fused = reciprocal_rank_fusion(
+        {"a": ["x", "y"], "b": ["y", "z"]}, weights={"a": 2.0}, k=1
+    )
+    # y: 2/(1+2) + 1/(1+1); x: 2/(1+1); z: 1/(1+2)
+    assert [item for item, _ in fused] == ["y", "x", "z"]
+    assert fused[0][1] == pytest.approx(2.0 / 3 + 1.0 / 2)
+    assert fused[1][1] == pytest.approx(2.0 / 2)
+
+
+def test_hashing_embeddings_are_unit_vectors_close_for_shared_identifiers():
+    texts = [
+        "def get_user_name(user):\n    return user.name",
+        "def getUserName(user) { return user.name; }",
+        "SELECT total FROM invoices WHERE paid = false",
+        "",
+    ]
+    vectors = hashing_embeddings(texts, 384)
+
+    assert vectors.shape == (4, 384)
+    assert abs(float((vectors[0] ** 2).sum()) - 1.0) < 1e-5
+    assert not vectors[3].any()
+    distance = lambda a, b: float(((vectors[a] - vectors[b]) ** 2).sum())
+    assert distance(0, 1) < distance(0, 2)
+    assert (hashing_embeddings(texts[:1], 384) == vectors[:1]).all()
+
+
+@pytest.mark.asyncio
+async def test_indexing_uses_local_backend_without_service_url(monkeypatch):
+    monkeypatch.setattr(
+        "app.utils.embedding_backends.settings.EMBEDDING_SERVICE_URL", None
+    )
+    monkeypatch.setattr(
+        "app.utils.embedding_backends.settings.EMBEDDING_LOCAL_WORKERS", 2
+    )
+    indexing_service = CodebaseIndexingService()
+    # Over the inline limit, so the batch goes through the process pool
+    texts = [f"def handler_{i}(request):\n    pass\n" * 100 for i in range(3)]
+    try:
+        pooled = await indexing_service.embed_texts(texts)
+        inline = await indexing_service.embed_texts(["def handler_0(request)"])
+    finally:
+        await indexing_service.close()
+
+    assert isinstance(indexing_service._get_backend(), LocalEmbeddingBackend)
+    assert indexing_service._get_backend()._pool is None
+    assert pooled == hashing_embeddings(texts, 384).tolist()
+    assert len(inline[0]) == 384
+
+
+@pytest.mark.asyncio
+async def test_vector_cache_serves_queries_and_is_invalidated_on_write(monkeypatch):
+    monkeypatch.setattr(
+        "app.services.codebase_indexing_service.settings.EMBEDDING_VECTOR_CACHE_ENABLED",
+        True,
+    )
+    engine = create_engine("sqlite://")
+    ProjectEmbedding.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    indexing_service = CodebaseIndexingService(LocalEmbeddingBackend(workers=1))
+    project_id = uuid.uuid4()
+    await indexing_service.index_file_content(
+        db, project_id, "users.py", "def load_user(user_id):\n    return user_id\n"
+    )
+
+    first = await indexing_service.query_codebase(
+        db, project_id, "load_user user_id", mode="vector"
+    )
+    second = await indexing_service.query_codebase(
+        db, project_id, "load_user user_id", mode="vector"
+    )
+    await indexing_service.index_file_content(
+        db, project_id, "orders.py", "def load_order(order_id):\n    return order_id\n"
+    )
+    after_write = await indexing_service.query_codebase(
+        db, project_id, "load_order order_id", mode="vector"
+    )
+
+    assert first == second
+    assert [result["file_path"] for result in first] == ["users.py"]
+    assert [result["file_path"] for result in after_write] == ["orders.py", "users.py"]
+    stats = indexing_service.vector_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_batch_index_writes_files_in_one_insert_and_retries_failed_batch(
+    monkeypatch, tmp_path
+):
+    engine = create_engine(f"sqlite:///{tmp_path / 'index.db'}")
+    ProjectEmbedding.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    inserts = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: (
+            inserts.append(statement) if statement.startswith("INSERT") else None
+        ),
+    )
+    monkeypatch.setattr(
+        "app.services.codebase_indexing_service.settings.EMBEDDING_PIPELINE_CHUNK_WORKERS",
+        3,
+    )
+    indexing_service = CodebaseIndexingService(LocalEmbeddingBackend(workers=1))
+    project_id = uuid.uuid4()
+    files = {f"m{i}.py": f"def f{i}():\n    return {i}\n" for i in range(3)}
+    # Chunking runs in parallel: hold each plan until all three files are
+    # planned, so they reach the write stage together
+    plan = indexing_service._plan_file_update
+    planned = {"count": 0, "event": asyncio.Event()}
+
+    async def plan_together(*args):
+        result = await plan(*args)
+        ready = planned["event"]
+        planned["count"] += 1
+        if planned["count"] == len(files):
+            planned["count"], planned["event"] = 0, asyncio.Event()
+            ready.set()
+        await ready.wait()
+        return result
+
+    monkeypatch.setattr(indexing_service, "_plan_file_update", plan_together)
+
+    try:
+        created = await indexing_service.batch_index_files(db, project_id, files)
+        insert_statements = len(inserts)
+
+        # The batch write fails once; its files are then written one by one
+        write = indexing_service._write_file_updates
+        calls = []
+
+        def failing_write(db, project_id, plans, embeddings):
+            calls.append(len(plans))
+            if len(calls) == 1:
+                db.execute(
+                    delete(ProjectEmbedding).where(
+                        ProjectEmbedding.file_path == "m0.py"
+                    )
+                )
+                raise RuntimeError("insert failed")
+            return write(db, project_id, plans, embeddings)
+
+        monkeypatch.setattr(indexing_service, "_write_file_updates", failing_write)
+        edited = await indexing_service.batch_index_files(
+            db,
+            project_id,
+            {path: content + "\n# v2\n" for path, content in files.items()},
+        )
+    finally:
+        await indexing_service.close()
+
+    assert created["success_count"] == 3 and created["embedded_chunks"] == 3
+    assert insert_statements == 1
+    assert calls == [3, 1, 1, 1]
+    assert edited["success_count"] == 3
+    assert edited["embedded_chunks"] == 3 and edited["deleted_chunks"] == 3
+    rows = db.query(ProjectEmbedding).order_by(ProjectEmbedding.file_path).all()
+    assert [row.file_path for row in rows] == ["m0.py", "m1.py", "m2.py"]
+    assert all(row.content_chunk.endswith("# v2\n") for row in rows)
+
+
+def test_embedding_vector_binds_float32_values_losslessly():
+    process = ProjectEmbedding.__table__.c.embedding.type.bind_processor(
+        postgresql.dialect()
+    )
+    vector = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+
+    bound = process(vector.tolist())
+
+    assert process(vector) == bound
+    parsed = np.array(bound[1:-1].split(","), dtype=np.float64).astype(np.float32)
+    assert (parsed == vector).all()
+    assert process(None) is None
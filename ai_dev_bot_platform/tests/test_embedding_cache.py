@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from app.services.codebase_indexing_service import CodebaseIndexingService
+from app.utils.embedding_backends import LocalEmbeddingBackend
+from app.utils.embedding_cache import (
+    QueryEmbeddingCache,
+    make_query_key,
+    normalize_query,
+)
+
+
+def test_query_key_normalises_text_and_depends_on_model():
+    assert normalize_query("  Architectural\n\tPATTERNS ") == "architectural patterns"
+    assert make_query_key("m", "Add  login") == make_query_key("m", "add login")
+    assert make_query_key("m", "add login") != make_query_key("other", "add login")
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_coalesces_and_skips_failures():
+    cache = QueryEmbeddingCache(max_entries=8, ttl_seconds=60)
+    calls = []
+
+    async def embed(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return None if text == "fails" else [float(len(text))]
+
+    concurrent = await asyncio.gather(
+        cache.get_or_embed("m", "architectural patterns", embed),
+        cache.get_or_embed("m", "Architectural  Patterns", embed),
+    )
+    repeated = await cache.get_or_embed("m", "architectural patterns ", embed)
+    await cache.get_or_embed("m", "fails", embed)
+    await cache.get_or_embed("m", "fails", embed)
+
+    assert concurrent == [[22.0], [22.0]] and repeated == [22.0]
+    assert calls == ["architectural patterns", "fails", "fails"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["coalesced"]) == (1, 4, 1)
+    assert stats["calls_avoided"] == 2 and stats["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_embedded_again():
+    cache = QueryEmbeddingCache(max_entries=8, ttl_seconds=-1)
+    calls = []
+
+    async def embed(text):
+        calls.append(text)
+        return [1.0]
+
+    await cache.get_or_embed("m", "q", embed)
+    await cache.get_or_embed("m", "q", embed)
+
+    assert calls == ["q", "q"]
+
+
+@pytest.mark.asyncio
+async def test_services_share_query_embeddings_per_model():
+    cache = QueryEmbeddingCache(max_entries=8, ttl_seconds=60)
+    backend = LocalEmbeddingBackend(workers=1)
+    calls = []
+    embed = backend.embed
+
+    async def counting_embed(texts):
+        calls.append(texts)
+        return await embed(texts)
+
+    backend.embed = counting_embed
+    first = CodebaseIndexingService(backend, query_embedding_cache=cache)
+    second = CodebaseIndexingService(backend, query_embedding_cache=cache)
+
+    a = await first._get_embedding_from_service("implement the login TODO")
+    b = await second._get_embedding_from_service("Implement the login TODO")
+
+    assert a == b and len(a) == 384
+    assert calls == [["implement the login TODO"]]
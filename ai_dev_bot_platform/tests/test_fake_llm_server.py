@@ -0,0 +1,77 @@
+import random
+import pytest
+import httpx
+from unittest.mock import MagicMock
+from app.utils.llm_client import LLMClient
+from scripts.fake_llm_server import create_app, sample_latency
+
+
+def _client_for(app) -> LLMClient:
+    api_key_manager = MagicMock()
+    api_key_manager.checkout_key.return_value = ("test-key", None)
+    llm_client = LLMClient(api_key_manager)
+    LLMClient._http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return llm_client
+
+
+def test_sample_latency_distributions():
+    rng = random.Random(0)
+    assert sample_latency({"distribution": "fixed", "ms": 250}, rng) == 0.25
+    uniform = sample_latency(
+        {"distribution": "uniform", "min_ms": 10, "max_ms": 20}, rng
+    )
+    assert 0.01 <= uniform <= 0.02
+    assert sample_latency(None, rng) == 0.0
+    with pytest.raises(ValueError):
+        sample_latency({"distribution": "pareto"}, rng)
+
+
+@pytest.mark.asyncio
+async def test_llm_client_against_fake_openrouter(monkeypatch):
+    app = create_app(
+        {
+            "latency": {"distribution": "fixed", "ms": 0},
+            "chunk_latency": None,
+            "chunk_chars": 4,
+            "scripts": [{"match": "plan", "response": "the plan"}],
+        }
+    )
+    monkeypatch.setattr(
+        "app.utils.llm_client.settings.OPENROUTER_API_URL",
+        "http://fake/api/v1/chat/completions",
+    )
+    llm_client = _client_for(app)
+    try:
+        result = await llm_client.call_llm(
+            "vendor/model", "make a plan", use_cache=False
+        )
+        chunks = [
+            chunk
+            async for chunk in llm_client.stream_llm("vendor/model", "make a plan")
+        ]
+    finally:
+        await LLMClient.shutdown()
+
+    assert result["text_response"] == "the plan"
+    assert result["input_tokens"] > 0
+    assert [c["text"] for c in chunks if c["type"] == "delta"] == ["the ", "plan"]
+    assert chunks[-1]["text_response"] == "the plan"
+    assert chunks[-1]["output_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_fake_provider_injects_rate_limits():
+    app = create_app({"latency": None, "rate_limit_rate": 1.0})
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://fake"
+    ) as client:
+        response = await client.post(
+            "/v1beta/models/gemini-test:generateContent",
+            json={"contents": [{"parts": [{"text": "hi"}]}]},
+        )
+        stats = (await client.get("/_fake/stats")).json()
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["error"]["status"] == "RESOURCE_EXHAUSTED"
+    assert stats == {"gemini:429": 1}
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+import google.ai.generativelanguage as glm
+from app.utils.gemini_clients import GeminiClientCache
+from app.utils.llm_client import LLMClient
+
+
+@pytest.mark.asyncio
+async def test_model_handles_are_cached_per_key_and_evicted():
+    # grpc.aio clients are created inside the running event loop, as in call_gemini
+    cache = GeminiClientCache(max_keys=2, max_models=10)
+    with patch("app.utils.gemini_clients.settings") as mock_settings:
+        mock_settings.GEMINI_API_ENDPOINT = None
+        first = cache.model("key-a", "gemini-test")
+        assert cache.model("key-a", "gemini-test") is first
+        assert first.model_name == "models/gemini-test"
+        other_key = cache.model("key-b", "gemini-test")
+        assert other_key is not first
+        assert other_key.client is not first.client
+
+        # A third key evicts the least recently used one and its model handles
+        cache.model("key-c", "gemini-test")
+        assert len(cache) == 2
+        assert cache.model("key-a", "gemini-test") is not first
+    await cache.close()
+
+
+def _response(text: str) -> glm.GenerateContentResponse:
+    return glm.GenerateContentResponse(
+        candidates=[glm.Candidate(content=glm.Content(parts=[glm.Part(text=text)]))],
+        usage_metadata={"prompt_token_count": 2, "candidates_token_count": 1},
+    )
+
+
+@pytest.mark.asyncio
+async def test_evicted_client_is_closed_after_its_last_call():
+    cache = GeminiClientCache(max_keys=1, max_models=10)
+    with patch("app.utils.gemini_clients.settings") as mock_settings:
+        mock_settings.GEMINI_API_ENDPOINT = None
+        model = cache.model("key-a", "gemini-test")
+        closed = []
+        model.client.transport.close = AsyncMock(side_effect=lambda: closed.append(1))
+        release = asyncio.Event()
+        requests = []
+
+        async def generate_content(request):
+            requests.append(request)
+            await release.wait()
+            return _response("hello")
+
+        model.client.generate_content = generate_content
+        call = asyncio.create_task(model.generate("hi", {"temperature": 0.5}))
+        await asyncio.sleep(0)
+
+        # Evicted while a call is in flight: closed only once it finishes
+        cache.model("key-b", "gemini-test")
+        await asyncio.sleep(0)
+        assert closed == []
+        release.set()
+        response = await call
+
+    assert closed == [1]
+    assert response.text == "hello" and response.parts == ["hello"]
+    assert response.usage_metadata.prompt_token_count == 2
+    assert requests[0].model == "models/gemini-test"
+    assert requests[0].contents[0].parts[0].text == "hi"
+    assert requests[0].generation_config.temperature == 0.5
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_call_gemini_uses_the_key_chosen_per_call():
+    keys = iter(["key-a", "key-b"])
+    api_key_manager = MagicMock()
+    api_key_manager.checkout_key.side_effect = lambda provider, exclude=(): (
+        next(keys),
+        None,
+    )
+    llm_client = LLMClient(api_key_manager)
+
+    bound_keys = []
+
+    class FakeModel:
+        def __init__(self, api_key):
+            self.api_key = api_key
+
+        async def generate(self, prompt, params=None):
+            bound_keys.append(self.api_key)
+            return SimpleNamespace(
+                parts=[prompt],
+                text="ok",
+                usage_metadata=SimpleNamespace(
+                    prompt_token_count=1, candidates_token_count=1
+                ),
+            )
+
+    fake_cache = MagicMock()
+    fake_cache.model.side_effect = lambda api_key, model_name: FakeModel(api_key)
+    fake_cache.close = AsyncMock()
+    with patch.object(LLMClient, "_gemini_clients", fake_cache):
+        try:
+            await llm_client.call_gemini("hi", "gemini-test")
+            await llm_client.call_gemini("hi", "gemini-test")
+        finally:
+            await LLMClient.shutdown()
+
+    assert bound_keys == ["key-a", "key-b"]
+    reported = [c.args[1] for c in api_key_manager.report_key_result.call_args_list]
+    assert reported == ["key-a", "key-b"]
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from app.utils.hedging import HedgeBudget, LatencyTracker, run_hedged
+
+
+def _ok(label):
+    return {"text_response": label, "input_tokens": 1, "output_tokens": 1}
+
+
+def test_latency_tracker_needs_min_samples():
+    tracker = LatencyTracker(window_size=10, min_samples=3)
+    tracker.record("m", 1.0)
+    tracker.record("m", 2.0)
+    assert tracker.percentile("m", 0.9) is None
+    tracker.record("m", 3.0)
+    assert tracker.percentile("m", 0.9) == 3.0
+    assert tracker.percentile("m", 0.0) == 1.0
+
+
+def test_censored_samples_push_the_percentile_up():
+    tracker = LatencyTracker(window_size=10, min_samples=4)
+    for seconds in (1.0, 2.0):
+        tracker.record("m", seconds)
+    # Two calls were cut short at 3s: they took at least that long
+    tracker.record("m", 3.0, censored=True)
+    tracker.record("m", 3.0, censored=True)
+    assert tracker.percentile("m", 0.5) == 2.0
+    # Half the mass is beyond 3s and unobserved: return the lower bound
+    assert tracker.percentile("m", 0.9) == 3.0
+    tracker.record("m", 10.0)
+    assert tracker.percentile("m", 0.9) == 10.0
+
+
+def test_hedge_budget_caps_the_share_of_hedges():
+    budget = HedgeBudget(max_share=0.25, burst=1.0)
+    hedges = 0
+    for _ in range(100):
+        budget.on_call()
+        hedges += budget.try_spend()
+    assert hedges == 25
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    hedge_started = False
+
+    async def primary():
+        return _ok("primary")
+
+    async def hedge():
+        nonlocal hedge_started
+        hedge_started = True
+        return _ok("hedge")
+
+    response, outcome = await run_hedged(primary, hedge, delay_seconds=1.0)
+    assert response["text_response"] == "primary"
+    assert outcome == "not_hedged"
+    assert not hedge_started
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_loses_to_hedge_and_is_cancelled():
+    primary_cancelled = asyncio.Event()
+
+    async def primary():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            primary_cancelled.set()
+            raise
+        return _ok("primary")
+
+    async def hedge():
+        return _ok("hedge")
+
+    response, outcome = await run_hedged(primary, hedge, delay_seconds=0.01)
+    await asyncio.sleep(0)
+    assert response["text_response"] == "hedge"
+    assert outcome == "hedge_won"
+    assert primary_cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_failed_hedge_waits_for_primary():
+    async def primary():
+        await asyncio.sleep(0.05)
+        return _ok("primary")
+
+    async def hedge():
+        return {"text_response": "Error: boom"}
+
+    response, outcome = await run_hedged(primary, hedge, delay_seconds=0.01)
+    assert response["text_response"] == "primary"
+    assert outcome == "primary_won"
+
+
+@pytest.mark.asyncio
+async def test_skipped_hedge_returns_the_primary():
+    async def primary():
+        await asyncio.sleep(0.05)
+        return _ok("primary")
+
+    response, outcome = await run_hedged(primary, lambda: None, delay_seconds=0.01)
+    assert response["text_response"] == "primary"
+    assert outcome == "hedge_skipped"
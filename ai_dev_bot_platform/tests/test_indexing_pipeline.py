@@ -0,0 +1,178 @@
+import asyncio
+import uuid
+from typing import List, Optional
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import app.models  # noqa: F401  (maps Project for ProjectFile.project)
+from app.models.embedding import ProjectEmbedding
+from app.models.project_file import ProjectFile
+from app.services.codebase_indexing_service import CodebaseIndexingService
+from app.services.indexing_pipeline import IndexingPipeline
+from app.utils.embedding_backends import (
+    EmbeddingBackend,
+    LocalEmbeddingBackend,
+    hashing_embeddings,
+)
+
+
+class _SlowBackend(EmbeddingBackend):
+    model_id = "slow"
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def max_concurrency(self) -> int:
+        return 1
+
+    async def embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return hashing_embeddings(texts, 384).tolist()
+
+
+def _session(tmp_path):
+    # A database file: the pipeline's read and write stages use their own
+    # sessions in worker threads
+    engine = create_engine(f"sqlite:///{tmp_path / 'index.db'}")
+    ProjectEmbedding.__table__.create(engine)
+    ProjectFile.__table__.create(engine)
+    return sessionmaker(bind=engine)()
+
+
+def _files(count: int, version: int = 0):
+    return {
+        f"src/m{i:02d}.py": f"def f{i}():\n    return {i + version}\n"
+        for i in range(count)
+    }
+
+
+@pytest.mark.asyncio
+async def test_slow_backend_backpressures_reading(monkeypatch, tmp_path):
+    for name, value in (
+        ("EMBEDDING_PIPELINE_QUEUE_SIZE", 1),
+        ("EMBEDDING_PIPELINE_READ_BATCH_FILES", 1),
+        ("EMBEDDING_PIPELINE_CHUNK_WORKERS", 1),
+        ("EMBEDDING_PIPELINE_EMBED_WORKERS", 1),
+        ("EMBEDDING_BATCH_SIZE", 1),
+    ):
+        monkeypatch.setattr(f"app.core.config.settings.{name}", value)
+    db = _session(tmp_path)
+    backend = _SlowBackend(delay=0.01)
+    indexing_service = CodebaseIndexingService(backend)
+    files = _files(20)
+    read: List[str] = []
+    read_at_first_embed = []
+    embed = backend.embed
+
+    async def tracking_embed(texts):
+        result = await embed(texts)
+        read_at_first_embed.append(len(read))
+        return result
+
+    backend.embed = tracking_embed
+
+    def load(session, paths):
+        read.extend(paths)
+        return {path: files[path] for path in paths}
+
+    try:
+        result = await IndexingPipeline(indexing_service, db, uuid.uuid4()).run(
+            list(files), load
+        )
+    finally:
+        await indexing_service.close()
+
+    # Only a few files are read ahead of the embedding stage
+    assert read_at_first_embed[0] <= 6
+    assert read == list(files)
+    assert result["success_count"] == 20 and result["embedded_chunks"] == 20
+    assert backend.calls == 20
+    assert all(depth <= 1 for depth in result["max_queue_depth"].values())
+    assert {stage: stats["files"] for stage, stats in result["stages"].items()} == {
+        "read": 20,
+        "chunk": 20,
+        "embed": 20,
+        "write": 20,
+    }
+    assert db.query(ProjectEmbedding).count() == 20
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_embed_workers_and_other_callers_share_the_backend_limit(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setattr("app.core.config.settings.EMBEDDING_PIPELINE_EMBED_WORKERS", 4)
+    monkeypatch.setattr("app.core.config.settings.EMBEDDING_BATCH_SIZE", 1)
+    db = _session(tmp_path)
+    backend = _SlowBackend(delay=0.01)
+    indexing_service = CodebaseIndexingService(backend)
+    files = _files(8)
+
+    try:
+        result, searched = await asyncio.gather(
+            IndexingPipeline(indexing_service, db, uuid.uuid4()).run(
+                list(files), lambda session, paths: {p: files[p] for p in paths}
+            ),
+            indexing_service.embed_texts([f"query {i}" for i in range(4)]),
+        )
+    finally:
+        await indexing_service.close()
+
+    assert result["embedded_chunks"] == 8 and all(searched)
+    assert backend.calls == 12
+    assert backend.max_in_flight == 1
+    db.close()
+
+
+@pytest.mark.asyncio
+async def test_reindex_project_indexes_stored_files_and_drops_removed_ones(
+    monkeypatch, tmp_path
+):
+    # Every file goes through the chunking pool
+    monkeypatch.setattr(
+        "app.services.codebase_indexing_service._INLINE_CHUNK_MAX_CHARS", 0
+    )
+    db = _session(tmp_path)
+    indexing_service = CodebaseIndexingService(LocalEmbeddingBackend(workers=1))
+    project_id = uuid.uuid4()
+    files = _files(5)
+    await indexing_service.batch_index_files(db, project_id, files)
+    # m00 is deleted, m01 edited, m02 emptied and a new file is added
+    del files["src/m00.py"]
+    files["src/m01.py"] += "\n# edited\n"
+    files["src/m02.py"] = None
+    files["src/new.py"] = "def new():\n    return 0\n"
+    db.add_all(
+        ProjectFile(project_id=project_id, file_path=path, content=content)
+        for path, content in files.items()
+    )
+    db.commit()
+
+    try:
+        result = await indexing_service.reindex_project(db, project_id)
+    finally:
+        await indexing_service.close()
+
+    assert result["removed_files"] == 1
+    assert result["total_files"] == 5 and result["success_count"] == 5
+    assert result["unchanged_count"] == 2
+    assert result["embedded_chunks"] == 2 and result["deleted_chunks"] == 2
+    indexed = {
+        path
+        for (path,) in db.query(ProjectEmbedding.file_path)
+        .filter(ProjectEmbedding.project_id == project_id)
+        .distinct()
+    }
+    assert indexed == {"src/m01.py", "src/m03.py", "src/m04.py", "src/new.py"}
+    db.close()
@@ -0,0 +1,54 @@
+import time
+import pytest
+from app.utils.llm_cache import (
+    LLMResponseCache,
+    MemoryCacheTier,
+    SQLiteCacheTier,
+    make_cache_key,
+)
+
+
+def test_cache_key_depends_on_every_input():
+    base = make_cache_key("m", "prompt", "system")
+    assert base == make_cache_key("m", "prompt", "system")
+    assert base != make_cache_key("other", "prompt", "system")
+    assert base != make_cache_key("m", "prompt", None)
+    assert base != make_cache_key("m", "prompt", "system", {"temperature": 0})
+
+
+def test_memory_tier_evicts_least_recently_used_and_expired():
+    tier = MemoryCacheTier(max_entries=2)
+    future = time.time() + 60
+    tier.set("a", {"v": 1}, future)
+    tier.set("b", {"v": 2}, future)
+    tier.get("a")
+    tier.set("c", {"v": 3}, future)
+    assert tier.get("b") is None
+    assert tier.get("a") == {"v": 1}
+
+    tier.set("old", {"v": 0}, time.time() - 1)
+    assert tier.get("old") is None
+
+
+def test_sqlite_tier_bounds_entries(tmp_path):
+    tier = SQLiteCacheTier(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    future = time.time() + 60
+    for key in ("a", "b", "c"):
+        tier.set(key, {"key": key}, future)
+    assert tier.get("a") is None
+    assert tier.get("c")[1] == {"key": "c"}
+    tier.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_hit_is_promoted_to_memory(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = LLMResponseCache(60, 10, path, 10)
+    await writer.set("k", {"text_response": "hi"})
+    writer.close()
+
+    reader = LLMResponseCache(60, 10, path, 10)
+    assert len(reader.memory) == 0
+    assert await reader.get("k") == {"text_response": "hi"}
+    assert reader.memory.get("k") == {"text_response": "hi"}
+    reader.close()
@@ -0,0 +1,370 @@
+import asyncio
+import json
+import pytest
+import httpx
+from unittest.mock import MagicMock
+from prometheus_client import REGISTRY
+from app.core.config import settings
+from app.utils.hedging import HedgeBudget, LatencyTracker
+from app.utils.llm_client import LLMClient
+from app.utils.rate_limiter import key_fingerprint
+
+
+def _make_client(responder) -> LLMClient:
+    """Build an LLMClient whose shared HTTP client is served by `responder`."""
+    api_key_manager = MagicMock()
+    api_key_manager.checkout_key.return_value = ("test-key", None)
+    llm_client = LLMClient(api_key_manager)
+    LLMClient._http_client = httpx.AsyncClient(transport=httpx.MockTransport(responder))
+    return llm_client
+
+
+def _openrouter_ok(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={
+            "choices": [{"message": {"content": "hello"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 1},
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_shared_http_client_lifecycle():
+    await LLMClient.startup()
+    client = LLMClient.get_http_client()
+    assert LLMClient.get_http_client() is client
+
+    await LLMClient.shutdown()
+    assert client.is_closed
+    assert LLMClient._http_client is None
+
+
+@pytest.mark.asyncio
+async def test_call_openrouter_reuses_shared_client():
+    seen_clients = []
+
+    def responder(request):
+        seen_clients.append(id(LLMClient._http_client))
+        return _openrouter_ok(request)
+
+    first = _make_client(responder)
+    second = LLMClient(first.api_key_manager)
+    try:
+        result_a = await first.call_openrouter("vendor/model", "hi")
+        result_b = await second.call_openrouter("vendor/model", "hi")
+    finally:
+        await LLMClient.shutdown()
+
+    assert result_a["text_response"] == "hello"
+    assert result_b["input_tokens"] == 3
+    assert len(set(seen_clients)) == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_openrouter_yields_deltas_then_final_usage():
+    sse_body = (
+        ": OPENROUTER PROCESSING\n\n"
+        'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+        'data: {"choices": [], "usage": {"prompt_tokens": 7, "completion_tokens": 2}}\n\n'
+        "data: [DONE]\n\n"
+    )
+
+    def responder(request):
+        assert b'"stream":true' in request.content.replace(b" ", b"")
+        return httpx.Response(
+            200, text=sse_body, headers={"content-type": "text/event-stream"}
+        )
+
+    llm_client = _make_client(responder)
+    try:
+        chunks = [chunk async for chunk in llm_client.stream_llm("vendor/model", "hi")]
+    finally:
+        await LLMClient.shutdown()
+
+    assert [c["text"] for c in chunks if c["type"] == "delta"] == ["Hel", "lo"]
+    final = chunks[-1]
+    assert final["type"] == "final"
+    assert final["text_response"] == "Hello"
+    assert final["input_tokens"] == 7
+    assert final["output_tokens"] == 2
+
+
+@pytest.mark.asyncio
+async def test_call_llm_serves_cached_response_flagged_as_cached(monkeypatch):
+    from app.utils.llm_cache import LLMResponseCache
+
+    calls = []
+
+    def responder(request):
+        calls.append(request)
+        return _openrouter_ok(request)
+
+    llm_client = _make_client(responder)
+    monkeypatch.setattr(LLMClient, "_response_cache", LLMResponseCache(60, 10))
+    try:
+        first = await llm_client.call_llm("vendor/model", "hi", use_cache=True)
+        second = await llm_client.call_llm("vendor/model", "hi", use_cache=True)
+        bypassed = await llm_client.call_llm("vendor/model", "hi", use_cache=False)
+    finally:
+        await LLMClient.shutdown()
+
+    assert len(calls) == 2
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert second["text_response"] == first["text_response"]
+    assert "cached" not in bypassed
+    # The hit did not make a provider call, so it carries none of its timings
+    assert "response_time_ms" in first and "api_key_identifier" in first
+    assert "response_time_ms" not in second and "api_key_identifier" not in second
+
+
+@pytest.mark.asyncio
+async def test_call_llm_sends_params_and_caches_per_params(monkeypatch):
+    from app.utils.llm_cache import LLMResponseCache
+
+    bodies = []
+
+    def responder(request):
+        bodies.append(json.loads(request.content))
+        return _openrouter_ok(request)
+
+    llm_client = _make_client(responder)
+    monkeypatch.setattr(LLMClient, "_response_cache", LLMResponseCache(60, 10))
+    try:
+        cold = await llm_client.call_llm(
+            "vendor/model", "hi", use_cache=True, params={"temperature": 0.0}
+        )
+        warm = await llm_client.call_llm(
+            "vendor/model", "hi", use_cache=True, params={"temperature": 0.9}
+        )
+        repeat = await llm_client.call_llm(
+            "vendor/model", "hi", use_cache=True, params={"temperature": 0.0}
+        )
+    finally:
+        await LLMClient.shutdown()
+
+    assert [body["temperature"] for body in bodies] == [0.0, 0.9]
+    assert "cached" not in cold and "cached" not in warm
+    assert repeat["cached"] is True
+
+
+@pytest.mark.asyncio
+async def test_stream_llm_coalesces_identical_calls_and_caches_the_result(
+    monkeypatch,
+):
+    import asyncio
+    from app.utils.llm_cache import LLMResponseCache
+
+    calls = []
+    release = asyncio.Event()
+    sse_body = (
+        'data: {"choices": [{"delta": {"content": "plan"}}]}\n\n'
+        'data: {"choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 1}}\n\n'
+        "data: [DONE]\n\n"
+    )
+
+    async def responder(request):
+        calls.append(request)
+        await release.wait()
+        return httpx.Response(
+            200, text=sse_body, headers={"content-type": "text/event-stream"}
+        )
+
+    async def collect():
+        return [
+            chunk
+            async for chunk in llm_client.stream_llm(
+                "vendor/model", "plan it", use_cache=True
+            )
+        ]
+
+    llm_client = _make_client(responder)
+    monkeypatch.setattr(LLMClient, "_response_cache", LLMResponseCache(60, 10))
+    try:
+        leader = asyncio.create_task(collect())
+        await asyncio.sleep(0)
+        joiners = asyncio.gather(
+            collect(), llm_client.call_llm("vendor/model", "plan it", use_cache=True)
+        )
+        await asyncio.sleep(0.01)
+        release.set()
+        led = await leader
+        joined_stream, joined_call = await joiners
+        cached = await collect()
+    finally:
+        await LLMClient.shutdown()
+
+    assert len(calls) == 1
+    assert led[-1]["text_response"] == "plan" and "coalesced" not in led[-1]
+    assert joined_stream[0] == {"type": "delta", "text": "plan"}
+    assert len(joined_stream) == 2 and joined_stream[-1]["type"] == "final"
+    assert joined_stream[-1]["coalesced"] is True
+    assert joined_call["coalesced"] is True
+    assert joined_call["text_response"] == "plan"
+    assert cached[0] == {"type": "delta", "text": "plan"}
+    assert cached[-1]["cached"] is True
+
+
+@pytest.mark.asyncio
+async def test_call_llm_many_keeps_order_and_isolates_failures():
+    from decimal import Decimal
+    from types import SimpleNamespace
+
+    def responder(request):
+        prompt = json.loads(request.content)["messages"][-1]["content"]
+        if prompt == "boom":
+            return httpx.Response(500, text="provider down")
+        return httpx.Response(
+            200,
+            json={
+                "choices": [{"message": {"content": prompt.upper()}}],
+                "usage": {"prompt_tokens": 1000000, "completion_tokens": 1000000},
+            },
+        )
+
+    llm_client = _make_client(responder)
+    pricing = SimpleNamespace(
+        input_cost_per_million_tokens=Decimal("1"),
+        output_cost_per_million_tokens=Decimal("2"),
+    )
+    try:
+        batch = await llm_client.call_llm_many(
+            [
+                {"model_name": "vendor/model", "prompt": prompt, "use_cache": False}
+                for prompt in ["a", "boom", "c"]
+            ],
+            max_concurrency=2,
+            pricing_lookup=lambda model_name: pricing,
+        )
+    finally:
+        await LLMClient.shutdown()
+
+    texts = [result["text_response"] for result in batch["results"]]
+    assert texts[0] == "A" and texts[2] == "C"
+    assert texts[1].startswith("Error")
+    assert batch["succeeded"] == 2 and batch["failed"] == 1
+    assert batch["input_tokens"] == 2000000
+    assert batch["output_tokens"] == 2000000
+    assert batch["cost_usd"] == Decimal("6")
+
+
+@pytest.mark.asyncio
+async def test_call_llm_reports_call_timings_and_metrics():
+    labels = {
+        "provider": "openrouter",
+        "model": "vendor/model",
+        "task_type": "planning",
+    }
+    before = (
+        REGISTRY.get_sample_value("llm_request_duration_seconds_count", labels) or 0
+    )
+    llm_client = _make_client(_openrouter_ok)
+    try:
+        result = await llm_client.call_llm(
+            "vendor/model", "hi", use_cache=False, task_type="planning"
+        )
+    finally:
+        await LLMClient.shutdown()
+
+    assert result["response_time_ms"] >= result["ttfb_ms"] >= 0
+    assert result["output_tokens_per_second"] >= 0
+    assert result["api_key_identifier"] == key_fingerprint("test-key")
+    after = REGISTRY.get_sample_value("llm_request_duration_seconds_count", labels)
+    assert after == before + 1
+    assert (
+        REGISTRY.get_sample_value("llm_time_to_first_byte_seconds_count", labels) >= 1
+    )
+
+
+@pytest.fixture
+def hedged_planning(monkeypatch):
+    """Hedge planning calls after 50ms, with a fresh tracker and an unlimited budget."""
+    monkeypatch.setattr(
+        settings,
+        "LLM_HEDGE_POLICIES",
+        {
+            "planning": {
+                "enabled": True,
+                "percentile": 0.95,
+                "fallback_model": None,
+                "default_delay_seconds": 0.05,
+            }
+        },
+    )
+    monkeypatch.setattr(LLMClient, "_latency_tracker", LatencyTracker(200, 20))
+    monkeypatch.setattr(LLMClient, "_hedge_budget", HedgeBudget(1.0, 1.0))
+
+
+def _keyed_client(keys, seen_keys) -> LLMClient:
+    """An LLMClient over `keys`, where the first key answers slowly."""
+
+    async def responder(request):
+        key = request.headers["Authorization"].removeprefix("Bearer ")
+        seen_keys.append(key)
+        if key == keys[0]:
+            await asyncio.sleep(0.5)
+        return _openrouter_ok(request)
+
+    llm_client = _make_client(responder)
+    manager = llm_client.api_key_manager
+    manager.checkout_key.side_effect = lambda provider, exclude=(): (
+        next(key for key in keys if key not in exclude),
+        None,
+    )
+    manager.has_other_key.side_effect = lambda provider, exclude: any(
+        key not in exclude for key in keys
+    )
+    return llm_client
+
+
+@pytest.mark.asyncio
+async def test_same_model_hedge_goes_to_another_key(hedged_planning):
+    seen_keys = []
+    llm_client = _keyed_client(["slow-key", "fast-key"], seen_keys)
+    try:
+        result = await llm_client.call_llm(
+            "vendor/model", "hi", use_cache=False, task_type="planning"
+        )
+    finally:
+        await LLMClient.shutdown()
+
+    assert seen_keys == ["slow-key", "fast-key"]
+    assert result["api_key_identifier"] == key_fingerprint("fast-key")
+    # The cancelled primary is kept as a censored sample of at least the delay
+    samples = LLMClient.get_latency_tracker()._samples["vendor/model"]
+    censored = [seconds for seconds, is_censored in samples if is_censored]
+    assert len(censored) == 1 and censored[0] >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_hedge_is_skipped_without_another_key(hedged_planning):
+    seen_keys = []
+    llm_client = _keyed_client(["slow-key"], seen_keys)
+    before = (
+        REGISTRY.get_sample_value(
+            "llm_hedged_requests_total",
+            {"task_type": "planning", "outcome": "hedge_skipped"},
+        )
+        or 0
+    )
+    try:
+        result = await llm_client.call_llm(
+            "vendor/model", "hi", use_cache=False, task_type="planning"
+        )
+    finally:
+        await LLMClient.shutdown()
+
+    assert seen_keys == ["slow-key"]
+    assert result["text_response"] == "hello"
+    assert LLMClient.get_hedge_budget().try_spend()
+    after = REGISTRY.get_sample_value(
+        "llm_hedged_requests_total",
+        {"task_type": "planning", "outcome": "hedge_skipped"},
+    )
+    assert after == before + 1
+
+
+def test_hedge_policies_ship_disabled():
+    assert not any(policy["enabled"] for policy in settings.LLM_HEDGE_POLICIES.values())
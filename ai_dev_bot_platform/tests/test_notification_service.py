@@ -0,0 +1,42 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.services.notification_service import (
+    NotificationService,
+    ProgressMessage,
+    TELEGRAM_MAX_MESSAGE_LENGTH,
+)
+
+
+def _make_progress(min_interval: float) -> ProgressMessage:
+    notifier = MagicMock(spec=NotificationService)
+    notifier.send_update = AsyncMock(return_value=42)
+    notifier.edit_update = AsyncMock(return_value=True)
+    progress = ProgressMessage(notifier, chat_id=1)
+    progress.min_interval = min_interval
+    return progress
+
+
+@pytest.mark.asyncio
+async def test_progress_message_throttles_edits_and_flushes_on_finish():
+    progress = _make_progress(min_interval=3600)
+    await progress.start("Thinking...")
+
+    await progress.update("a")
+    await progress.update("ab")
+    progress.notifier.edit_update.assert_not_awaited()
+
+    await progress.finish()
+    progress.notifier.edit_update.assert_awaited_once_with(1, 42, "Thinking...\n\nab")
+
+
+@pytest.mark.asyncio
+async def test_progress_message_keeps_tail_within_telegram_limit():
+    progress = _make_progress(min_interval=0)
+    await progress.start("Thinking...")
+
+    await progress.update("x" * 10000 + "END")
+
+    sent_text = progress.notifier.edit_update.await_args.args[2]
+    assert len(sent_text) <= TELEGRAM_MAX_MESSAGE_LENGTH
+    assert sent_text.startswith("Thinking...")
+    assert sent_text.endswith("END")
@@ -2,121 +2,134 @@ import pytest
 import uuid
 from unittest.mock import MagicMock, AsyncMock
 from datetime import datetime
-from app.services.orchestrator_service import ModelOrchestrator
+from app.services.orchestrator_service import OrchestratorService
+from app.services.service_container import ServiceContainer
 from app.schemas.user import User
 
 
-@pytest.mark.asyncio
-async def test_handle_new_project_flow(mocker):
-    # 1. Setup
-    mock_db = MagicMock()
+@pytest.fixture
+def services():
+    api_key_manager = MagicMock()
+    api_key_manager.checkout_key.return_value = (None, None)
+    container = ServiceContainer(api_key_manager)
+    container.project_service = MagicMock()
+    container.project_file_service = MagicMock()
+    container.architect_agent = MagicMock()
+    container.implementer_agent = MagicMock()
+    container.notifier = MagicMock()
+    container.notifier.send_update = AsyncMock()
+    progress = container.notifier.progress_message.return_value
+    progress.start = AsyncMock()
+    progress.update = AsyncMock()
+    progress.finish = AsyncMock()
+    return container
 
-    # Mock the services that the orchestrator initializes
-    mocker.patch("app.services.orchestrator_service.APIKeyManager")
-    mocker.patch("app.services.orchestrator_service.LLMClient")
-    mock_architect_agent = mocker.patch(
-        "app.services.orchestrator_service.ArchitectAgent"
-    )
-    mocker.patch("app.services.orchestrator_service.ImplementerAgent")
-    mock_project_service = mocker.patch(
-        "app.services.orchestrator_service.ProjectService"
+
+def _user() -> User:
+    return User(
+        id=1,
+        telegram_user_id=123,
+        credit_balance=100,
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1),
     )
-    mock_storage_service = mocker.patch(
-        "app.services.orchestrator_service.StorageService"
+
+
+def test_orchestrator_uses_the_process_container_by_default(mocker, services):
+    mocker.patch(
+        "app.services.orchestrator_service.get_service_container",
+        return_value=services,
     )
-    # ... mock other services if needed
 
-    # Instantiate the orchestrator (its __init__ will use the mocked classes)
-    orchestrator = ModelOrchestrator(mock_db)
+    orchestrator = OrchestratorService(MagicMock())
+
+    assert orchestrator.architect_agent is services.architect_agent
+    assert orchestrator.project_service is services.project_service
+    assert orchestrator.notifier is services.notifier
+
 
-    # Configure the mocks to return expected values
+@pytest.mark.asyncio
+async def test_start_planning_phase_flow(services):
+    # 1. Setup
+    mock_db = MagicMock()
     fake_project_id = uuid.uuid4()
-    mock_project_service.return_value.create_project.return_value = MagicMock(
-        id=fake_project_id, title="Fake Project"
+    services.project_service.get_project.return_value = MagicMock(
+        id=fake_project_id, title="Fake Project", description="create a web app"
     )
-    mock_architect_agent.return_value.generate_initial_plan_and_docs = AsyncMock(
+    services.architect_agent.generate_initial_plan_and_docs = AsyncMock(
         return_value={
-            "todo_list_markdown": "[ ] Task 1",
-            "tech_stack_suggestion": {},
-            "llm_call_details": {
-                "model_name_used": "fake-model"
-            },  # For credit deduction
+            "todo_list_markdown": "- [ ] Task 1",
+            "tech_stack_suggestion": {"backend": ["FastAPI"]},
+            "llm_call_details": {"model_name_used": "fake-model"},
         }
     )
-
-    # Mock the credit deduction method so it doesn't run real logic
-    orchestrator._deduct_credits_for_llm_call = AsyncMock()
+    orchestrator = OrchestratorService(mock_db, services)
 
     # 2. Action
-    test_user = User(
-        id=1,
-        telegram_user_id=123,
-        credit_balance=100,
-        created_at=datetime(2024, 1, 1),
-        updated_at=datetime(2024, 1, 1),
-    )
-    result = await orchestrator._handle_new_project(test_user, "create a new web app")
+    await orchestrator.start_planning_phase(fake_project_id, telegram_chat_id=42)
 
     # 3. Assert
-    mock_project_service.return_value.create_project.assert_called_once()
-    mock_architect_agent.return_value.generate_initial_plan_and_docs.assert_awaited_once()
-    orchestrator._deduct_credits_for_llm_call.assert_awaited_once()
-    mock_project_service.return_value.update_project.assert_called_once()
-    mock_storage_service.return_value.create_bucket.assert_called_once()
-    assert "Project 'Fake Project' created!" in result["text"]
+    progress = services.notifier.progress_message.return_value
+    services.architect_agent.generate_initial_plan_and_docs.assert_awaited_once_with(
+        project_requirements="create a web app",
+        project_title="Fake Project",
+        on_progress=progress.update,
+    )
+    progress.start.assert_awaited_once()
+    progress.finish.assert_awaited_once()
+    db, project_id, update = services.project_service.update_project.call_args.args
+    assert db is mock_db and project_id == fake_project_id
+    assert update.status == "planning_complete"
+    assert update.current_todo_markdown == "- [ ] Task 1"
+    chat_id, message = services.notifier.send_update.await_args.args
+    assert chat_id == 42
+    assert "Architect has finished!" in message and "- [ ] Task 1" in message
 
 
 @pytest.mark.asyncio
-async def test_handle_refine_request_flow(mocker):
-    # 1. Setup
-    mock_db = MagicMock()
-
-    # Mock services
-    mocker.patch("app.services.orchestrator_service.APIKeyManager")
-    mocker.patch("app.services.orchestrator_service.LLMClient")
-    mocker.patch("app.services.orchestrator_service.ArchitectAgent")
-    mock_implementer_agent = mocker.patch(
-        "app.services.orchestrator_service.ImplementerAgent"
+async def test_start_planning_phase_reports_architect_errors(services):
+    services.project_service.get_project.return_value = MagicMock(
+        title="Fake Project", description="create a web app"
     )
-    mock_project_service = mocker.patch(
-        "app.services.orchestrator_service.ProjectService"
+    services.architect_agent.generate_initial_plan_and_docs = AsyncMock(
+        return_value={"error": "Error: model unavailable"}
     )
-    mock_file_service = mocker.patch(
-        "app.services.orchestrator_service.ProjectFileService"
-    )
-    mock_storage_service = mocker.patch(
-        "app.services.orchestrator_service.StorageService"
+    orchestrator = OrchestratorService(MagicMock(), services)
+
+    await orchestrator.start_planning_phase(uuid.uuid4(), telegram_chat_id=42)
+
+    services.project_service.update_project.assert_not_called()
+    services.notifier.send_update.assert_awaited_once_with(
+        42, "Sorry, the architect ran into an issue: Error: model unavailable"
     )
 
-    # Instantiate the orchestrator
-    orchestrator = ModelOrchestrator(mock_db)
 
-    # Configure mocks
+@pytest.mark.asyncio
+async def test_handle_refine_file_flow(services):
+    # 1. Setup
+    mock_db = MagicMock()
     fake_project_id = uuid.uuid4()
-    mock_project_service.return_value.get_project.return_value = MagicMock(
-        id=fake_project_id
+    services.project_service.get_active_project = AsyncMock(
+        return_value=MagicMock(id=fake_project_id, description="a web app")
     )
-    mock_storage_service.return_value.download_file.return_value = "original code"
-    mock_implementer_agent.return_value.apply_changes_with_aider = AsyncMock(
-        return_value={"status": "success"}
+    services.project_file_service.get_file = AsyncMock(return_value="original code")
+    services.project_file_service.update_file = AsyncMock()
+    services.implementer_agent.refine_file = AsyncMock(
+        return_value={"content": "refined code"}
     )
+    orchestrator = OrchestratorService(mock_db, services)
 
     # 2. Action
-    test_user = User(
-        id=1,
-        telegram_user_id=123,
-        credit_balance=100,
-        created_at=datetime(2024, 1, 1),
-        updated_at=datetime(2024, 1, 1),
-    )
-    await orchestrator._handle_refine_request(
-        test_user, str(fake_project_id), "src/main.py", "add a comment"
-    )
+    result = await orchestrator.process_user_request(_user(), "refine file src/main.py")
 
     # 3. Assert
-    mock_storage_service.return_value.download_file.assert_called_once_with(
-        str(fake_project_id), "src/main.py"
+    services.project_file_service.get_file.assert_awaited_once_with(
+        mock_db, fake_project_id, "src/main.py"
+    )
+    services.implementer_agent.refine_file.assert_awaited_once_with(
+        "a web app", "src/main.py", "original code"
+    )
+    services.project_file_service.update_file.assert_awaited_once_with(
+        mock_db, fake_project_id, "src/main.py", "refined code"
     )
-    mock_implementer_agent.return_value.apply_changes_with_aider.assert_awaited_once()
-    mock_storage_service.return_value.upload_file.assert_called_once()
-    mock_file_service.return_value.update_file_content.assert_called_once()
+    assert result == {"status": "success", "file_path": "src/main.py"}
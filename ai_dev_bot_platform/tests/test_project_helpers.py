@@ -0,0 +1,80 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from app.core.config import settings
+from app.services.project_helpers import ProjectHelpers
+
+
+def _helpers() -> ProjectHelpers:
+    services = MagicMock()
+    services.model_pricing_service.get_pricing.return_value = MagicMock(
+        input_cost_per_million_tokens=Decimal("1"),
+        output_cost_per_million_tokens=Decimal("2"),
+    )
+    services.api_key_usage_service.log_usage.return_value = MagicMock(id=7)
+    return ProjectHelpers(MagicMock(), services)
+
+
+def _response(**flags) -> dict:
+    # 1M input + 1M output tokens: $3, i.e. 300 credits at 1.5x = 450
+    return {
+        "text_response": "ok",
+        "input_tokens": 1000000,
+        "output_tokens": 1000000,
+        "model_name_used": "vendor/model",
+        **flags,
+    }
+
+
+@pytest.mark.asyncio
+async def test_fresh_call_logs_key_usage_and_charges(monkeypatch):
+    monkeypatch.setattr(settings, "PLATFORM_CREDIT_VALUE_USD", 0.01)
+    monkeypatch.setattr(settings, "MARKUP_FACTOR", 1.5)
+    helpers = _helpers()
+    user = MagicMock(id=1, telegram_user_id=123)
+
+    await helpers.deduct_credits_for_llm_call(user, _response(), "planning")
+
+    helpers.api_key_usage_service.log_usage.assert_called_once()
+    helpers.user_service.update_user_credits.assert_called_once_with(
+        helpers.db, 123, Decimal("450.00"), is_deduction=True
+    )
+    transaction = helpers.credit_transaction_service.record_transaction.call_args[0][1]
+    assert transaction["api_key_usage_id"] == 7
+    assert transaction["real_cost_associated_usd"] == Decimal("3")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("flag", ["cached", "coalesced"])
+async def test_reused_response_charges_each_caller(monkeypatch, flag):
+    monkeypatch.setattr(settings, "PLATFORM_CREDIT_VALUE_USD", 0.01)
+    monkeypatch.setattr(settings, "MARKUP_FACTOR", 1.5)
+    monkeypatch.setattr(settings, "LLM_CHARGE_REUSED_RESPONSES", True)
+    helpers = _helpers()
+    user = MagicMock(id=1, telegram_user_id=123)
+
+    await helpers.deduct_credits_for_llm_call(
+        user, _response(**{flag: True}), "planning"
+    )
+
+    # Charged like a fresh call, but no key was used and nothing was spent
+    helpers.api_key_usage_service.log_usage.assert_not_called()
+    helpers.user_service.update_user_credits.assert_called_once_with(
+        helpers.db, 123, Decimal("450.00"), is_deduction=True
+    )
+    transaction = helpers.credit_transaction_service.record_transaction.call_args[0][1]
+    assert transaction["api_key_usage_id"] is None
+    assert transaction["real_cost_associated_usd"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reused_responses_can_be_made_free(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CHARGE_REUSED_RESPONSES", False)
+    helpers = _helpers()
+
+    await helpers.deduct_credits_for_llm_call(
+        MagicMock(id=1), _response(coalesced=True), "planning"
+    )
+
+    helpers.user_service.update_user_credits.assert_not_called()
+    helpers.credit_transaction_service.record_transaction.assert_not_called()
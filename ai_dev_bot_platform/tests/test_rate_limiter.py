@@ -0,0 +1,42 @@
+import asyncio
+import time
+import pytest
+from app.utils.rate_limiter import LLMRateLimiter, TokenBucket, key_fingerprint
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_refill_instead_of_failing():
+    bucket = TokenBucket(rate_per_minute=600)  # 10 tokens per second
+    await bucket.acquire(600)
+
+    started = time.monotonic()
+    await bucket.acquire(1)
+    assert time.monotonic() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_reservation_settles_actual_token_usage():
+    limiter = LLMRateLimiter({"p": {"key_tpm": 1000}}, max_concurrent_calls=4)
+    async with limiter.reserve("p", "secret", estimated_tokens=100) as reservation:
+        reservation.settle(400)
+
+    bucket = limiter._buckets[f"key:{key_fingerprint('secret')}:tpm"]
+    assert bucket.tokens == pytest.approx(600, abs=1)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap_limits_in_flight_calls():
+    limiter = LLMRateLimiter({}, max_concurrent_calls=2)
+    in_flight = 0
+    peak = 0
+
+    async def call():
+        nonlocal in_flight, peak
+        async with limiter.reserve("p", "secret", estimated_tokens=0):
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    await asyncio.gather(*(call() for _ in range(6)))
+    assert peak == 2
@@ -0,0 +1,30 @@
+import pytest
+from unittest.mock import MagicMock
+from app.services.orchestrator_service import OrchestratorService
+from app.services.project_helpers import ProjectHelpers
+from app.services.service_container import ServiceContainer
+
+
+@pytest.fixture
+def services():
+    api_key_manager = MagicMock()
+    api_key_manager.checkout_key.return_value = (None, None)
+    container = ServiceContainer(api_key_manager)
+    yield container
+
+
+def test_per_request_objects_only_bind_the_session(services):
+    first = OrchestratorService(MagicMock(), services)
+    second = OrchestratorService(MagicMock(), services)
+    helpers = ProjectHelpers(MagicMock(), services)
+
+    assert first.db is not second.db
+    assert first.notifier is second.notifier is services.notifier
+    assert first.llm_client is second.llm_client is helpers.llm_client
+    assert first.storage_service is helpers.storage_service
+    assert first.architect_agent.llm_client is services.llm_client
+
+
+@pytest.mark.asyncio
+async def test_container_close_is_safe_for_an_unused_bot(services):
+    await services.close()
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from app.utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert calls == 1
+    assert [r for r, _ in results] == ["result"] * 5
+    assert [shared for _, shared in results].count(False) == 1
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        return "result"
+
+    first = asyncio.ensure_future(flight.do("k", work))
+    second = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await second == ("result", True)
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_call_is_cancelled_when_every_waiter_leaves():
+    flight = SingleFlight()
+    work_cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            work_cancelled.set()
+            raise
+
+    waiter = asyncio.ensure_future(flight.do("k", work))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0.01)
+
+    assert work_cancelled.is_set()
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_callers_join_a_call_the_leader_runs_itself():
+    flight = SingleFlight()
+
+    async def never_called():
+        raise AssertionError("joiners must not start their own call")
+
+    led = flight.lead("k")
+    assert flight.lead("k") is None
+    leaving = asyncio.ensure_future(flight.do("k", never_called))
+    joiner = asyncio.ensure_future(flight.do("k", never_called))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    await asyncio.sleep(0)
+    led.set_result("result")
+
+    assert await joiner == ("result", True)
+    assert not led.cancelled()
+    assert len(flight) == 0
@@ -0,0 +1,62 @@
+from app.utils.token_budget import (
+    TRUNCATION_MARKER,
+    PromptSection,
+    estimate_tokens,
+    fit_sections,
+    model_family,
+)
+
+
+def test_model_family_detection():
+    assert model_family("gemini-2.5-flash") == "gemini"
+    assert model_family("deepseek/deepseek-r1-0528:free") == "deepseek"
+    assert model_family("tngtech/deepseek-r1t-chimera:free") == "deepseek"
+    assert model_family("anthropic/claude-3-opus") == "claude"
+    assert model_family("unknown/model") == "default"
+
+
+def test_estimate_tokens_counts_words_and_splits_long_identifiers():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("def add(a, b):") == 8
+    assert estimate_tokens("a" * 40, "gemini-2.5-flash") == 10
+
+
+def test_fit_sections_trims_lowest_priority_first_and_keeps_required():
+    sections = [
+        PromptSection("task", "implement login " * 10, required=True),
+        PromptSection("docs", "word " * 100, priority=1),
+        PromptSection("code", "code " * 100, priority=0),
+    ]
+
+    fitted = fit_sections(sections, "gemini-2.5-flash", budget_tokens=200)
+
+    assert fitted["task"] == sections[0].text
+    assert fitted["docs"] == sections[1].text
+    assert fitted["code"].endswith(TRUNCATION_MARKER)
+    total = sum(estimate_tokens(text, "gemini-2.5-flash") for text in fitted.values())
+    assert total <= 200
+
+
+def test_fit_sections_output_including_markers_stays_within_budget():
+    # Dense short words first, long identifiers after: uneven tokens per char
+    text = "a = b + c; " * 50 + "very_long_identifier_name " * 50
+    sections = [
+        PromptSection("task", "do it", required=True),
+        PromptSection("docs", text, priority=1),
+        PromptSection("code", text, priority=0),
+    ]
+    for budget in (20, 60, 150, 300, 500, 700):
+        for model in ("gemini-2.5-flash", "anthropic/claude-3-opus"):
+            fitted = fit_sections(
+                sections, model, reserved_tokens=5, budget_tokens=budget
+            )
+
+            total = 5 + sum(estimate_tokens(t, model) for t in fitted.values())
+            assert total <= budget, (budget, model, total)
+
+
+def test_fit_sections_returns_input_when_within_budget():
+    sections = [PromptSection("a", "short text")]
+    assert fit_sections(sections, "gemini-2.5-flash", budget_tokens=100) == {
+        "a": "short text"
+    }
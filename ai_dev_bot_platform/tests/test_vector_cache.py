@@ -0,0 +1,62 @@
+import numpy as np
+from app.utils.vector_cache import ProjectVectorCache, ProjectVectors
+
+
+def _rows(count: int, text: str = "x"):
+    return [{"id": i, "content_chunk": text, "file_path": "a.py"} for i in range(count)]
+
+
+def test_search_matches_brute_force_l2():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 16)).astype(np.float32)
+    query = rng.standard_normal(16).astype(np.float32)
+    entry = ProjectVectors(_rows(500), vectors)
+
+    results = entry.search(query.tolist(), 5)
+
+    distances = np.linalg.norm(vectors - query, axis=1)
+    expected = np.argsort(distances)[:5]
+    assert [row["id"] for row, _ in results] == expected.tolist()
+    assert np.allclose([d for _, d in results], distances[expected], atol=1e-4)
+    assert len(entry.search(query.tolist(), 1000)) == 500
+    assert ProjectVectors([], np.array([])).search(query.tolist(), 3) == []
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    vectors = np.zeros((10, 96), dtype=np.float32)
+    size = ProjectVectors(_rows(10), vectors).nbytes
+    cache = ProjectVectorCache(max_bytes=size * 2, ttl_seconds=60)
+
+    for project in ("a", "b"):
+        cache.put(project, _rows(10), vectors, cache.generation(project))
+    assert cache.get("a") is not None  # "b" is now least recently used
+    cache.put("c", _rows(10), vectors, cache.generation("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["projects"] == 2 and stats["bytes"] == size * 2
+    assert stats["evictions"] == 1
+    assert stats["hit_rate"] == 3 / 4
+
+
+def test_invalidate_drops_entry_and_discards_stale_loads():
+    vectors = np.ones((2, 4), dtype=np.float32)
+    cache = ProjectVectorCache(max_bytes=10**6, ttl_seconds=60)
+    cache.put("p", _rows(2), vectors, cache.generation("p"))
+
+    generation = cache.generation("p")  # a reader starts loading...
+    cache.invalidate("p")  # ...and a write lands meanwhile
+    entry = cache.put("p", _rows(2), vectors, generation)
+
+    assert entry.search([1.0] * 4, 1)[0][1] == 0.0
+    assert cache.get("p") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_entries_expire_after_ttl():
+    cache = ProjectVectorCache(max_bytes=10**6, ttl_seconds=-1)
+    cache.put("p", _rows(1), np.ones((1, 4), dtype=np.float32), 0)
+
+    assert cache.get("p") is None
+    assert cache.stats()["bytes"] == 0